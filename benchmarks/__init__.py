@@ -0,0 +1,6 @@
+"""
+Standalone benchmarks for the engine, run them from the repository root as modules, e.g.
+```
+python -m benchmarks.instanced_rendering
+```
+"""
@@ -0,0 +1,163 @@
+"""
+Renders the scenes headless for a number of frames, uncapped and with a fixed delta time so every
+run renders exactly the same frames, and reports the CPU time of each stage of a frame as mean,
+p50, p95 and p99 in JSON so runs can be compared to catch regressions, along with the counters
+recorded every frame.
+
+Usage:
+    python -m benchmarks.frame_times [--scenes DEBUG GRID] [--sizes 10 30] [--frames 300]
+        [--warmup 10] [--delta-time 16] [--output results.json] [--baseline previous.json]
+
+The sizes are the half extent of the cube grid and only apply to the scenes that are built from
+one, see `Scene.SIZED_LOADERS`. The stages are the ones recorded by the `FrameProfiler`.
+"""
+
+import argparse
+import gc
+import platform
+import random
+import time
+
+from src import *
+from src.graphics_engine import GraphicsEngine
+from src.scene import Scene
+
+SEED = 0
+
+
+def run_scene(
+    scene_id: str,
+    scene_size: Optional[int],
+    frames: int,
+    warmup: int,
+    delta_time: int,
+) -> dict:
+    # Some of the scenes pick random rotations.
+    random.seed(SEED)
+    np.random.seed(SEED)
+
+    start: float = time.perf_counter()
+    graphics_engine = GraphicsEngine(
+        scene_id=scene_id,
+        headless=True,
+        scene_size=scene_size,
+        fixed_delta_time=delta_time,
+    )
+    load_time_s: float = time.perf_counter() - start
+
+    for _ in range(warmup):
+        graphics_engine.iteration()
+    graphics_engine.profiler.history = frames
+    graphics_engine.profiler.clear()
+    for _ in range(frames):
+        graphics_engine.iteration()
+
+    result: dict = {
+        "scene": scene_id,
+        "size": scene_size,
+        "objects": len(graphics_engine.scene.objects),
+        "load_time_s": load_time_s,
+        "stages": {
+            name: dataclasses.asdict(summary)
+            for name, summary in graphics_engine.profiler.summarize().items()
+        },
+        # Lag behind by `settings.Profiling.GPU_QUERY_LATENCY` frames.
+        "gpu_stages": {
+            name: dataclasses.asdict(summary)
+            for name, summary in graphics_engine.profiler.summarize(gpu=True).items()
+        },
+        # Per frame, like the culled objects or the draw calls of the `RenderQueue`.
+        "counters": {
+            name: dataclasses.asdict(summary)
+            for name, summary in graphics_engine.profiler.summarize_counters().items()
+        },
+    }
+    del graphics_engine
+    gc.collect()
+    return result
+
+
+def print_comparison(results: list[dict], baseline: list[dict]) -> None:
+    """Prints the p50 of every stage next to the one of the baseline run, GPU times prefixed."""
+    baseline_by_key: dict[tuple[str, Optional[int]], dict] = {
+        (result["scene"], result["size"]): result for result in baseline
+    }
+    print(
+        f"{'scene':>26} {'size':>5} {'stage':>18} {'p50 [ms]':>9} {'base':>9} {'ratio':>6}"
+    )
+    for result in results:
+        base: Optional[dict] = baseline_by_key.get((result["scene"], result["size"]))
+        if base is None:
+            continue
+        for stages, prefix in (("stages", ""), ("gpu_stages", "gpu:")):
+            for name, summary in result.get(stages, {}).items():
+                if name not in base.get(stages, {}):
+                    continue
+                p50_ms: float = summary["p50_ms"]
+                base_p50_ms: float = base[stages][name]["p50_ms"]
+                print(
+                    f"{result['scene']:>26} {str(result['size']):>5} {prefix + name:>18}"
+                    f" {p50_ms:>9.3f} {base_p50_ms:>9.3f} {p50_ms / base_p50_ms:>5.2f}x"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenes",
+        nargs="+",
+        choices=[scene_id for scene_id in Scene.LOADERS if scene_id is not None],
+        default=["DEBUG", "GRID", "CAT_CIRCLE", "CAT_CIRCLE_ANIMATED_SCALE"],
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Half extents of the cube grids, uses the scene defaults if not given.",
+    )
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--delta-time", type=int, default=16, help="Fixed time step in milliseconds."
+    )
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument(
+        "--baseline", type=str, default=None, help="Results of a previous run."
+    )
+    args = parser.parse_args()
+
+    results: list[dict] = []
+    for scene_id in args.scenes:
+        sized: bool = Scene.LOADERS[scene_id] in Scene.SIZED_LOADERS
+        scene_sizes: list[Optional[int]] = (
+            args.sizes if sized and args.sizes is not None else [None]
+        )
+        for scene_size in scene_sizes:
+            results.append(
+                run_scene(
+                    scene_id, scene_size, args.frames, args.warmup, args.delta_time
+                )
+            )
+
+    report: dict = {
+        "frames": args.frames,
+        "warmup": args.warmup,
+        "delta_time": args.delta_time,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output is None:
+        print(json.dumps(report, indent=4))
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as file:
+            print_comparison(results, json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Compares the frame time of drawing N cubes with one draw call per object, like `Model.render` and
+`Model.render_shadow` do, against drawing all of them with a single instanced draw call per pass.
+
+Usage:
+    python -m benchmarks.instanced_rendering [--counts 100 1000 6561] [--frames 30] [--size 64 64]
+
+A small `--size` takes the fill rate out of the measurement, which matters on software rasterizers.
+"""
+
+import argparse
+import time
+
+from moderngl import Context, Framebuffer, Program, Texture, VertexArray
+
+from src import *
+from src import settings
+from src.instancing import InstanceBatch
+from src.opengl import create_standalone_context
+from src.shader_program import ShaderProgram
+from src.uniform_buffer import FrameDataLayout, FrameUniformBuffer
+from src.vbo import Cube
+
+
+def get_grid_model_matrices(count: int) -> list[mat4]:
+    side = int(np.ceil(np.sqrt(count)))
+    return [
+        glm.translate(vec3(2.0 * (i % side - side / 2), -2.0, 2.0 * (i // side)))
+        for i in range(count)
+    ]
+
+
+def setup_uniforms(frame_uniforms: FrameUniformBuffer, program: Program) -> None:
+    m_view: mat4 = glm.lookAt(vec3(0.0, 4.0, -10.0), vec3(0.0, 0.0, 20.0), vec3_y())
+    m_proj: mat4 = glm.perspective(glm.radians(settings.Camera.FOV), 16 / 9, 0.1, 200.0)
+    m_view_light: mat4 = glm.lookAt(vec3(50.0, 50.0, -10.0), vec3(), vec3_y())
+    frame_uniforms.set(FrameDataLayout.M_PROJ, m_proj)
+    frame_uniforms.set(FrameDataLayout.M_VIEW, m_view)
+    frame_uniforms.set(FrameDataLayout.CAM_POS, vec3(0.0, 4.0, -10.0))
+    # A single shadow cascade covering the whole view.
+    frame_uniforms.set(FrameDataLayout.M_SHADOW, m_proj * m_view_light)
+    frame_uniforms.set(FrameDataLayout.SHADOW_SPLITS, vec4(200.0))
+    frame_uniforms.set(FrameDataLayout.SHADOW_CASCADE_COUNT, glm.ivec1(1))
+    frame_uniforms.buffer.write(frame_uniforms.data)
+    program["shadowMap"] = 1
+    program["u_texture_0"] = 0
+
+
+def time_frames(ctx: Context, render_frame: Callable[[], None], frames: int) -> float:
+    """Returns the mean time per frame in milliseconds, waiting for the GPU after every frame."""
+    render_frame()
+    ctx.finish()
+    start: float = time.perf_counter()
+    for _ in range(frames):
+        render_frame()
+        ctx.finish()
+    return (time.perf_counter() - start) / frames * SECOND_TO_MS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--counts", type=int, nargs="+", default=[100, 400, 1600, 6561, 25600]
+    )
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument(
+        "--size", type=int, nargs=2, default=list(settings.OpenGL.WINDOW_SIZE)
+    )
+    args = parser.parse_args()
+    size: tuple[int, int] = tuple(args.size)
+
+    ctx: Context = create_standalone_context()
+    ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
+
+    programs: dict[str, Program] = ShaderProgram(ctx).programs
+    vbo = Cube(ctx)
+    texture: Texture = ctx.texture((1, 1), 3, bytes([200, 200, 200]))
+    depth_texture: Texture = ctx.depth_texture(size)
+    depth_texture.use(location=1)
+    depth_fbo: Framebuffer = ctx.framebuffer(depth_attachment=depth_texture)
+    screen_fbo: Framebuffer = ctx.framebuffer(
+        ctx.renderbuffer(size), ctx.depth_renderbuffer(size)
+    )
+
+    frame_uniforms = FrameUniformBuffer(ctx)
+    program, shadow_program = programs["default"], programs["shadow_map"]
+    setup_uniforms(frame_uniforms, program)
+    setup_uniforms(frame_uniforms, programs["default_instanced"])
+    vao: VertexArray = ctx.vertex_array(
+        program, [(vbo.vbo, vbo.buffer_format, *vbo.attributes)], skip_errors=True
+    )
+    shadow_vao: VertexArray = ctx.vertex_array(
+        shadow_program,
+        [(vbo.vbo, vbo.buffer_format, *vbo.attributes)],
+        skip_errors=True,
+    )
+    batch = InstanceBatch(
+        ctx,
+        programs["default_instanced"],
+        programs["shadow_map_instanced"],
+        vbo,
+        texture,
+    )
+
+    print(
+        f"{'objects':>8} {'per object [ms]':>16} {'instanced [ms]':>15} {'speedup':>8}"
+    )
+    for count in args.counts:
+        m_models: list[mat4] = get_grid_model_matrices(count)
+
+        def render_per_object() -> None:
+            depth_fbo.clear()
+            depth_fbo.use()
+            for m_model in m_models:
+                shadow_program["m_model"].write(m_model)
+                shadow_vao.render()
+            screen_fbo.clear()
+            screen_fbo.use()
+            for m_model in m_models:
+                texture.use(location=0)
+                program["m_model"].write(m_model)
+                vao.render()
+
+        def render_instanced() -> None:
+            batch.write(
+                np.frombuffer(
+                    b"".join([m_model.to_bytes() for m_model in m_models]),
+                    dtype=np.float32,
+                ).reshape(-1, 4, 4)
+            )
+            depth_fbo.clear()
+            depth_fbo.use()
+            batch.render_shadow()
+            screen_fbo.clear()
+            screen_fbo.use()
+            batch.render()
+
+        per_object_ms: float = time_frames(ctx, render_per_object, args.frames)
+        instanced_ms: float = time_frames(ctx, render_instanced, args.frames)
+        print(
+            f"{count:>8} {per_object_ms:>16.2f} {instanced_ms:>15.2f}"
+            f" {per_object_ms / instanced_ms:>7.1f}x"
+        )
+
+    batch.destroy()
+    frame_uniforms.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compares the batched matrix kernels of `src/math.py` against calling glm once per element, for
+building model matrices, normal matrices and transforming points.
+
+Usage:
+    python -m benchmarks.matrix_kernels [--counts 100 1000 6591] [--repeats 5]
+
+The glm side starts from vec3 and mat4 values that already exist, the batched side from NumPy
+arrays, so neither pays for converting between them.
+"""
+
+import argparse
+import time
+
+import src.math
+from src import *
+
+
+def time_fastest(function: Callable[[], object], repeats: int) -> float:
+    """Milliseconds of the fastest of the repeats."""
+    times: list[float] = []
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * SECOND_TO_MS
+
+
+def glm_model_matrices(
+    positions: list[vec3], rotations: list[vec3], scales: list[vec3]
+) -> list[mat4]:
+    m_models: list[mat4] = []
+    for pos, rot, scale in zip(positions, rotations, scales):
+        m_model: mat4 = glm.translate(pos)
+        m_model = glm.rotate(m_model, rot.x, vec3_x())
+        m_model = glm.rotate(m_model, rot.y, vec3_y())
+        m_model = glm.rotate(m_model, rot.z, vec3_z())
+        m_models.append(glm.scale(m_model, scale))
+    return m_models
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 6591])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'kernel':>16} {'count':>6} {'glm [ms]':>9} {'batched [ms]':>13} {'speedup':>8}"
+    )
+    for count in args.counts:
+        _rng = np.random.default_rng(0x2024_07_03)
+        positions, rotations, scales, points = _rng.uniform(-5.0, 5.0, (4, count, 3))
+        scales = np.abs(scales) + 0.1
+        glm_positions, glm_rotations, glm_scales, glm_points = (
+            [vec3(*v) for v in vectors]
+            for vectors in (positions, rotations, scales, points)
+        )
+        glm_m_models: list[mat4] = glm_model_matrices(
+            glm_positions, glm_rotations, glm_scales
+        )
+        m_models: np.ndarray = src.math.get_model_matrix_batched(
+            positions, rotations, scales
+        )
+
+        kernels: list[tuple[str, Callable[[], object], Callable[[], object]]] = [
+            (
+                "model matrices",
+                lambda: glm_model_matrices(glm_positions, glm_rotations, glm_scales),
+                lambda: src.math.get_model_matrix_batched(positions, rotations, scales),
+            ),
+            (
+                "normal matrices",
+                lambda: [
+                    glm.transpose(glm.inverse(glm.mat3(m_model)))
+                    for m_model in glm_m_models
+                ],
+                lambda: src.math.get_normal_matrices(m_models),
+            ),
+            (
+                "mat4 x vec3",
+                lambda: [
+                    vec3(m_model * vec4(point, 1.0))
+                    for m_model, point in zip(glm_m_models, glm_points)
+                ],
+                lambda: src.math.mat4_x_vec3_batched(m_models, points),
+            ),
+            (
+                "cross",
+                lambda: [glm.cross(p, q) for p, q in zip(glm_positions, glm_points)],
+                lambda: src.math.cross_batched(positions, points),
+            ),
+        ]
+        for name, glm_kernel, batched_kernel in kernels:
+            glm_ms: float = time_fastest(glm_kernel, args.repeats)
+            batched_ms: float = time_fastest(batched_kernel, args.repeats)
+            print(
+                f"{name:>16} {count:>6} {glm_ms:>9.3f} {batched_ms:>13.3f}"
+                f" {glm_ms / batched_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Measures how long it takes to start up: what importing a module costs, parsed from the output of
+`python -X importtime` and summed up per top-level package, and how long a headless engine takes
+until its first frame is rendered.
+
+Usage:
+    python -m benchmarks.startup [--modules src.math src.collider src.graphics_engine]
+        [--scene DEBUG] [--repeats 5] [--top 8]
+
+Every measurement runs in a fresh interpreter so nothing is imported yet, the fastest of the
+repeats is reported. The first frame is the one with the placeholders of the streamed assets.
+
+It also checks that the modules in `LIGHT_MODULES` don't run any of the lazily imported packages
+when they're imported, and exits with an error if one of them does. That happens as soon as a
+module touches e.g. `np` at import time, like in an unquoted `np.ndarray` annotation.
+"""
+
+import argparse
+import subprocess
+from collections import defaultdict
+
+from src import *
+from src.scene import Scene
+
+REPO_FOLDERPATH: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_FRAME_SCRIPT = """
+import time
+start = time.perf_counter()
+from src.graphics_engine import GraphicsEngine
+imported = time.perf_counter()
+graphics_engine = GraphicsEngine(scene_id={scene_id!r}, headless=True)
+created = time.perf_counter()
+graphics_engine.iteration()
+graphics_engine.ctx.finish()
+rendered = time.perf_counter()
+print(imported - start, created - imported, rendered - created)
+"""
+
+# Only the packages get checked, modules that import e.g. numpy directly aren't lazy anyway.
+LAZY_PACKAGES: tuple[str, ...] = (
+    "freetype",
+    "moderngl",
+    "numpy",
+    "pygame",
+    "PIL.Image",
+)
+# Modules that have to be importable without running any of the lazy packages.
+LIGHT_MODULES: tuple[str, ...] = ("src", "src.math")
+
+LOADED_PACKAGES_SCRIPT = """
+import sys
+import {module}
+print(*[
+    package for package in {packages!r}
+    if package in sys.modules and type(sys.modules[package]).__name__ != "_LazyModule"
+])
+"""
+
+
+@dataclass
+class ImportTime:
+    module: str
+    # Microseconds, without and with the imports the module made.
+    self_us: int
+    cumulative_us: int
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=REPO_FOLDERPATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """The lines look like `import time:  self [us] | cumulative | module`, indented by depth."""
+    import_times: list[ImportTime] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        import_times.append(
+            ImportTime(module.strip(), int(self_us), int(cumulative_us))
+        )
+    return import_times
+
+
+def time_import(module: str, repeats: int) -> list[ImportTime]:
+    """The run of the repeats in which importing the module took the least time."""
+    runs: list[list[ImportTime]] = [
+        parse_importtime(
+            run_python("-X", "importtime", "-c", f"import {module}").stderr
+        )
+        for _ in range(repeats)
+    ]
+    return min(runs, key=get_total_us)
+
+
+def get_total_us(import_times: list[ImportTime]) -> int:
+    """
+    The sum of the self times, the cumulative time of the module misses the lazy imports that ran
+    after it, see `lazy_import` in `src/__init__.py`.
+    """
+    return sum(import_time.self_us for import_time in import_times)
+
+
+def get_package_times(import_times: list[ImportTime]) -> dict[str, int]:
+    """Self times in microseconds summed up per top-level package, the largest first."""
+    package_times: dict[str, int] = defaultdict(int)
+    for import_time in import_times:
+        package_times[import_time.module.split(".")[0]] += import_time.self_us
+    return dict(sorted(package_times.items(), key=lambda item: -item[1]))
+
+
+def get_loaded_packages(module: str) -> list[str]:
+    """The lazy packages that importing the module ran, see `lazy_import` in `src/__init__.py`."""
+    return run_python(
+        "-c", LOADED_PACKAGES_SCRIPT.format(module=module, packages=LAZY_PACKAGES)
+    ).stdout.split()
+
+
+def time_first_frame(scene_id: Optional[str], repeats: int) -> tuple[float, ...]:
+    """Seconds it took to import the engine, to create it and to render the first frame."""
+    runs: list[tuple[float, ...]] = [
+        tuple(
+            float(seconds)
+            for seconds in run_python(
+                "-c", FIRST_FRAME_SCRIPT.format(scene_id=scene_id)
+            )
+            .stdout.splitlines()[-1]
+            .split()
+        )
+        for _ in range(repeats)
+    ]
+    return min(runs, key=sum)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--modules",
+        nargs="+",
+        default=["src", "src.math", "src.collider", "src.graphics_engine"],
+    )
+    parser.add_argument(
+        "--scene",
+        choices=[scene_id for scene_id in Scene.LOADERS if scene_id is not None],
+        default="DEBUG",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--top", type=int, default=8, help="Number of packages listed per module."
+    )
+    args = parser.parse_args()
+
+    for module in args.modules:
+        import_times: list[ImportTime] = time_import(module, args.repeats)
+        print(f"import {module}: {get_total_us(import_times) * 1e-3:.1f}ms")
+        for package, self_us in list(get_package_times(import_times).items())[
+            : args.top
+        ]:
+            print(f"    {package:>24} {self_us * 1e-3:>7.1f}ms")
+
+    loaded_packages: dict[str, list[str]] = {
+        module: get_loaded_packages(module) for module in LIGHT_MODULES
+    }
+    for module, packages in loaded_packages.items():
+        print(
+            f"import {module} runs: {', '.join(packages) or 'none of the lazy packages'}"
+        )
+    if any(loaded_packages.values()):
+        sys.exit("Importing the light modules isn't lazy anymore, see `LIGHT_MODULES`.")
+
+    import_s, create_s, render_s = time_first_frame(args.scene, args.repeats)
+    print(
+        f"first frame of {args.scene}: {(import_s + create_s + render_s) * SECOND_TO_MS:.0f}ms"
+        f" (import {import_s * SECOND_TO_MS:.0f}ms, create {create_s * SECOND_TO_MS:.0f}ms,"
+        f" render {render_s * SECOND_TO_MS:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
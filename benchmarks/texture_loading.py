@@ -0,0 +1,71 @@
+"""
+Compares how long the `TextureHandler` takes until all the textures are decoded and uploaded with
+different numbers of streaming threads, a single thread is the same as decoding them one after
+another, and how long it takes to load them from the texture cache instead.
+
+Usage:
+    python -m benchmarks.texture_loading [--threads 1 2 4 8] [--repeats 5]
+
+The files are read from the page cache after the first repeat, so the times are the ones of a warm
+start.
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from moderngl import Context
+
+from src import *
+from src import settings
+from src.asset_streaming import AssetStreamer
+from src.opengl import create_standalone_context
+from src.texture import TextureHandler
+
+
+def time_loading(
+    ctx: Context, threads: int, repeats: int, disk_cache: bool = False
+) -> float:
+    """Returns the fastest of the repeats in milliseconds, waiting for the uploads to finish."""
+    settings.Textures.DISK_CACHE = disk_cache
+    app = cast("GraphicsEngine", SimpleNamespace(ctx=ctx))
+    times: list[float] = []
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+        streamer = AssetStreamer(threads)
+        texture_handler = TextureHandler(app, streamer)
+        streamer.finish()
+        ctx.finish()
+        times.append(time.perf_counter() - start)
+        streamer.shutdown()
+        texture_handler.destroy()
+    return min(times) * SECOND_TO_MS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    ctx: Context = create_standalone_context()
+    # Opens the files once so every thread count starts from the page cache, and fills the texture
+    # cache.
+    time_loading(ctx, 1, 1)
+    time_loading(ctx, 1, 1, disk_cache=True)
+
+    sequential_ms: float = time_loading(ctx, 1, args.repeats)
+    print(f"{'':>12} {'threads':>8} {'startup [ms]':>13} {'speedup':>8}")
+    for disk_cache in [False, True]:
+        for threads in args.threads:
+            loading_ms: float = time_loading(ctx, threads, args.repeats, disk_cache)
+            print(
+                f"{'disk cache' if disk_cache else 'decoded':>12} {threads:>8}"
+                f" {loading_ms:>13.1f} {sequential_ms / loading_ms:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
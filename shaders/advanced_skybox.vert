@@ -2,9 +2,14 @@
 
 layout (location = 0) in vec3 in_position;
 
-out vec4 clipCoords;
+out vec4 worldCoords;
+
+#include "frame_data.glsl"
 
 void main() {
     gl_Position = vec4(in_position, 1.0);
-    clipCoords = gl_Position;
+    // Only the rotation of the view matrix, the skybox is always centered around the camera.
+    // This is linear in the clip coordinates so it can be interpolated instead of being computed per fragment.
+    mat4 m_invProjView = inverse(m_proj * mat4(mat3(m_view)));
+    worldCoords = m_invProjView * gl_Position;
 }
\ No newline at end of file
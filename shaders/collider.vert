@@ -2,16 +2,28 @@
 
 
 layout(location = 0) in vec3 in_position;
+#ifdef QUANTIZED
+layout(location = 1) in vec2 in_normal;
+#else
 layout(location = 1) in vec3 in_normal;
+#endif
 layout(location = 2) in vec2 in_tex;
 
-uniform mat4 m_view;
-uniform mat4 m_proj;
+#ifdef QUANTIZED
+#include "quantization.glsl"
+#endif
+
+#include "frame_data.glsl"
+
 uniform mat4 m_model;
 
 void main()
 {
-    vec3 a = in_normal;
     vec2 b = in_tex;
+#ifdef QUANTIZED
+    gl_Position = m_proj * m_view * m_model * vec4(decodePosition(in_position), 1.0);
+#else
+    vec3 a = in_normal;
     gl_Position = m_proj * m_view * m_model * vec4(in_position, 1.0);
+#endif
 }
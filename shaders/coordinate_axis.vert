@@ -6,8 +6,8 @@ layout(location = 1) in vec3 in_color;
 
 out vec3 fragColor;
 
-uniform mat4 m_view;
-uniform mat4 m_proj;
+#include "frame_data.glsl"
+
 uniform mat4 m_model;
 
 void main() {
@@ -5,23 +5,46 @@ layout (location = 0) out vec4 fragColor;
 in vec2 uv_0;
 in vec3 normal;
 in vec3 fragPos;
-in vec4 shadowCoord;
+in float viewDepth;
 
-struct Light {
-    vec3 position;
-    vec3 Ia;
-    vec3 Id;
-    vec3 Is;
-};
+#include "frame_data.glsl"
 
-uniform Light light;
 uniform sampler2D u_texture_0;
-uniform vec3 camPos;
 uniform sampler2DShadow shadowMap;
-uniform vec2 u_resolution;
+
+mat4 m_shadow_bias = mat4(
+    0.5, 0.0, 0.0, 0.0,
+    0.0, 0.5, 0.0, 0.0,
+    0.0, 0.0, 0.5, 0.0,
+    0.5, 0.5, 0.5, 1.0
+);
+
+vec4 shadowCoord;
+
+// The first cascade that reaches far enough, -1 if the fragment is beyond all of them.
+int getCascade() {
+    for (int i = 0; i < shadowCascadeCount; ++i) {
+        if (viewDepth < shadowSplits[i]) {
+            return i;
+        }
+    }
+    return -1;
+}
+
+// Looks up the shadow a bit above the surface so it doesn't shadow itself, the texels of the far
+// cascades cover a lot more of the scene so the offset scales with the texel size of the cascade
+// and surfaces facing away from the light need more of it.
+vec3 getShadowPosition(int cascade, vec3 Normal, vec3 lightDir) {
+    // The first row of the matrix maps world space to NDC x, which spans the 2 units of a cascade.
+    mat4 m_cascade = m_shadow[cascade];
+    vec3 rowX = vec3(m_cascade[0][0], m_cascade[1][0], m_cascade[2][0]);
+    float texelSize = 2.0 / (length(rowX) * float(textureSize(shadowMap, 0).y));
+    float slope = 1.0 - max(0.0, dot(Normal, lightDir));
+    return fragPos + (1.5 + 1.5 * slope) * texelSize * Normal;
+}
 
 float lookup(float ox, float oy) {
-    vec2 pixelOffset = 1 / u_resolution;
+    vec2 pixelOffset = 1.0 / vec2(textureSize(shadowMap, 0));
     return textureProj(shadowMap, shadowCoord + vec4(ox * pixelOffset.x * shadowCoord.w, oy * pixelOffset.y * shadowCoord.w, 0.0, 0.0));
 }
 
@@ -61,8 +84,17 @@ vec3 getLight(vec3 color) {
     float spec = pow(max(dot(viewDir, reflectDir), 0), 128);
     vec3 specular = spec * light.Is;
 
-    // Shadow 
-    float shadow = getSoftShadowX16();
+    // Shadow
+    float shadow = 1.0;
+    int cascade = getCascade();
+    if (cascade >= 0) {
+        vec3 shadowPos = getShadowPosition(cascade, Normal, lightDir);
+        shadowCoord = m_shadow_bias * m_shadow[cascade] * vec4(shadowPos, 1.0);
+        shadowCoord.z -= 5e-4;
+        // The shadow maps of the cascades are side by side in the depth texture.
+        shadowCoord.x = (shadowCoord.x + float(cascade)) / float(shadowCascadeCount);
+        shadow = getSoftShadowX16();
+    }
 
     return color * (ambient + (diffuse + specular) * shadow);
 }
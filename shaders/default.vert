@@ -1,33 +1,46 @@
 #version 330 core
 
 layout (location = 0) in vec2 in_texcoord_0;
+#ifdef QUANTIZED
+layout (location = 1) in vec2 in_normal;
+#else
 layout (location = 1) in vec3 in_normal;
+#endif
 layout (location = 2) in vec3 in_position;
+#ifdef INSTANCED
+layout (location = 3) in mat4 in_instance_model;
+#endif
+
+#ifdef QUANTIZED
+#include "quantization.glsl"
+#endif
 
 out vec2 uv_0;
 out vec3 normal;
 out vec3 fragPos;
-out vec4 shadowCoord;
+out float viewDepth;
 
-uniform mat4 m_proj;
-uniform mat4 m_view;
-uniform mat4 m_view_light;
-uniform mat4 m_model;
+#include "frame_data.glsl"
 
-mat4 m_shadow_bias = mat4(
-    0.5, 0.0, 0.0, 0.0,
-    0.0, 0.5, 0.0, 0.0,
-    0.0, 0.0, 0.5, 0.0,
-    0.5, 0.5, 0.5, 1.0
-);
+#ifndef INSTANCED
+uniform mat4 m_model;
+#endif
 
 void main() {
+#ifdef INSTANCED
+    mat4 m_model = in_instance_model;
+#endif
+#ifdef QUANTIZED
+    vec3 position = decodePosition(in_position);
+    vec3 vertexNormal = decodeOctahedral(in_normal);
+#else
+    vec3 position = in_position;
+    vec3 vertexNormal = normalize(in_normal);
+#endif
     uv_0 = in_texcoord_0;
-    fragPos = vec3(m_model * vec4(in_position, 1.0));
-    normal = mat3(transpose(inverse(m_model))) * normalize(in_normal);
-    gl_Position = m_proj * m_view * m_model * vec4(in_position, 1.0);
-
-    mat4 shadowMVP = m_proj * m_view_light * m_model;
-    shadowCoord = m_shadow_bias * shadowMVP * vec4(in_position, 1.0);
-    shadowCoord.z -= 5e-4;
+    fragPos = vec3(m_model * vec4(position, 1.0));
+    normal = mat3(transpose(inverse(m_model))) * vertexNormal;
+    vec4 viewPos = m_view * vec4(fragPos, 1.0);
+    viewDepth = -viewPos.z;
+    gl_Position = m_proj * viewPos;
 }
\ No newline at end of file
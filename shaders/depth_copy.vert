@@ -0,0 +1,7 @@
+#version 330 core
+
+// Fullscreen triangle without any vertex buffer, covers the whole viewport.
+void main() {
+    vec2 position = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+    gl_Position = vec4(2.0 * position - 1.0, 0.0, 1.0);
+}
\ No newline at end of file
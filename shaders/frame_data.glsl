@@ -0,0 +1,22 @@
+// Camera and light state shared by all programs, written once per frame by `FrameUniformBuffer`,
+// the std140 offsets are mirrored in `src/uniform_buffer.py`.
+#define MAX_SHADOW_CASCADES 4
+
+struct Light {
+    vec3 position;
+    vec3 Ia;
+    vec3 Id;
+    vec3 Is;
+};
+
+layout (std140) uniform FrameData {
+    mat4 m_proj;
+    mat4 m_view;
+    vec3 camPos;
+    Light light;
+    // Orthographic light projection view matrices of the shadow cascades.
+    mat4 m_shadow[MAX_SHADOW_CASCADES];
+    // View space depth up to which each of the cascades is used.
+    vec4 shadowSplits;
+    int shadowCascadeCount;
+};
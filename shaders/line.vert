@@ -5,8 +5,8 @@ layout(location = 0) in vec3 in_position;
 
 out vec3 fragColor;
 
-uniform mat4 m_view;
-uniform mat4 m_proj;
+#include "frame_data.glsl"
+
 uniform mat4 m_model;
 
 void main() {
@@ -0,0 +1,21 @@
+// Decodes the vertices of quantized VBOs, see `src/vertex_quantization.py`. The positions and
+// normals arrive as the plain 16 bit integers.
+
+// Scale and offset of the positions of the mesh, the same for all vertices of a draw call.
+in vec3 in_position_scale;
+in vec3 in_position_offset;
+
+vec3 decodePosition(vec3 position) {
+    return position * in_position_scale + in_position_offset;
+}
+
+// The normal is stored octahedral encoded, the lower half of the octahedron is folded over the
+// diagonals of the square.
+vec3 decodeOctahedral(vec2 encoded) {
+    encoded /= 32767.0;
+    vec3 n = vec3(encoded, 1.0 - abs(encoded.x) - abs(encoded.y));
+    float folded = max(-n.z, 0.0);
+    n.x += n.x >= 0.0 ? -folded : folded;
+    n.y += n.y >= 0.0 ? -folded : folded;
+    return normalize(n);
+}
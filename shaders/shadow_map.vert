@@ -1,12 +1,30 @@
 #version 330 core
 
 layout (location = 2) in vec3 in_position;
+#ifdef INSTANCED
+layout (location = 3) in mat4 in_instance_model;
+#endif
 
-uniform mat4 m_proj;
-uniform mat4 m_view_light;
+#ifdef QUANTIZED
+#include "quantization.glsl"
+#endif
+
+#include "frame_data.glsl"
+
+#ifndef INSTANCED
 uniform mat4 m_model;
+#endif
+// Set by the `SceneRenderer` before drawing into the part of the depth texture of the cascade.
+uniform int u_cascade;
 
 void main() {
-    mat4 mvp = m_proj * m_view_light * m_model;
+#ifdef INSTANCED
+    mat4 m_model = in_instance_model;
+#endif
+    mat4 mvp = m_shadow[u_cascade] * m_model;
+#ifdef QUANTIZED
+    gl_Position = mvp * vec4(decodePosition(in_position), 1.0);
+#else
     gl_Position = mvp * vec4(in_position, 1.0);
+#endif
 }
\ No newline at end of file
@@ -3,8 +3,7 @@ layout (location = 0) in vec3 in_position;
 
 out vec3 texCubeCoords;
 
-uniform mat4 m_proj;
-uniform mat4 m_view;
+#include "frame_data.glsl"
 
 void main() {
     texCubeCoords = in_position;
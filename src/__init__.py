@@ -4,12 +4,14 @@ This contains all project-wide global variables and should be wildcard important
 
 import dataclasses
 import datetime as dt
+import importlib.util
 import os
 import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import IntEnum, StrEnum, auto
 from logging import Logger
+from types import ModuleType
 from typing import (
     TYPE_CHECKING,
     Callable,
@@ -28,24 +30,34 @@ from typing import (
 # Suppresses pygame welcome message
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 
-import freetype
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns the module without running it, that only happens once one of its attributes is first
+    accessed. Everything wildcard imports this package, so the heavy modules are imported this way
+    and tools that only need e.g. `src.math` don't pay for them, see `benchmarks/startup.py`.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module: ModuleType = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 import glm
-import moderngl as mgl
-import numpy as np
-import pygame as pg
-import pygame.constants
 import ujson as json
 from glm import mat3, mat4, vec1, vec2, vec3, vec4
-from moderngl import (
-    Buffer,
-    Context,
-    Framebuffer,
-    Program,
-    Texture,
-    TextureCube,
-    VertexArray,
-)
-from PIL import Image
+
+# The moderngl classes, like `Context` or `Program`, are imported by the modules that use them.
+freetype = lazy_import("freetype")
+mgl = lazy_import("moderngl")
+np = lazy_import("numpy")
+pg = pygame = lazy_import("pygame")
+Image = lazy_import("PIL.Image")
 
 ###
 # Project Setup
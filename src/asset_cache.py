@@ -0,0 +1,182 @@
+from . import *
+
+"""
+Caches arrays that take long to get out of a source file, like the vertices parsed out of an OBJ
+file, as raw npy files which later runs memory-map instead of parsing the source again.
+
+Every cached array has a json file next to it with the SHA-256 of the content of the source file
+it was made from, so it gets made again as soon as the source changes. Hashing a large file takes
+a while too, so it's skipped as long as the size and the modification time of the source are
+still the ones recorded in the metadata. Arrays derived from other arrays, like the index buffers
+of the meshes, are keyed on the SHA-256 of the array they're derived from instead.
+"""
+
+import hashlib
+import time
+from typing import IO
+
+from . import my_logger
+from .settings import Folders
+
+logger = my_logger.setup("AssetCache")
+
+# Bump this whenever the parsers change what they return, it invalidates all cached arrays.
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_content_hash(filepath: str) -> str:
+    """SHA-256 of the content of the file as a hex string."""
+    content_hash = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def read_metadata(filepath: str) -> Optional[dict]:
+    try:
+        with open(filepath, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomically(filepath: str, write: Callable[[IO], None], mode: str) -> None:
+    """Writes into a temporary file first, so a crash never leaves a half written file behind."""
+    temporary_filepath: str = f"{filepath}.{os.getpid()}.tmp"
+    with open(temporary_filepath, mode) as file:
+        write(file)
+    os.replace(temporary_filepath, filepath)
+
+
+def load_cached_array(
+    source_filepath: str,
+    parse: Callable[[str], np.ndarray],
+    cache_folderpath: str = Folders.CACHE_OBJ,
+) -> np.ndarray:
+    """
+    Returns the array `parse(source_filepath)` returns. It's read-only and memory-mapped from the
+    cache, `parse` only gets called if there is no cached array for the current source content.
+    """
+    array, _ = load_cached_array_with_attributes(
+        source_filepath, lambda filepath: (parse(filepath), {}), cache_folderpath
+    )
+    return array
+
+
+def load_cached_array_with_attributes(
+    source_filepath: str,
+    parse: Callable[[str], tuple[np.ndarray, dict]],
+    cache_folderpath: str,
+    cache_name: Optional[str] = None,
+) -> tuple[np.ndarray, dict]:
+    """
+    Like `load_cached_array`, for arrays that need more to be interpreted than their shape, `parse`
+    returns a json serializable dict of attributes along with the array, which gets cached in the
+    metadata. Sources whose file names aren't unique need a `cache_name` of their own.
+    """
+    name: str = cache_name or os.path.basename(source_filepath)
+    array_filepath: str = os.path.join(cache_folderpath, f"{name}.npy")
+    metadata_filepath: str = os.path.join(cache_folderpath, f"{name}.json")
+
+    stat: os.stat_result = os.stat(source_filepath)
+    metadata: Optional[dict] = read_metadata(metadata_filepath)
+    content_hash: Optional[str] = None
+    if (
+        metadata is not None
+        and metadata.get("version") == CACHE_VERSION
+        and os.path.exists(array_filepath)
+    ):
+        attributes: dict = metadata.get("attributes", {})
+        if (
+            metadata["size"] == stat.st_size
+            and metadata["mtime_ns"] == stat.st_mtime_ns
+        ):
+            return np.load(array_filepath, mmap_mode="r"), attributes
+
+        # Only touched, like after a checkout, the cached array stays valid.
+        content_hash = get_content_hash(source_filepath)
+        if metadata["sha256"] == content_hash:
+            metadata.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            write_atomically(
+                metadata_filepath, lambda file: json.dump(metadata, file), "w"
+            )
+            return np.load(array_filepath, mmap_mode="r"), attributes
+
+    if content_hash is None:
+        content_hash = get_content_hash(source_filepath)
+
+    logger.info(f"No cached array for {source_filepath=}, parsing it.")
+    return write_cached_array(
+        lambda: parse(source_filepath),
+        array_filepath,
+        metadata_filepath,
+        {
+            "source": source_filepath,
+            "sha256": content_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        },
+    )
+
+
+def load_derived_array_with_attributes(
+    source: np.ndarray,
+    derive: Callable[[np.ndarray], tuple[np.ndarray, dict]],
+    cache_folderpath: str,
+    cache_name: str,
+) -> tuple[np.ndarray, dict]:
+    """
+    Like `load_cached_array_with_attributes`, for arrays that are derived from another array
+    instead of a file, like the index buffer of a mesh. The SHA-256 of the content of `source`
+    decides whether the cached array is still valid.
+    """
+    array_filepath: str = os.path.join(cache_folderpath, f"{cache_name}.npy")
+    metadata_filepath: str = os.path.join(cache_folderpath, f"{cache_name}.json")
+
+    content_hash = hashlib.sha256(np.ascontiguousarray(source).data)
+    content_hash.update(f"{source.dtype.str} {source.shape}".encode())
+    metadata: Optional[dict] = read_metadata(metadata_filepath)
+    if (
+        metadata is not None
+        and metadata.get("version") == CACHE_VERSION
+        and metadata.get("sha256") == content_hash.hexdigest()
+        and os.path.exists(array_filepath)
+    ):
+        return np.load(array_filepath, mmap_mode="r"), metadata.get("attributes", {})
+
+    logger.info(f"No cached array for {cache_name=}, deriving it.")
+    return write_cached_array(
+        lambda: derive(source),
+        array_filepath,
+        metadata_filepath,
+        {"sha256": content_hash.hexdigest()},
+    )
+
+
+def write_cached_array(
+    make: Callable[[], tuple[np.ndarray, dict]],
+    array_filepath: str,
+    metadata_filepath: str,
+    source_metadata: dict,
+) -> tuple[np.ndarray, dict]:
+    """Makes the array and caches it along with the metadata of what it was made from."""
+    start: float = time.perf_counter()
+    array, attributes = make()
+    array = np.ascontiguousarray(array)
+    parse_seconds: float = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(array_filepath), exist_ok=True)
+    write_atomically(array_filepath, lambda file: np.save(file, array), "wb")
+    metadata: dict = {
+        "version": CACHE_VERSION,
+        **source_metadata,
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "attributes": attributes,
+        "parse_seconds": parse_seconds,
+    }
+    write_atomically(metadata_filepath, lambda file: json.dump(metadata, file), "w")
+    logger.info(f"Cached {array_filepath=}, parsing took {parse_seconds:.2f}s.")
+    return np.load(array_filepath, mmap_mode="r"), attributes
@@ -0,0 +1,108 @@
+from . import *
+
+"""
+Loads the heavy assets in the background so the window is responsive from the first frame on,
+instead of being frozen until everything is loaded. The textures and meshes are created right
+away as placeholders, see `TextureHandler` and `VertexArrayObject`, and filled in once loaded.
+
+Reading, decoding and processing the files happens on worker threads, but OpenGL calls have to be
+made on the thread the context belongs to, so the results get uploaded by `AssetStreamer.update`
+once per frame, for at most `settings.Streaming.UPLOAD_BUDGET_MS` milliseconds. Uploads can be
+generators, they then get resumed at every `yield` so large ones can be spread over several frames.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Iterator
+
+from . import my_logger
+
+logger = my_logger.setup("AssetStreaming")
+
+T = TypeVar("T")
+
+
+@dataclass
+class StreamedAsset:
+    name: str
+    future: Future
+    upload: Callable[[Any], Optional[Iterator[None]]]
+    submitted: float
+
+
+class AssetStreamer:
+    def __init__(self, workers: int = 0):
+        """With 0 `workers` the number of threads is left to `ThreadPoolExecutor`."""
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or None, thread_name_prefix="AssetStreamer"
+        )
+        # Submitted and not uploaded yet, in the order they were submitted.
+        self.loading: deque[StreamedAsset] = deque()
+        # The asset whose upload generator is still running.
+        self.uploading: Optional[tuple[StreamedAsset, Iterator[None]]] = None
+
+    def submit(
+        self,
+        name: str,
+        load: Callable[[], T],
+        upload: Callable[[T], Optional[Iterator[None]]],
+    ) -> None:
+        """Runs `load` on a worker, then `upload` with what it returned on the context thread."""
+        self.loading.append(
+            StreamedAsset(name, self.executor.submit(load), upload, time.perf_counter())
+        )
+
+    @property
+    def is_done(self) -> bool:
+        return not self.loading and self.uploading is None
+
+    def step(self) -> bool:
+        """
+        Runs a single upload step of the loaded assets, returns False if none of them is loaded
+        yet. Exceptions raised while loading get raised here.
+        """
+        if self.uploading is None:
+            asset: Optional[StreamedAsset] = next(
+                (asset for asset in self.loading if asset.future.done()), None
+            )
+            if asset is None:
+                return False
+            self.loading.remove(asset)
+            steps: Optional[Iterator[None]] = asset.upload(asset.future.result())
+            self.uploading = (asset, iter(()) if steps is None else steps)
+
+        asset, steps = self.uploading
+        try:
+            next(steps)
+        except StopIteration:
+            self.uploading = None
+            logger.info(
+                f"Streamed in {asset.name} after"
+                f" {time.perf_counter() - asset.submitted:.2f}s."
+            )
+        return True
+
+    def update(self, budget_ms: float) -> None:
+        """
+        Uploads loaded assets until the budget is used up, at least one step runs so a single
+        large step can't stall the streaming.
+        """
+        start: float = time.perf_counter()
+        while self.step() and (time.perf_counter() - start) * SECOND_TO_MS < budget_ms:
+            pass
+
+    def finish(self) -> None:
+        """Blocks until all the assets are loaded and uploaded."""
+        while not self.is_done:
+            if not self.step():
+                wait(
+                    [asset.future for asset in self.loading],
+                    return_when=FIRST_COMPLETED,
+                )
+
+    def shutdown(self) -> None:
+        """Drops the loads that haven't started yet, the running ones still finish."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.loading.clear()
+        self.uploading = None
@@ -12,6 +12,7 @@ from .constants import (
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
+    from .headless import HeadlessKeys
 
 
 class Camera:
@@ -137,6 +138,8 @@ class Camera:
             self.m_proj: mat4 = self.get_projection_matrix()
         self.m_view: mat4 = self.get_view_matrix()
 
+        self.app.frame_uniforms.write_camera(self)
+
         if self.is_recording:
             self._update_recoding()
 
@@ -145,7 +148,7 @@ class Camera:
         When controlling a floating camera we can just pass through objects so we
         don't need any bound checks.
         """
-        keys: pg.ScancodeWrapper = pg.key.get_pressed()
+        keys: pg.key.ScancodeWrapper | HeadlessKeys = self.app.get_pressed_keys()
         if keys[pg.K_SPACE]:
             self.app.player_controller_mode = PLAYER_CONTROLLER_MODE.FPS
             return
@@ -18,10 +18,13 @@ class VBO:
     IN_NORMAL = "in_normal"
     IN_POSITION = "in_position"
     IN_COLOR = "in_color"
+    IN_POSITION_SCALE = "in_position_scale"
+    IN_POSITION_OFFSET = "in_position_offset"
 
     FILE_CUBE = "CubeVBO.npy"
     FILE_CYLINDER = "CylinderVBO.npy"
     FILE_SPHERE = "SphereVBO.npy"
+    CACHE_CAT_DECIMATED: Callable[[float], str] = lambda ratio: f"CatVBO_{ratio:g}"
 
 
 ###
@@ -33,6 +36,17 @@ class PLAYER_CONTROLLER_MODE(IntEnum):
     FPS = auto()
 
 
+class PARAMETRIC_MESH(StrEnum):
+    SPHERE = auto()
+    CYLINDER = auto()
+
+
+class RENDER_PASS(IntEnum):
+    STATIC_SHADOW = auto()
+    SHADOW = auto()
+    MAIN = auto()
+
+
 ###
 # Dicts
 ###
@@ -0,0 +1,120 @@
+from . import *
+
+"""
+Frustum culling on the CPU, the bounding spheres of all objects get tested against the planes of
+the view frustum at once with NumPy instead of object by object.
+
+The (N, 4, 4) model matrix arrays are in the column-major memory layout of glm and OpenGL, see
+`transform_store.py`.
+"""
+
+
+@dataclass
+class BoundingSphere:
+    center: np.ndarray
+    radius: float
+
+    @staticmethod
+    def from_positions(positions: np.ndarray) -> "BoundingSphere":
+        """Sphere around the center of the bounding box, not minimal but good enough for culling."""
+        center: np.ndarray = 0.5 * (positions.min(axis=0) + positions.max(axis=0))
+        radius = float(np.linalg.norm(positions - center, axis=1).max())
+        return BoundingSphere(center.astype(np.float32), radius)
+
+
+# NDC ranges of x, y and z that are inside the clip space volume.
+NDC_BOUNDS: tuple[tuple[float, float], ...] = ((-1.0, 1.0), (-1.0, 1.0), (-1.0, 1.0))
+
+# fmt: off
+BOX_CORNERS: np.ndarray = np.array(
+    [(x, y, z) for x in (-1.0, 1.0) for y in (-1.0, 1.0) for z in (-1.0, 1.0)],
+    dtype=np.float32,
+)
+# fmt: on
+
+
+@dataclass
+class CullingStats:
+    total: int = 0
+    visible: int = 0
+    shadow_casters: int = 0
+    # Only non-zero in frames that render the static shadow cache.
+    static_shadow_casters: int = 0
+
+    @property
+    def culled(self) -> int:
+        return self.total - self.visible
+
+
+def get_frustum_planes(
+    m_proj_view: mat4, bounds: tuple[tuple[float, float], ...] = NDC_BOUNDS
+) -> np.ndarray:
+    """
+    Extracts the (6, 4) left, right, bottom, top, near and far planes (a, b, c, d) of the clip
+    space volume, a point is on the inside if a * x + b * y + c * z + d >= 0. Smaller `bounds`
+    give the planes of a part of the volume, for example x_ndc >= x_min turns into the plane
+    row_0 - x_min * row_3.
+
+    https://www.gribb.com/download/Frustum.pdf
+    """
+    (x_min, x_max), (y_min, y_max), (z_min, z_max) = bounds
+    # Transposing the column-major memory gives us the rows of the matrix.
+    rows: np.ndarray = np.frombuffer(m_proj_view.to_bytes(), dtype=np.float32)
+    rows = rows.reshape(4, 4).T
+    planes: np.ndarray = np.array(
+        [
+            rows[0] - x_min * rows[3],
+            x_max * rows[3] - rows[0],
+            rows[1] - y_min * rows[3],
+            y_max * rows[3] - rows[1],
+            rows[2] - z_min * rows[3],
+            z_max * rows[3] - rows[2],
+        ]
+    )
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def transform_bounding_spheres(
+    m_models: np.ndarray, centers: np.ndarray, radii: np.ndarray | float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Moves the local bounding spheres into world space, `centers` and `radii` are either shared by
+    all the objects or given per object. The radius grows with the largest axis scale.
+    """
+    linear: np.ndarray = m_models[:, :3, :3]
+    world_centers: np.ndarray = np.einsum("...i,...ij->...j", centers, linear)
+    world_centers += m_models[:, 3, :3]
+    max_scale: np.ndarray = np.sqrt(np.max(np.sum(linear**2, axis=2), axis=1))
+    return world_centers, radii * max_scale
+
+
+def get_visible_mask(
+    planes: np.ndarray, centers: np.ndarray, radii: np.ndarray
+) -> np.ndarray:
+    """Spheres that are completely behind any of the planes can't be seen."""
+    distances: np.ndarray = centers @ planes[:, :3].T + planes[:, 3]
+    return np.all(distances >= -radii[:, np.newaxis], axis=1)
+
+
+def get_ndc_bounds(
+    m_proj_view: mat4, centers: np.ndarray, radii: np.ndarray
+) -> Optional[tuple[tuple[float, float], ...]]:
+    """
+    The NDC ranges covered by the boxes around the spheres, clamped to the clip space volume.
+    Returns None if any of the spheres reaches behind the center of projection, as the
+    projection of the box wouldn't be bounded by its projected corners anymore.
+    """
+    if len(radii) == 0 or not np.all(np.isfinite(radii)):
+        return None
+
+    matrix: np.ndarray = np.frombuffer(m_proj_view.to_bytes(), dtype=np.float32)
+    matrix = matrix.reshape(4, 4)
+    corners: np.ndarray = (
+        centers[:, np.newaxis, :] + radii[:, np.newaxis, np.newaxis] * BOX_CORNERS
+    ).reshape(-1, 3)
+    clip: np.ndarray = corners @ matrix[:3] + matrix[3]
+    if np.any(clip[:, 3] <= EPS):
+        return None
+
+    ndc: np.ndarray = np.clip(clip[:, :3] / clip[:, 3:], -1.0, 1.0)
+    return tuple(zip(ndc.min(axis=0).tolist(), ndc.max(axis=0).tolist()))
@@ -0,0 +1,45 @@
+from . import *
+
+"""
+The simulation, the physics of the player and the animations of the models, advances in steps of
+a fixed length instead of by the time a frame took, so its results don't depend on the frame rate.
+Every frame the frame time goes into an accumulator and as many whole steps as it holds are run,
+which can be none, one or several of them.
+
+What's left in the accumulator is less than a step, the drawn transforms are interpolated between
+the last two steps by that fraction, otherwise they'd move in steps whenever the simulation runs
+at a lower rate than the rendering. This puts what's drawn up to one step behind the simulation.
+"""
+
+
+class FixedTimestep:
+    def __init__(self, step_ms: float, max_steps: int):
+        self.step_ms: float = step_ms
+        self.max_steps: int = max_steps
+
+        self.accumulator_ms = 0.0
+        # Steps run so far.
+        self.step_count = 0
+        # Fraction of a step that was left in the accumulator by the last `advance`, in [0, 1).
+        self.alpha = 0.0
+        # Frame time that was dropped because it would have taken more than `max_steps` steps.
+        self.dropped_ms = 0.0
+
+    @property
+    def step_s(self) -> float:
+        return self.step_ms * MS_TO_SECOND
+
+    def advance(self, delta_time_ms: float) -> int:
+        """Adds the time the last frame took and returns how many steps to run for it."""
+        self.accumulator_ms += delta_time_ms
+        steps: int = min(int(self.accumulator_ms // self.step_ms), self.max_steps)
+        self.accumulator_ms -= steps * self.step_ms
+        if self.accumulator_ms >= self.step_ms:
+            # Catching up would make the next frames even longer, the spiral of death.
+            kept_ms: float = self.accumulator_ms % self.step_ms
+            self.dropped_ms += self.accumulator_ms - kept_ms
+            self.accumulator_ms = kept_ms
+
+        self.step_count += steps
+        self.alpha = self.accumulator_ms / self.step_ms
+        return steps
@@ -5,50 +5,96 @@ This is the main rendering engine for the project, currently it's also the windo
 but those will be split into seperate parts later on.
 """
 
+import functools
+
+from moderngl import Framebuffer
+
 from . import my_logger, settings
 from .camera import Camera
 from .constants import *
+from .fixed_timestep import FixedTimestep
+from .headless import HeadlessKeys, HeadlessSound
 from .light import Light
 from .mesh import Mesh
 from .my_logger import setup
-from .opengl import setup_opengl
+from .opengl import (
+    create_offscreen_framebuffer,
+    create_standalone_context,
+    setup_opengl,
+)
 from .player_controller import PlayerController
+from .profiling import FrameProfiler
 from .scene import Scene
 from .scene_renderer import SceneRenderer
+from .transform_store import TransformStore
+from .uniform_buffer import FrameUniformBuffer
 
 
 # TODO: Make GraphicsEngine a part of a larger application instead of being the first class object.
 class GraphicsEngine:
-    def __init__(self, scene_id=None):
+    def __init__(
+        self,
+        scene_id=None,
+        headless=False,
+        scene_size: Optional[int] = None,
+        fixed_delta_time: Optional[int] = None,
+    ):
+        """
+        With `headless` there is no window, the frames get rendered into `framebuffer` of a
+        standalone context and there is no input or audio.
+
+        With a `fixed_delta_time` in milliseconds the frames aren't capped at the FPS target and
+        every frame advances the same amount of time, so runs are reproducible.
+        """
         self.logger: Logger = my_logger.setup("GraphicsEngine")
 
+        self.headless: bool = headless
         self.window_size: tuple[int, int] = settings.OpenGL.WINDOW_SIZE
-        self.pg_window = setup_opengl(window_size=self.window_size)
-
-        # Locks mouse into window
-        pg.event.set_grab(True)
-        pg.mouse.set_visible(False)
-
-        self.ctx: mgl.Context = mgl.create_context()
+        if self.headless:
+            # Only needed for the clock, pygame doesn't fail if there is no display or audio.
+            pg.init()
+            self.pg_window = None
+            self.ctx: mgl.Context = create_standalone_context()
+            self.framebuffer: Framebuffer = create_offscreen_framebuffer(
+                self.ctx, self.window_size
+            )
+        else:
+            self.pg_window = setup_opengl(window_size=self.window_size)
+
+            # Locks mouse into window
+            pg.event.set_grab(True)
+            pg.mouse.set_visible(False)
+
+            self.ctx: mgl.Context = mgl.create_context()
+            self.framebuffer: Framebuffer = self.ctx.screen
         self.ctx.enable(flags=mgl.DEPTH_TEST | mgl.CULL_FACE)
+        self.frame_uniforms = FrameUniformBuffer(self.ctx)
 
         self.clock = pg.time.Clock()
+        self.fixed_delta_time: Optional[int] = fixed_delta_time
+        self.profiler = FrameProfiler(
+            ctx=self.ctx if settings.Profiling.GPU_TIMERS else None
+        )
         self.time = 0.0
         self.delta_time = 0
         self.delta_time_s = 0
-
-        # TODO: Set this in setting
-        # TODO: Either include a free-license font or pull from internet, or make the
-        #       font finder more os independent.
-        self.font_face = freetype.Face(settings.UI.FONT_FILEPATH)
-        self.font_face.set_char_size(settings.UI.FONT_CHARSIZE)
+        self.simulation = FixedTimestep(
+            SECOND_TO_MS / settings.Simulation.STEP_RATE,
+            settings.Simulation.MAX_STEPS_PER_FRAME,
+        )
+        # The transforms of all models, see `transform_store.py`.
+        self.transforms = TransformStore(self.simulation)
 
         self.light = Light()
+        self.frame_uniforms.write_light(self.light)
         self.camera = Camera(
             self,
         )
         self.mesh = Mesh(self)
-        self.scene = Scene(self, scene_id=scene_id)
+        self.scene = Scene(self, scene_id=scene_id, scene_size=scene_size)
+        if self.fixed_delta_time is not None:
+            # Reproducible runs have to render the same frames, with all the assets loaded.
+            self.mesh.streamer.finish()
         self.scene_renderer = SceneRenderer(self)
 
         self.is_running = True
@@ -69,16 +115,36 @@ class GraphicsEngine:
         self.player_controller = PlayerController(self)
 
         # TODO: Once we have more sounds structure this better
-        self.sound_state_transition = pygame.mixer.Sound(
-            os.path.join(settings.Folders.DATA_SOUND, "state_transition.wav")
-        )
-        self.sound_screenshot = pygame.mixer.Sound(
-            os.path.join(settings.Folders.DATA_SOUND, "screenshot.wav")
-        )
+        self.sound_state_transition = self.load_sound("state_transition.wav")
+        self.sound_screenshot = self.load_sound("screenshot.wav")
 
         self.screenshot_prefix = None
 
+    # TODO: Set this in setting
+    # TODO: Either include a free-license font or pull from internet, or make the
+    #       font finder more os independent.
+    @functools.cached_property
+    def font_face(self) -> "freetype.Face":
+        """Only loaded once some UI text needs it."""
+        font_face = freetype.Face(settings.UI.FONT_FILEPATH)
+        font_face.set_char_size(settings.UI.FONT_CHARSIZE)
+        return font_face
+
+    def load_sound(self, filename: str) -> pygame.mixer.Sound | HeadlessSound:
+        if self.headless:
+            return HeadlessSound()
+        return pygame.mixer.Sound(os.path.join(settings.Folders.DATA_SOUND, filename))
+
+    def get_pressed_keys(self) -> pg.key.ScancodeWrapper | HeadlessKeys:
+        if self.headless:
+            return HeadlessKeys()
+        return pg.key.get_pressed()
+
     def check_events(self) -> None:
+        # Without a window there are no events.
+        if self.headless:
+            return
+
         for event in pg.event.get():
             match event.type:
                 case pg.QUIT:
@@ -156,7 +222,7 @@ class GraphicsEngine:
     # being synced with the rendering pipeline is okay for now.
     def render(self) -> None:
         # This should always be covered
-        self.ctx.clear(color=settings.Colors.MISSING_TEXTURE)
+        self.framebuffer.clear(color=settings.Colors.MISSING_TEXTURE)
 
         self.scene_renderer.render()
 
@@ -164,39 +230,80 @@ class GraphicsEngine:
             self.take_screenshot()
             self.take_screenshot_after_render = False
 
-        pg.display.flip()
+        with self.profiler.stage("flip"):
+            if self.headless:
+                # Nothing to present, waits for the GPU instead like a buffer swap would.
+                self.ctx.finish()
+            else:
+                pg.display.flip()
 
     def get_time(self) -> None:
         self.time = pg.time.get_ticks() * MS_TO_SECOND
 
+    def update(self) -> None:
+        with self.profiler.stage("input"):
+            self.get_time()
+            self.check_events()
+
+            match self.player_controller_mode:
+                case PLAYER_CONTROLLER_MODE.FLOATING_CAMERA:
+                    self.camera.move()
+                case PLAYER_CONTROLLER_MODE.FPS:
+                    self.player_controller.move()
+                case PLAYER_CONTROLLER_MODE.MENU:
+                    pass
+                case _:
+                    raise NotImplementedError
+
+        with self.profiler.stage("streaming"):
+            self.mesh.update()
+
+        with self.profiler.stage("simulation"):
+            for _ in range(self.simulation.advance(self.delta_time)):
+                self.fixed_update()
+
+        with self.profiler.stage("camera.update"):
+            self.camera.update()
+            self.player_controller.update()
+
+    def fixed_update(self) -> None:
+        """A single step of the simulation, see `fixed_timestep.py`."""
+        self.player_controller.fixed_update()
+        self.scene.fixed_update()
+
+    @property
+    def simulation_alpha(self) -> float:
+        """How far the drawn transforms are between the last two simulation steps."""
+        return self.simulation.alpha if settings.Simulation.INTERPOLATION else 1.0
+
     def pre_run(self) -> None:
         self.camera.activate_recording(5 * SECOND_TO_MS)
 
     def iteration(self) -> None:
-        self.get_time()
-        self.check_events()
-
-        match self.player_controller_mode:
-            case PLAYER_CONTROLLER_MODE.FLOATING_CAMERA:
-                self.camera.move()
-            case PLAYER_CONTROLLER_MODE.FPS:
-                self.player_controller.move()
-            case PLAYER_CONTROLLER_MODE.MENU:
-                pass
-            case _:
-                raise NotImplementedError
-
-        self.camera.update()
-        self.player_controller.update()
-
-        self.render()
-
-        self.delta_time: int = self.clock.tick(settings.OpenGL.FPS_TARGET)
+        with self.profiler.stage("frame"):
+            self.update()
+            self.render()
+
+        if self.fixed_delta_time is None:
+            self.delta_time: int = self.clock.tick(settings.OpenGL.FPS_TARGET)
+        else:
+            self.delta_time: int = self.fixed_delta_time
         self.delta_time_s: float = self.delta_time * MS_TO_SECOND
 
         self.camera_projection_has_changed = False
 
         self.frame_counter += 1
+        if self.frame_counter == 1:
+            # Everything the first frame needed is built by now, see `lazy_resources.py`.
+            self.logger.info(
+                f"Built for the first frame:\n{self.mesh.vao.get_report()}"
+            )
+
+        self.profiler.end_frame()
+        log_interval: int = settings.Profiling.LOG_INTERVAL
+        if log_interval > 0 and self.frame_counter % log_interval == 0:
+            self.logger.info(f"Timings of the last {log_interval} frames:")
+            self.profiler.log_summary(self.logger)
 
     def run(self) -> None:
         while self.is_running:
@@ -204,6 +311,11 @@ class GraphicsEngine:
 
     def __del__(self) -> None:
         self.logger.info("Cleaning up Graphics Enging.")
+        try:
+            # Releases the vaos the scene acquired, see `lazy_resources.py`.
+            self.scene.destroy()
+        except AttributeError:
+            self.logger.warning("Didn't have a scene when getting destroyed.")
         try:
             self.mesh.destroy()
         except AttributeError:
@@ -214,9 +326,8 @@ class GraphicsEngine:
         my_logger.cleanup(self.logger)
 
     def take_screenshot(self) -> None:
-        screen: pg.Surface = pg.display.get_surface()
         screen_surf: pg.Surface = pygame.image.fromstring(
-            self.ctx.screen.read(), screen.get_size(), "RGB", True
+            self.framebuffer.read(), self.window_size, "RGB", True
         )
 
         filename = dt.datetime.now(dt.timezone.utc).strftime(
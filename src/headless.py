@@ -0,0 +1,21 @@
+from . import *
+
+"""
+Stand-ins for the parts of pygame that need a window or an audio device. In headless mode the
+`GraphicsEngine` renders into an offscreen framebuffer of a standalone context instead, so the
+whole render loop can run on machines without a display or a GPU, like CI runners.
+"""
+
+
+class HeadlessKeys:
+    """Takes the place of `pg.key.get_pressed()`, no key is ever pressed."""
+
+    def __getitem__(self, key: int) -> bool:
+        return False
+
+
+class HeadlessSound:
+    """Takes the place of `pygame.mixer.Sound`, playing it does nothing."""
+
+    def play(self) -> None:
+        pass
@@ -0,0 +1,209 @@
+from . import *
+
+"""
+Instead of writing the uniforms and issuing a draw call for every single object, all objects that
+share a mesh and a texture get drawn with one instanced draw call, with their model matrices
+streamed into a per-instance buffer every frame. The model matrices are sliced out of the
+transform store, see `transform_store.py`, which already keeps them in the layout of the buffer.
+"""
+
+from moderngl import Buffer, Context, Program, Texture, VertexArray
+
+from .vbo import VertexBufferObject
+
+if TYPE_CHECKING:
+    from .model import Model
+
+INSTANCE_ATTRIBUTE = "in_instance_model"
+INSTANCE_FORMAT = "16f/i"
+MAT4_NBYTES = 16 * 4
+
+
+class InstanceBuffer:
+    """
+    Model matrices of the instances drawn by one pass at one level of detail, the vao is created
+    from the mesh VBO and the instance buffer so it has to be recreated whenever the buffer grows.
+    """
+
+    def __init__(
+        self,
+        ctx: Context,
+        program: Program,
+        vbo: VertexBufferObject,
+        lod_range: tuple[int, int] = (0, -1),
+    ):
+        self.ctx: Context = ctx
+        self.program: Program = program
+        self.vbo: VertexBufferObject = vbo
+        # First vertex and vertex count of the level of detail, see `VertexBufferObject.lod_ranges`.
+        self.first, self.vertices = lod_range
+
+        self.capacity = 0
+        self.instance_count = 0
+        self.buffer: Optional[Buffer] = None
+        self.vao: Optional[VertexArray] = None
+
+    def reserve(self, instance_count: int) -> None:
+        """Makes sure the instance buffer can hold that many model matrices."""
+        if instance_count <= self.capacity:
+            return
+
+        self.release()
+        self.capacity = max(instance_count, 2 * self.capacity)
+        self.buffer = self.ctx.buffer(reserve=self.capacity * MAT4_NBYTES)
+        self.vao = self.ctx.vertex_array(
+            self.program,
+            [
+                *self.vbo.get_vao_content(),
+                (self.buffer, INSTANCE_FORMAT, INSTANCE_ATTRIBUTE),
+            ],
+            index_buffer=self.vbo.ibo,
+            index_element_size=4,
+            skip_errors=True,
+        )
+
+    def write(self, m_models: np.ndarray) -> None:
+        self.instance_count = len(m_models)
+        if self.instance_count == 0:
+            return
+
+        self.reserve(self.instance_count)
+        # Orphaning lets the driver hand out fresh memory instead of waiting for last frame's draw.
+        self.buffer.orphan()
+        self.buffer.write(np.ascontiguousarray(m_models, dtype=np.float32))
+
+    def render(self) -> None:
+        if self.instance_count == 0:
+            return
+        self.vao.render(
+            vertices=self.vertices, first=self.first, instances=self.instance_count
+        )
+
+    def release(self) -> None:
+        for resource in (self.vao, self.buffer):
+            if resource is not None:
+                resource.release()
+        self.vao, self.buffer = None, None
+        self.capacity = 0
+
+
+class InstanceBatch:
+    """
+    All the objects that are drawn with the same VBO and texture. The main pass and every shadow
+    cascade have their own instance buffers as they get culled against different volumes, and
+    each of them has one buffer per level of detail of the VBO.
+    """
+
+    def __init__(
+        self,
+        ctx: Context,
+        program: Program,
+        shadow_program: Program,
+        vbo: VertexBufferObject,
+        texture: Texture,
+        cascade_count: int = 1,
+    ):
+        self.vbo: VertexBufferObject = vbo
+        self.texture: Texture = texture
+
+        self.objects: list[Model] = []
+        # The rows of the objects in `app.transforms`.
+        self.transform_indices: np.ndarray = np.zeros(0, dtype=np.int64)
+        # Level of detail each of the objects was drawn at last frame.
+        self.levels_of_detail: np.ndarray = np.zeros(0, dtype=np.int32)
+
+        def create_levels(program: Program) -> list[InstanceBuffer]:
+            return [
+                InstanceBuffer(ctx, program, vbo, lod_range)
+                for lod_range in vbo.lod_ranges
+            ]
+
+        self.instances: list[InstanceBuffer] = create_levels(program)
+        self.shadow_instances: list[list[InstanceBuffer]] = [
+            create_levels(shadow_program) for _ in range(cascade_count)
+        ]
+        self.static_shadow_instances: list[list[InstanceBuffer]] = [
+            create_levels(shadow_program) for _ in range(cascade_count)
+        ]
+
+    @property
+    def level_count(self) -> int:
+        return len(self.instances)
+
+    def add(self, obj: "Model") -> None:
+        self.objects.append(obj)
+        self.transform_indices = np.append(self.transform_indices, obj.transform_index)
+        self.levels_of_detail = np.append(self.levels_of_detail, np.int32(0))
+
+    @staticmethod
+    def write_levels(
+        instances: list[InstanceBuffer],
+        m_models: np.ndarray,
+        levels_of_detail: Optional[np.ndarray],
+        min_level: int = 0,
+    ) -> None:
+        """
+        Writes the model matrices into the buffers of their levels but at least `min_level`, the
+        finest allowed one without levels.
+        """
+        if levels_of_detail is None:
+            levels_of_detail = np.zeros(len(m_models), dtype=np.int32)
+        levels_of_detail = np.maximum(levels_of_detail, min_level)
+        for level, level_instances in enumerate(instances):
+            level_instances.write(m_models[levels_of_detail == level])
+
+    def write(
+        self,
+        m_models: np.ndarray,
+        shadow_m_models: Optional[list[np.ndarray]] = None,
+        levels_of_detail: Optional[np.ndarray] = None,
+        shadow_levels_of_detail: Optional[list[np.ndarray]] = None,
+    ) -> None:
+        """
+        Uploads the (N, 4, 4) model matrices, they are drawn until the next write. Without
+        `shadow_m_models`, one array per cascade, every cascade draws the same instances as the
+        main pass. The levels of detail are given for each of the matrices.
+        """
+        self.write_levels(self.instances, m_models, levels_of_detail)
+        shadow_lod: int = self.vbo.shadow_lod
+        for cascade, instances in enumerate(self.shadow_instances):
+            if shadow_m_models is None:
+                self.write_levels(instances, m_models, levels_of_detail, shadow_lod)
+            else:
+                self.write_levels(
+                    instances,
+                    shadow_m_models[cascade],
+                    (
+                        None
+                        if shadow_levels_of_detail is None
+                        else shadow_levels_of_detail[cascade]
+                    ),
+                    shadow_lod,
+                )
+
+    def write_static_shadow(self, m_models: list[np.ndarray]) -> None:
+        """
+        Uploads the static shadow casters of every cascade, only needed when the shadow cache
+        gets rebuilt. They are drawn at the finest level of the shadows, the cache outlives the
+        level the objects have at the time it's rebuilt.
+        """
+        for instances, cascade_m_models in zip(self.static_shadow_instances, m_models):
+            self.write_levels(instances, cascade_m_models, None, self.vbo.shadow_lod)
+
+    def render(self) -> None:
+        if all(instances.instance_count == 0 for instances in self.instances):
+            return
+        self.texture.use(location=0)
+        for instances in self.instances:
+            instances.render()
+
+    def render_shadow(self, cascade: int = 0) -> None:
+        for instances in self.shadow_instances[cascade]:
+            instances.render()
+
+    def destroy(self) -> None:
+        for level_instances in (
+            [self.instances] + self.shadow_instances + self.static_shadow_instances
+        ):
+            for instances in level_instances:
+                instances.release()
@@ -0,0 +1,92 @@
+from . import *
+
+"""
+Maps of OpenGL resources, like the programs, VBOs and vaos, that only get built the first time
+they're accessed, so a scene only pays for the resources it actually uses.
+
+Whatever holds on to a resource across frames `acquire`s it and `release`s it once it's done, the
+resource gets released along with its last user. Resources that are only looked up, without ever
+being acquired, stay built until the map gets destroyed.
+"""
+
+import time
+from typing import Generic
+
+T = TypeVar("T")
+
+
+class LazyResources(Generic[T]):
+    def __init__(
+        self,
+        kind: str,
+        names: Iterable[str],
+        build: Callable[[str], T],
+        release: Callable[[str, T], None],
+    ):
+        """`build` and `release` get the name of the resource along with it."""
+        self.kind: str = kind
+        self.names: list[str] = list(names)
+        self.build: Callable[[str], T] = build
+        self.release_resource: Callable[[str, T], None] = release
+
+        self.resources: dict[str, T] = {}
+        self.users: dict[str, int] = {}
+        # Milliseconds each of the resources took to build, for the startup report.
+        self.build_ms: dict[str, float] = {}
+
+    def __getitem__(self, name: str) -> T:
+        resource: Optional[T] = self.resources.get(name)
+        if resource is None:
+            if name not in self.names:
+                raise KeyError(f"There is no {self.kind} called {name=}.")
+            start: float = time.perf_counter()
+            resource = self.build(name)
+            self.build_ms[name] = (time.perf_counter() - start) * SECOND_TO_MS
+            self.resources[name] = resource
+        return resource
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def get_built(self, name: str) -> Optional[T]:
+        """The resource if it has been built, without building it."""
+        return self.resources.get(name)
+
+    def acquire(self, name: str) -> T:
+        resource: T = self[name]
+        self.users[name] = self.users.get(name, 0) + 1
+        return resource
+
+    def release(self, name: str) -> None:
+        self.users[name] -= 1
+        if self.users[name] == 0:
+            del self.users[name]
+            self.release_resource(name, self.resources.pop(name))
+
+    def rebuild(self, name: str) -> None:
+        """
+        Replaces a built resource with a freshly built one, the users stay the same. The old one
+        is only released afterwards, so whatever both of them depend on stays built.
+        """
+        resource: Optional[T] = self.resources.pop(name, None)
+        if resource is not None:
+            self[name]
+            self.release_resource(name, resource)
+
+    def get_report(self) -> str:
+        """Which of the resources are built, with their build times and users."""
+        built: list[str] = [
+            f"{name} ({self.build_ms.get(name, 0.0):.1f}ms, {self.users.get(name, 0)} users)"
+            for name in self.names
+            if name in self.resources
+        ]
+        return (
+            f"{len(self.resources)}/{len(self.names)} {self.kind}s built: "
+            + ", ".join(built)
+        )
+
+    def destroy(self) -> None:
+        for name, resource in self.resources.items():
+            self.release_resource(name, resource)
+        self.resources = {}
+        self.users = {}
@@ -0,0 +1,50 @@
+from . import *
+
+"""
+The generated meshes like the sphere and the cylinder are tessellated at several levels of detail,
+which sit one after another in the same VBO, see `vbo.LevelOfDetailVBO`. Every frame each object
+picks the level by how large its bounding sphere appears on the screen, so far away objects only
+cost a fraction of the vertices.
+
+The levels switch with some hysteresis, otherwise an object right at a threshold would flicker
+between two levels while the camera moves slightly.
+"""
+
+from . import settings
+
+
+def get_screen_sizes(
+    centers: np.ndarray, radii: np.ndarray, camera_position: vec3, proj_scale: float
+) -> np.ndarray:
+    """
+    Fraction of the screen height the bounding spheres cover, `proj_scale` is the vertical scale
+    `m_proj[1][1]` of the perspective projection, i.e. `1 / tan(fov_y / 2)`.
+    """
+    distances: np.ndarray = np.linalg.norm(centers - np.array(camera_position), axis=1)
+    # Inside of the sphere it covers the whole screen.
+    return np.where(
+        distances > radii, proj_scale * radii / np.maximum(distances, EPS), np.inf
+    )
+
+
+def select_levels_of_detail(
+    screen_sizes: np.ndarray,
+    previous_levels: np.ndarray,
+    thresholds: Iterable[float] = settings.LevelOfDetail.SCREEN_SIZES,
+    hysteresis: float = settings.LevelOfDetail.HYSTERESIS,
+) -> np.ndarray:
+    """
+    Level 0 is the finest one, an object drops to level i once its screen size falls below the
+    i-th of the descending `thresholds`. It only changes its level once the screen size moved past
+    a threshold by more than the `hysteresis` fraction of it.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+    screen_sizes = screen_sizes[:, np.newaxis]
+    # Finest and coarsest level the screen size allows within the hysteresis band.
+    finest: np.ndarray = np.count_nonzero(
+        screen_sizes < thresholds * (1.0 - hysteresis), axis=1
+    )
+    coarsest: np.ndarray = np.count_nonzero(
+        screen_sizes < thresholds * (1.0 + hysteresis), axis=1
+    )
+    return np.clip(previous_levels, finest, coarsest).astype(np.int32)
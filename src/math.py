@@ -129,3 +129,153 @@ def mat4_x_vec3_to_vec3(M: mat4, v: vec3) -> vec3:
     product: vec4 = M @ v_extended
     product_restricted = vec3(product)
     return product
+
+
+###
+# Batched
+###
+# NumPy versions of the functions above that work on N values at once, the vectors come as (N, 3)
+# arrays and the matrices as (N, 4, 4) arrays. The matrices are indexed like `np.array(m)` of a
+# glm matrix, i.e. `m[n, row, column]`, which is the transpose of glm's column-major memory
+# layout, see `transform_store.py` for the layout that gets uploaded.
+
+
+def translate_batched(vs: "np.ndarray") -> "np.ndarray":
+    """The matrices T[n] such that T[n] @ (p, 1) = (p + vs[n], 1)."""
+    matrices: np.ndarray = np.zeros((len(vs), 4, 4))
+    matrices[:, [0, 1, 2, 3], [0, 1, 2, 3]] = 1.0
+    matrices[:, :3, 3] = vs
+    return matrices
+
+
+def scale_batched(vs: "np.ndarray") -> "np.ndarray":
+    """The matrices T[n] such that T[n] @ (p, 1) = (vs[n] * p, 1)."""
+    matrices: np.ndarray = np.zeros((len(vs), 4, 4))
+    matrices[:, [0, 1, 2], [0, 1, 2]] = vs
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def rotate_batched(angles: "np.ndarray", axes: "np.ndarray") -> "np.ndarray":
+    """Like `glm.rotate(angle, axis)` for every angle and axis, the axes get normalized."""
+    axes = axes / np.linalg.norm(axes, axis=-1, keepdims=True)
+    x, y, z = np.broadcast_to(axes, (len(angles), 3)).T
+    c, s = np.cos(angles), np.sin(angles)
+    t: np.ndarray = 1.0 - c
+    matrices: np.ndarray = np.zeros((len(angles), 4, 4))
+    # fmt: off
+    matrices[:, 0, :3] = np.stack([t * x * x + c,     t * x * y - s * z, t * x * z + s * y], axis=1)
+    matrices[:, 1, :3] = np.stack([t * x * y + s * z, t * y * y + c,     t * y * z - s * x], axis=1)
+    matrices[:, 2, :3] = np.stack([t * x * z - s * y, t * y * z + s * x, t * z * z + c    ], axis=1)
+    # fmt: on
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def get_axis_rotation_matrix_batched(angles: "np.ndarray") -> "np.ndarray":
+    """
+    Same as `get_axis_rotation_matrix` for every row of angles, which rotates around x first and
+    whose rotation around y turns the other way than `glm.rotate`.
+    """
+    rotations: list[np.ndarray] = [
+        rotate_batched(sign * angles[:, i], axis)
+        for i, (sign, axis) in enumerate(zip((1.0, -1.0, 1.0), np.eye(3)))
+    ]
+    return rotations[2] @ rotations[1] @ rotations[0]
+
+
+def rotate_xyz_batched(angles: "np.ndarray") -> "np.ndarray":
+    """
+    The rotations that `glm.rotate` applies for the x, then the y and then the z angle, like in
+    `BaseModel.get_initial_model_matrix`, which means R = R_x @ R_y @ R_z.
+    """
+    c_x, c_y, c_z = np.cos(angles).T
+    s_x, s_y, s_z = np.sin(angles).T
+    matrices: np.ndarray = np.zeros((len(angles), 4, 4))
+    matrices[:, 0, 0] = c_y * c_z
+    matrices[:, 0, 1] = -c_y * s_z
+    matrices[:, 0, 2] = s_y
+    matrices[:, 1, 0] = s_x * s_y * c_z + c_x * s_z
+    matrices[:, 1, 1] = c_x * c_z - s_x * s_y * s_z
+    matrices[:, 1, 2] = -s_x * c_y
+    matrices[:, 2, 0] = s_x * s_z - c_x * s_y * c_z
+    matrices[:, 2, 1] = c_x * s_y * s_z + s_x * c_z
+    matrices[:, 2, 2] = c_x * c_y
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def get_model_matrix_batched(
+    positions: "np.ndarray", rotations: "np.ndarray", scales: "np.ndarray"
+) -> "np.ndarray":
+    """Same as `BaseModel.get_initial_model_matrix`, T @ R_x @ R_y @ R_z @ S."""
+    matrices: np.ndarray = rotate_xyz_batched(rotations)
+    matrices[:, :3, :3] *= scales[:, np.newaxis, :]
+    matrices[:, :3, 3] = positions
+    return matrices
+
+
+def cross_batched(ps: "np.ndarray", qs: "np.ndarray") -> "np.ndarray":
+    s1: np.ndarray = ps[:, 1] * qs[:, 2] - ps[:, 2] * qs[:, 1]
+    s2: np.ndarray = ps[:, 2] * qs[:, 0] - ps[:, 0] * qs[:, 2]
+    s3: np.ndarray = ps[:, 0] * qs[:, 1] - ps[:, 1] * qs[:, 0]
+    return np.stack([s1, s2, s3], axis=1)
+
+
+def get_line_to_line_transformation_batched(
+    p1: "np.ndarray", p2: "np.ndarray", q1: "np.ndarray", q2: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Same as `get_line_to_line_transformation` for every row, T[n] @ p1[n] = q1[n] and
+    T[n] @ p2[n] = q2[n]. Like it, lines pointing in opposite directions don't get rotated.
+    """
+    dist_p: np.ndarray = np.linalg.norm(p2 - p1, axis=1)
+    dist_q: np.ndarray = np.linalg.norm(q2 - q1, axis=1)
+    assert np.all(dist_p > EPS), "The points have to be different"
+    assert np.all(dist_q > EPS), "The points have to be different"
+
+    direction_p: np.ndarray = (p2 - p1) / dist_p[:, np.newaxis]
+    direction_q: np.ndarray = (q2 - q1) / dist_q[:, np.newaxis]
+
+    rotation_axes: np.ndarray = cross_batched(direction_p, direction_q)
+    is_rotated: np.ndarray = np.linalg.norm(rotation_axes, axis=1) >= EPS
+    rotations: np.ndarray = np.broadcast_to(np.eye(4), (len(p1), 4, 4)).copy()
+    rotation_angles: np.ndarray = np.arccos(
+        np.clip(np.sum(direction_p * direction_q, axis=1), -1.0, 1.0)
+    )
+    rotations[is_rotated] = rotate_batched(
+        rotation_angles[is_rotated], rotation_axes[is_rotated]
+    )
+
+    scaling_factors: np.ndarray = (dist_q / dist_p)[:, np.newaxis]
+    return (
+        translate_batched(q1)
+        @ rotations
+        @ scale_batched(np.repeat(scaling_factors, 3, axis=1))
+        @ translate_batched(-p1)
+    )
+
+
+def get_normal_matrices(m_models: "np.ndarray") -> "np.ndarray":
+    """
+    The (N, 3, 3) inverse transposes of the upper left 3x3 of the model matrices, which move
+    normals into world space, what `mat3(transpose(inverse(m_model)))` computes in the shaders.
+
+    Its columns are the cross products of the columns of the 3x3, divided by its determinant.
+    """
+    a0, a1, a2 = m_models[:, :3, 0], m_models[:, :3, 1], m_models[:, :3, 2]
+    cofactors: np.ndarray = np.stack(
+        [cross_batched(a1, a2), cross_batched(a2, a0), cross_batched(a0, a1)], axis=2
+    )
+    determinants: np.ndarray = np.sum(a0 * cofactors[:, :, 0], axis=1)
+    return cofactors / determinants[:, np.newaxis, np.newaxis]
+
+
+def mat4_x_vec4_batched(ms: "np.ndarray", vs: "np.ndarray") -> "np.ndarray":
+    """ms[n] @ vs[n], either of them can also be a single matrix or vector."""
+    return np.einsum("...ij,...j->...i", ms, vs)
+
+
+def mat4_x_vec3_batched(ms: "np.ndarray", vs: "np.ndarray") -> "np.ndarray":
+    """vec3(ms[n] @ vec4(vs[n], 1)) like `mat4_x_vec3_to_vec3`, without the division by w."""
+    return np.einsum("...ij,...j->...i", ms[..., :3, :3], vs) + ms[..., :3, 3]
@@ -4,6 +4,8 @@ from . import *
 
 import typing
 
+from .asset_streaming import AssetStreamer
+from .settings import Streaming
 from .texture import TextureHandler
 from .vao import VertexArrayObject
 
@@ -14,9 +16,17 @@ if typing.TYPE_CHECKING:
 class Mesh:
     def __init__(self, app: "GraphicsEngine"):
         self.app: GraphicsEngine = app
-        self.vao = VertexArrayObject(app.ctx)
-        self.texture = TextureHandler(app)
+        self.streamer = AssetStreamer(Streaming.WORKERS)
+        self.vao = VertexArrayObject(app.ctx, self.streamer)
+        self.texture = TextureHandler(app, self.streamer)
+        if not Streaming.ENABLED:
+            self.streamer.finish()
+
+    def update(self) -> None:
+        """Uploads the assets that finished loading in the background, see `asset_streaming.py`."""
+        self.streamer.update(Streaming.UPLOAD_BUDGET_MS)
 
     def destroy(self) -> None:
-        self.vao.destroy
+        self.streamer.shutdown()
+        self.vao.destroy()
         self.texture.destroy()
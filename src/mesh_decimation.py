@@ -0,0 +1,405 @@
+from . import *
+
+"""
+Offline mesh simplification with quadric error metrics, reduces a triangle mesh given as
+non-indexed interleaved vertex data to a fraction of its triangles.
+
+Every vertex accumulates the quadrics of the planes of its triangles, collapsing an edge moves one
+of its vertices onto the other, the error of that is the sum of the squared distances of the new
+position to the planes of both vertices.
+
+https://www.cs.cmu.edu/~./garland/Papers/quadrics.pdf
+
+Vertices are only ever moved onto one of their neighbours and keep the attributes of that one, so
+no normals or texture coordinates get interpolated. Positions with more than one combination of
+attributes lie on a UV seam or a hard edge of the normals, those and the vertices on the boundary
+of the mesh never move, which keeps the seams and the silhouette of open meshes intact.
+
+The edges get collapsed in passes, each pass collapses the cheapest edges whose neighbourhoods
+don't overlap, so they can be checked and applied together with NumPy.
+
+Usage:
+    python -m src.mesh_decimation
+        Caches the decimated levels of the cat of `settings.LevelOfDetail.CAT_LEVELS`, see
+        `vbo.Cat`.
+"""
+
+import time
+from dataclasses import asdict
+
+from . import settings
+from .asset_cache import load_derived_array_with_attributes
+from .constants import VBO
+
+# Collapses that turn the normal of one of the remaining triangles by more than the arccos of
+# this (about 37 degrees) are rejected, it keeps triangles from folding over across passes.
+MIN_NORMAL_COS = 0.8
+# Only the cheaper part of the collapses is considered in each pass, the passes are greedy so
+# without this expensive collapses would happen while cheaper ones are still left.
+PASS_FRACTION = 0.5
+
+
+@dataclass
+class DecimationStats:
+    triangles_before: int
+    triangles_after: int
+    passes: int
+    seconds: float
+
+
+def weld(
+    vertex_data: np.ndarray, vertex_size: int, position_offset: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merges the identical vertices of the non-indexed vertex data. Returns the distinct vertices
+    (W, vertex_size), the positions (P, 3), the position index of each vertex (W,) and the
+    triangles as vertex indices (T, 3).
+    """
+    vertices: np.ndarray = np.ascontiguousarray(vertex_data.reshape(-1, vertex_size))
+    wedges, triangles = np.unique(vertices, axis=0, return_inverse=True)
+    positions, wedge_positions = np.unique(
+        wedges[:, position_offset : position_offset + 3], axis=0, return_inverse=True
+    )
+    return (
+        wedges,
+        positions.astype(np.float64),
+        wedge_positions.reshape(-1),
+        triangles.reshape(-1, 3),
+    )
+
+
+def get_vertex_quadrics(positions: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """(P, 4, 4) sums of the area weighted quadrics of the planes of the triangles at each vertex."""
+    corners: np.ndarray = positions[triangles]
+    normals: np.ndarray = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    )
+    double_areas: np.ndarray = np.linalg.norm(normals, axis=1)
+    normals /= np.maximum(double_areas, np.finfo(np.float64).tiny)[:, np.newaxis]
+    planes: np.ndarray = np.concatenate(
+        [normals, -np.sum(normals * corners[:, 0], axis=1, keepdims=True)], axis=1
+    )
+    plane_quadrics: np.ndarray = (0.5 * double_areas)[:, np.newaxis] * (
+        planes[:, :, np.newaxis] * planes[:, np.newaxis, :]
+    ).reshape(-1, 16)
+
+    quadrics: np.ndarray = np.zeros((len(positions), 16))
+    for corner in range(3):
+        for component in range(16):
+            quadrics[:, component] += np.bincount(
+                triangles[:, corner],
+                weights=plane_quadrics[:, component],
+                minlength=len(positions),
+            )
+    return quadrics.reshape(-1, 4, 4)
+
+
+def get_locked_positions(
+    wedge_positions: np.ndarray, position_count: int, triangles: np.ndarray
+) -> np.ndarray:
+    """Positions on a seam of the attributes or on the boundary of the mesh."""
+    locked: np.ndarray = np.bincount(wedge_positions, minlength=position_count) > 1
+
+    edges: np.ndarray = np.sort(
+        np.concatenate(
+            [triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]
+        ),
+        axis=1,
+    ).astype(np.int64)
+    keys, counts = np.unique(
+        edges[:, 0] * position_count + edges[:, 1], return_counts=True
+    )
+    boundary: np.ndarray = keys[counts == 1]
+    locked[boundary // position_count] = True
+    locked[boundary % position_count] = True
+    return locked
+
+
+def get_directed_edges(tri_positions: np.ndarray, position_count: int) -> np.ndarray:
+    """(E, 2) edges of the triangles in both directions, sorted by their first position."""
+    edges: np.ndarray = np.concatenate(
+        [tri_positions[:, [i, j]] for i in range(3) for j in range(3) if i != j]
+    ).astype(np.int64)
+    # Sorting the keys is a lot faster than `np.unique(..., axis=0)`.
+    keys: np.ndarray = np.unique(edges[:, 0] * position_count + edges[:, 1])
+    return np.stack([keys // position_count, keys % position_count], axis=1)
+
+
+def get_neighbours(
+    edges: np.ndarray, position_count: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Adjacency of the positions in compressed sparse row form, (starts, neighbours)."""
+    starts: np.ndarray = np.zeros(position_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edges[:, 0], minlength=position_count), out=starts[1:])
+    return starts, edges[:, 1]
+
+
+def get_triangles_around(
+    sources: np.ndarray, tri_positions: np.ndarray, position_count: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """For every triangle touching one of the sources, the index of the source and the triangle."""
+    corner_positions: np.ndarray = tri_positions.reshape(-1)
+    order: np.ndarray = np.argsort(corner_positions, kind="stable")
+    counts: np.ndarray = np.bincount(corner_positions, minlength=position_count)
+    starts: np.ndarray = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    source_counts: np.ndarray = counts[sources]
+    source_indices: np.ndarray = np.repeat(np.arange(len(sources)), source_counts)
+    local: np.ndarray = np.arange(len(source_indices)) - np.repeat(
+        np.cumsum(source_counts) - source_counts, source_counts
+    )
+    corners: np.ndarray = order[starts[sources][source_indices] + local]
+    return source_indices, corners // 3
+
+
+def select_independent(
+    sources: np.ndarray,
+    neighbour_starts: np.ndarray,
+    neighbours: np.ndarray,
+    position_count: int,
+    limit: int,
+) -> np.ndarray:
+    """
+    Greedily picks collapses in the given order whose one-rings don't overlap, so each of them only
+    touches triangles no other one touches. Returns the indices of the picked collapses.
+    """
+    used: bytearray = bytearray(position_count)
+    starts: list[int] = neighbour_starts.tolist()
+    neighbour_list: list[int] = neighbours.tolist()
+    selected: list[int] = []
+    for index, source in enumerate(sources.tolist()):
+        if used[source]:
+            continue
+        ring: list[int] = neighbour_list[starts[source] : starts[source + 1]]
+        if any(used[position] for position in ring):
+            continue
+        used[source] = 1
+        for position in ring:
+            used[position] = 1
+        selected.append(index)
+        if len(selected) >= limit:
+            break
+    return np.array(selected, dtype=np.int64)
+
+
+def get_valid_collapses(
+    sources: np.ndarray,
+    targets: np.ndarray,
+    positions: np.ndarray,
+    triangles: np.ndarray,
+    tri_positions: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Checks that none of the remaining triangles around the sources flips and that the triangles
+    on the collapsed edge agree on the attributes of the target. Returns the mask of the valid
+    collapses and the vertex each source vertex gets replaced with.
+    """
+    source_indices, around = get_triangles_around(
+        sources, tri_positions, len(positions)
+    )
+    around_positions: np.ndarray = tri_positions[around]
+    on_edge: np.ndarray = np.any(
+        around_positions == targets[source_indices, np.newaxis], axis=1
+    )
+
+    # Target vertex of the collapsed triangles, all of them have to use the same one.
+    edge_corners: np.ndarray = np.argmax(
+        around_positions[on_edge] == targets[source_indices[on_edge], np.newaxis],
+        axis=1,
+    )
+    edge_wedges: np.ndarray = triangles[around[on_edge], edge_corners]
+    edge_sources: np.ndarray = source_indices[on_edge]
+    lowest: np.ndarray = np.full(len(sources), np.iinfo(np.int64).max)
+    highest: np.ndarray = np.full(len(sources), -1)
+    np.minimum.at(lowest, edge_sources, edge_wedges)
+    np.maximum.at(highest, edge_sources, edge_wedges)
+    valid: np.ndarray = (highest >= 0) & (lowest == highest)
+
+    # The remaining triangles get the source replaced by the target.
+    kept_sources: np.ndarray = source_indices[~on_edge]
+    kept: np.ndarray = around_positions[~on_edge]
+    corners: np.ndarray = positions[kept]
+    moved: np.ndarray = np.where(
+        (kept == sources[kept_sources, np.newaxis])[:, :, np.newaxis],
+        positions[targets[kept_sources]][:, np.newaxis, :],
+        corners,
+    )
+    normals: np.ndarray = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    )
+    moved_normals: np.ndarray = np.cross(
+        moved[:, 1] - moved[:, 0], moved[:, 2] - moved[:, 0]
+    )
+    flipped: np.ndarray = np.sum(
+        normals * moved_normals, axis=1
+    ) <= MIN_NORMAL_COS * np.linalg.norm(normals, axis=1) * np.linalg.norm(
+        moved_normals, axis=1
+    )
+    valid[np.unique(kept_sources[flipped])] = False
+
+    replacements: np.ndarray = np.where(valid, highest, -1)
+    return valid, replacements
+
+
+def decimate(
+    vertex_data: np.ndarray,
+    vertex_size: int,
+    position_offset: int,
+    ratio: float,
+) -> tuple[np.ndarray, DecimationStats]:
+    """
+    Reduces the triangles of the non-indexed interleaved vertex data, with `vertex_size` floats
+    per vertex and the position at `position_offset`, to `ratio` of them. Stops early if no edge
+    can be collapsed anymore. Returns the vertex data in the same layout.
+    """
+    start: float = time.perf_counter()
+    wedges, positions, wedge_positions, triangles = weld(
+        vertex_data, vertex_size, position_offset
+    )
+    position_count: int = len(positions)
+    triangles_before: int = len(triangles)
+    target: int = int(ratio * triangles_before)
+
+    tri_positions: np.ndarray = wedge_positions[triangles]
+    quadrics: np.ndarray = get_vertex_quadrics(positions, tri_positions)
+    locked: np.ndarray = get_locked_positions(
+        wedge_positions, position_count, tri_positions
+    )
+    homogeneous: np.ndarray = np.concatenate(
+        [positions, np.ones((position_count, 1))], axis=1
+    )
+    # Collapses that were invalid once, they don't get tried again.
+    rejected: set[int] = set()
+
+    passes = 0
+    while len(triangles) > target:
+        passes += 1
+        all_edges: np.ndarray = get_directed_edges(tri_positions, position_count)
+        neighbour_starts, neighbours = get_neighbours(all_edges, position_count)
+        edges: np.ndarray = all_edges[~locked[all_edges[:, 0]]]
+        if rejected:
+            keys: np.ndarray = edges[:, 0] * position_count + edges[:, 1]
+            edges = edges[~np.isin(keys, np.fromiter(rejected, dtype=np.int64))]
+        if len(edges) == 0:
+            break
+
+        sources, targets = edges[:, 0], edges[:, 1]
+        target_points: np.ndarray = homogeneous[targets]
+        costs: np.ndarray = np.einsum(
+            "ni,nij,nj->n",
+            target_points,
+            quadrics[sources] + quadrics[targets],
+            target_points,
+        )
+        order: np.ndarray = np.argsort(costs, kind="stable")
+        order = order[: max(1, int(PASS_FRACTION * len(order)))]
+
+        # Every collapse removes about two triangles.
+        limit: int = max(1, (len(triangles) - target + 1) // 2)
+        selected: np.ndarray = order[
+            select_independent(
+                sources[order],
+                neighbour_starts,
+                neighbours,
+                position_count,
+                limit,
+            )
+        ]
+        sources, targets = sources[selected], targets[selected]
+
+        valid, replacements = get_valid_collapses(
+            sources, targets, positions, triangles, tri_positions
+        )
+        rejected.update((sources[~valid] * position_count + targets[~valid]).tolist())
+        if not np.any(valid):
+            continue
+        sources, targets, replacements = (
+            sources[valid],
+            targets[valid],
+            replacements[valid],
+        )
+
+        # Unlocked positions only have a single vertex.
+        wedge_map: np.ndarray = np.arange(len(wedges))
+        source_wedges: np.ndarray = np.full(position_count, -1)
+        source_wedges[wedge_positions] = np.arange(len(wedges))
+        wedge_map[source_wedges[sources]] = replacements
+        triangles = wedge_map[triangles]
+
+        quadrics[targets] += quadrics[sources]
+        locked[sources] = True
+
+        tri_positions = wedge_positions[triangles]
+        degenerate: np.ndarray = (
+            (tri_positions[:, 0] == tri_positions[:, 1])
+            | (tri_positions[:, 1] == tri_positions[:, 2])
+            | (tri_positions[:, 2] == tri_positions[:, 0])
+        )
+        triangles, tri_positions = triangles[~degenerate], tri_positions[~degenerate]
+
+    stats = DecimationStats(
+        triangles_before, len(triangles), passes, time.perf_counter() - start
+    )
+    return wedges[triangles].reshape(-1).astype(np.float32), stats
+
+
+def load_decimated_levels(
+    vertex_data: np.ndarray,
+    vertex_size: int,
+    position_offset: int,
+    ratios: Iterable[float],
+    cache_names: Iterable[str],
+    cache_folderpath: str = settings.Folders.CACHE_MESHES,
+) -> tuple[list[np.ndarray], list[DecimationStats]]:
+    """
+    Decimates the vertex data to each of the descending fractions of its triangles. Each level
+    gets decimated from the previous one, which is a lot faster than starting from the full mesh
+    every time, and is cached keyed on the content of that one, see `asset_cache.py`, so the
+    levels get decimated again as soon as the mesh changes.
+    """
+    levels: list[np.ndarray] = []
+    all_stats: list[DecimationStats] = []
+    triangle_count: int = vertex_data.size // (3 * vertex_size)
+    level: np.ndarray = vertex_data
+    for ratio, cache_name in zip(ratios, cache_names):
+
+        def decimate_level(level: np.ndarray) -> tuple[np.ndarray, dict]:
+            level_triangle_count: int = level.size // (3 * vertex_size)
+            decimated, stats = decimate(
+                level,
+                vertex_size,
+                position_offset,
+                ratio * triangle_count / level_triangle_count,
+            )
+            return decimated, asdict(stats)
+
+        level, attributes = load_derived_array_with_attributes(
+            level, decimate_level, cache_folderpath, cache_name
+        )
+        levels.append(level)
+        all_stats.append(DecimationStats(**attributes))
+    return levels, all_stats
+
+
+def main() -> None:
+    # The VBOs decimate the cat themselves if its levels aren't cached, so only needed here.
+    from .vbo import get_attribute_offsets, load_cat_vertex_data
+
+    # Layout of `vbo.Cat`, texture coordinates, normal and position.
+    offsets: list[int] = get_attribute_offsets("2f 3f 3f")
+    _, stats = load_decimated_levels(
+        load_cat_vertex_data(),
+        offsets[-1],
+        offsets[2],
+        settings.LevelOfDetail.CAT_LEVELS,
+        [VBO.CACHE_CAT_DECIMATED(ratio) for ratio in settings.LevelOfDetail.CAT_LEVELS],
+    )
+    for ratio, level_stats in zip(settings.LevelOfDetail.CAT_LEVELS, stats):
+        print(
+            f"{ratio:>5g}: {level_stats.triangles_before:>7} -> {level_stats.triangles_after:>7}"
+            f" triangles in {level_stats.passes:>3} passes, {level_stats.seconds:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
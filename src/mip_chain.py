@@ -0,0 +1,64 @@
+from . import *
+
+"""
+Builds the mip chains of the textures on the CPU so they can be cached on disk together with the
+decoded image, instead of `build_mipmaps` computing them again at every launch.
+
+Every level halves the size of the previous one, rounded down and never below 1, down to 1x1 like
+`glGenerateMipmap` does. The levels are the 2x2 box filtered averages of the previous one, for odd
+sizes the last row or column is left out. The chain is stored as one flat array with the levels
+one after another, `split_mip_chain` turns it back into the levels.
+"""
+
+
+def get_mip_sizes(width: int, height: int) -> list[tuple[int, int]]:
+    """(width, height) of all the levels, starting with the full size one."""
+    sizes: list[tuple[int, int]] = [(width, height)]
+    while width > 1 or height > 1:
+        width, height = max(width // 2, 1), max(height // 2, 1)
+        sizes.append((width, height))
+    return sizes
+
+
+def downsample(pixels: np.ndarray) -> np.ndarray:
+    """The next level of the image (height, width, components), rounded to the nearest value."""
+    height, width, components = pixels.shape
+    total: np.ndarray = pixels.astype(np.uint32)
+    count = 1
+    if height > 1:
+        rows: int = height // 2
+        total = total[: 2 * rows].reshape(rows, 2, width, components).sum(axis=1)
+        count *= 2
+    if width > 1:
+        columns: int = width // 2
+        total = (
+            total[:, : 2 * columns]
+            .reshape(len(total), columns, 2, components)
+            .sum(axis=2)
+        )
+        count *= 2
+    return ((total + count // 2) // count).astype(pixels.dtype)
+
+
+def build_mip_chain(pixels: np.ndarray) -> np.ndarray:
+    """All the levels of the uint8 image (height, width, components) as one flat array."""
+    levels: list[np.ndarray] = [pixels]
+    while levels[-1].shape[0] > 1 or levels[-1].shape[1] > 1:
+        levels.append(downsample(levels[-1]))
+    return np.concatenate([level.reshape(-1) for level in levels])
+
+
+def split_mip_chain(
+    chain: np.ndarray, width: int, height: int, components: int
+) -> list[np.ndarray]:
+    """Views of the levels (height, width, components) in the flat array `build_mip_chain` made."""
+    levels: list[np.ndarray] = []
+    offset = 0
+    for level_width, level_height in get_mip_sizes(width, height):
+        size: int = level_width * level_height * components
+        levels.append(
+            chain[offset : offset + size].reshape(level_height, level_width, components)
+        )
+        offset += size
+    assert offset == len(chain)
+    return levels
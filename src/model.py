@@ -1,13 +1,14 @@
-from moderngl import Texture
-
 from . import *
 
 """"""
 
+from moderngl import Program, Texture, VertexArray
+
 from .camera import Camera
 from .collider import Collider, SphereCollider
 from .constants import *
 from .math import get_line_to_line_transformation
+from .transform_store import ScaleAnimation, TransformStore
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
@@ -23,13 +24,16 @@ class Quad:
     def __init__(self, app: "GraphicsEngine"):
         self.app: GraphicsEngine = app
         self.vao_name = "quad"
-        self.vao: VertexArray = app.mesh.vao.vao_map[self.vao_name]
+        self.vao: VertexArray = app.mesh.vao.vao_map.acquire(self.vao_name)
 
         self.program: Program = self.vao.program
 
     def update(self):
         pass
 
+    def destroy(self) -> None:
+        self.app.mesh.vao.vao_map.release(self.vao_name)
+
     def render(self) -> None:
         self.vao.render(mgl.TRIANGLE_STRIP)
 
@@ -50,20 +54,14 @@ class BaseModel:
     ):
         self.app: GraphicsEngine = app
 
-        self.pos: vec3 = pos
-        self.rot: vec3 = rot
-        self.scale: vec3 = scale
-
-        # TODO: Find a good way of copying so we don't have to create it twice
-        self.m_model_initial = self.get_initial_model_matrix()
-        self.m_model: mat4 = self.get_initial_model_matrix()
+        self.init_transform(pos, rot, scale)
 
         self.texture_id: Optional[int | str] = texture_id
 
         self.vao_name = vao_name
-        self.vao: VertexArray = app.mesh.vao.vao_map[vao_name]
+        # The vaos the model acquired, see `get_vao`.
+        self.acquired_vao_names: list[str] = []
 
-        self.program: Program = self.vao.program
         self.camera: Camera = self.app.camera
 
         self.render_mode: Optional[int] = render_mode
@@ -75,9 +73,50 @@ class BaseModel:
         else:
             self.coordinate_axis = None
 
+    def get_vao(self, vao_name: str) -> VertexArray:
+        """
+        Looked up every time, the vao of a streamed mesh reads from a placeholder until the mesh
+        is loaded, see `asset_streaming.py`. The model acquires it the first time it's used and
+        releases it in `destroy`, vaos it never uses don't get built.
+        """
+        vao_map = self.app.mesh.vao.vao_map
+        if vao_name in self.acquired_vao_names:
+            return vao_map[vao_name]
+        self.acquired_vao_names.append(vao_name)
+        return vao_map.acquire(vao_name)
+
+    @property
+    def vao(self) -> VertexArray:
+        return self.get_vao(self.vao_name)
+
+    @property
+    def program(self) -> Program:
+        return self.vao.program
+
+    @property
+    def lod_ranges(self) -> list[tuple[int, int]]:
+        """First vertex and vertex count of each level of detail, see `level_of_detail.py`."""
+        return self.app.mesh.vao.get_vbo(self.vao_name).lod_ranges
+
+    def init_transform(self, pos: vec3, rot: vec3, scale: vec3) -> None:
+        self.pos: vec3 = pos
+        self.rot: vec3 = rot
+        self.scale: vec3 = scale
+
+        # TODO: Find a good way of copying so we don't have to create it twice
+        self.m_model_initial = self.get_initial_model_matrix()
+        self.m_model: mat4 = self.get_initial_model_matrix()
+
     @abstractmethod
     def update(self) -> None: ...
 
+    def destroy(self) -> None:
+        for vao_name in self.acquired_vao_names:
+            self.app.mesh.vao.vao_map.release(vao_name)
+        self.acquired_vao_names = []
+        if self.coordinate_axis is not None:
+            self.coordinate_axis.destroy()
+
     def get_initial_model_matrix(self) -> mat4:
         """
         Applies the initial transformations and returns them as a single 4x4 model matrix.
@@ -95,8 +134,15 @@ class BaseModel:
         return m_model
 
     def render(self) -> None:
-        self.update()
-        self.vao.render(self.render_mode)
+        """Doesn't `update`, that already happened for the frame, see `Scene.update_transforms`."""
+        self.render_vao(self.vao, self.render_mode)
+
+    def render_vao(
+        self, vao: VertexArray, render_mode: Optional[int], level_of_detail: int = 0
+    ) -> None:
+        """Draws the vertices of the level of detail with a vao reading from the model's VBO."""
+        first, vertices = self.lod_ranges[level_of_detail]
+        vao.render(render_mode, vertices, first=first)
 
     def __str__(self) -> None:
         return f"BaseModel({self.vao_name=},{self.texture_id=},{self.pos=},{self.rot=},{self.scale=})"
@@ -150,14 +196,9 @@ class Line(BaseModel):
         self.m_model *= get_line_to_line_transformation(
             vec3(), vec3_x(), vec3(), vec3_xy()
         )
-        self.program["m_view"].write(self.camera.m_view)
-        self.program["m_proj"].write(self.camera.m_proj)
         self.program["m_model"].write(self.m_model)
 
     def update(self) -> None:
-        self.program["m_view"].write(self.camera.m_view)
-        if self.app.camera_projection_has_changed:
-            self.program["m_proj"].write(self.camera.m_proj)
         self.program["m_model"].write(self.m_model)
 
     @staticmethod
@@ -210,24 +251,13 @@ class CoordinateAxis(BaseModel):
             render_mode=mgl.LINES,
             has_coordinate_axis=False,
         )
-        self.program["m_view"].write(self.camera.m_view)
-        self.program["m_proj"].write(self.camera.m_proj)
         self.program["m_model"].write(self.m_model)
 
         self.is_active = False
 
     def update(self) -> None:
-        was_active = self.is_active
         self.is_active = self.app.menu_open
         if self.is_active:
-            self.program["m_view"].write(self.camera.m_view)
-
-            # If were inactive and the FOV changed we have no way of checking that so we just
-            # push the current projection matrix into the shader, this not a performance
-            # concern because that will only be done every menu switch.
-            if self.app.camera_projection_has_changed or was_active:
-                self.program["m_proj"].write(self.camera.m_proj)
-
             self.program["m_model"].write(self.owner.m_model)
 
     def render(self) -> None:
@@ -241,8 +271,8 @@ class SkyBox(BaseModel):
         self.on_init()
 
     def update(self):
-        m_view = glm.mat4(glm.mat3(self.camera.m_view))
-        self.program["m_invProjView"].write(glm.inverse(self.camera.m_proj * m_view))
+        # The inverse projection view matrix gets computed in the shader from the frame uniforms.
+        pass
 
     def on_init(self):
         self.texture = self.app.mesh.texture.textures[self.texture_id]
@@ -255,8 +285,11 @@ class Model(BaseModel):
     This class is a base for all "real" models, things which are in the world, have a shadow
     and interact with the light system.
 
-    The `rot_update` vector gives a rotation that will be continuously applied, should be a
-    small value as it'll be updated every frame.
+    The `rot_update` vector gives a rotation that will be continuously applied, it's scaled by
+    the length of a simulation step and applied every step, see `fixed_timestep.py`.
+
+    The transform of the model lives in a row of `app.transforms`, the properties only read and
+    write that row, see `transform_store.py`.
     """
 
     def __init__(
@@ -271,9 +304,8 @@ class Model(BaseModel):
         *args,
         **kwargs,
     ):
-        self.rot_update: Optional[vec3] = rot_update
-        self.scale_animation_function = None
-        self.previous_scale_factor: vec3 = vec3(1.0)
+        self.transforms: TransformStore = app.transforms
+        self.initial_rot_update: Optional[vec3] = rot_update
 
         super().__init__(
             app,
@@ -310,49 +342,100 @@ class Model(BaseModel):
 
         return dict_
 
+    def init_transform(self, pos: vec3, rot: vec3, scale: vec3) -> None:
+        self.transform_index: int = self.transforms.add(
+            pos, rot, scale, self.initial_rot_update
+        )
+
+    @property
+    def pos(self) -> vec3:
+        return vec3(*self.transforms.positions[self.transform_index])
+
+    @pos.setter
+    def pos(self, pos: vec3) -> None:
+        self.transforms.set_transform(self.transform_index, pos=pos)
+
+    @property
+    def rot(self) -> vec3:
+        return vec3(*self.transforms.rotations[self.transform_index])
+
+    @rot.setter
+    def rot(self, rot: vec3) -> None:
+        self.transforms.set_transform(self.transform_index, rot=rot)
+
+    @property
+    def scale(self) -> vec3:
+        return vec3(*self.transforms.scales[self.transform_index])
+
+    @scale.setter
+    def scale(self, scale: vec3) -> None:
+        self.transforms.set_transform(self.transform_index, scale=scale)
+
+    @property
+    def rot_update(self) -> Optional[vec3]:
+        if not self.transforms.is_rotating[self.transform_index]:
+            return None
+        return vec3(*self.transforms.rot_updates[self.transform_index])
+
+    @rot_update.setter
+    def rot_update(self, rot_update: Optional[vec3]) -> None:
+        self.transforms.set_rot_update(self.transform_index, rot_update)
+
+    @property
+    def scale_animation_function(self) -> Optional[ScaleAnimation]:
+        return self.transforms.scale_animations[self.transform_index]
+
+    def set_scale_animation(
+        self, function: Optional[ScaleAnimation], phase: float = 0.0
+    ) -> None:
+        """`function` maps an array of phases to their scale factors, see `ScaleAnimation`."""
+        self.transforms.set_scale_animation(self.transform_index, function, phase)
+
+    @property
+    def m_model(self) -> mat4:
+        """The model matrix that gets drawn, between the last two simulation steps."""
+        return self.transforms.get_m_model(self.transform_index)
+
+    @property
+    def is_dynamic(self) -> bool:
+        """Whether the animations change the model matrix, otherwise it's static."""
+        return self.rot_update is not None or self.scale_animation_function is not None
+
     def update(self) -> None:
-        self.texture.use(location=0)
-        self.program["camPos"].write(self.camera.position)
-        self.program["m_view"].write(self.camera.m_view)
-        self.program["m_model"].write(self.m_model)
+        # The model matrix gets written in `draw`, camera and light uniforms are shared by all
+        # objects, see `FrameUniformBuffer`.
+        pass
 
-        if self.app.camera_projection_has_changed:
-            self.program["m_proj"].write(self.app.camera.m_proj)
-            self.shadow_program["m_proj"].write(self.camera.m_proj)
+    @property
+    def shadow_vao(self) -> VertexArray:
+        return self.get_vao("shadow_" + self.vao_name)
 
-        if self.rot_update is not None:
-            self.m_model = glm.rotate(
-                self.m_model, self.rot_update.x * self.app.delta_time_s, vec3_x()
-            )
-            self.m_model = glm.rotate(
-                self.m_model, self.rot_update.y * self.app.delta_time_s, vec3_y()
-            )
-            self.m_model = glm.rotate(
-                self.m_model, self.rot_update.z * self.app.delta_time_s, vec3_z()
-            )
+    @property
+    def shadow_program(self) -> Program:
+        return self.shadow_vao.program
 
-        if self.scale_animation_function is not None:
-            self.m_model = glm.scale(
-                self.m_model_initial,
-                self.scale_animation_function(self.alpha + self.app.frame_counter / 50),
-            )
+    @property
+    def shadow_lod(self) -> int:
+        return self.app.mesh.vao.get_vbo(self.vao_name).shadow_lod
+
+    def render(self) -> None:
+        """Draws the model with its texture, outside of the `RenderQueue`."""
+        self.texture.use(location=0)
+        self.draw()
 
-    def render(self):
-        super().render()
+    def draw(self, level_of_detail: int = 0) -> None:
+        """Draws the model without binding its texture, used by the `RenderQueue`."""
+        self.program["m_model"].write(self.m_model)
+        self.render_vao(self.vao, self.render_mode, level_of_detail)
 
     def update_shadow(self):
         self.shadow_program["m_model"].write(self.m_model)
 
-    def render_shadow(self):
+    def render_shadow(self, level_of_detail: int = 0):
         self.update_shadow()
-        self.shadow_vao.render()
+        self.render_vao(self.shadow_vao, None, max(level_of_detail, self.shadow_lod))
 
     def on_init(self) -> None:
-        self.program["m_view_light"].write(self.app.light.m_view_light)
-
-        # resolution
-        self.program["u_resolution"].write(vec2(self.app.window_size))
-
         # Depth Texture
         self.depth_texture: mgl.Texture = self.app.mesh.texture.textures[
             "depth_texture"
@@ -360,28 +443,11 @@ class Model(BaseModel):
         self.program["shadowMap"] = 1
         self.depth_texture.use(location=1)
 
-        # Shadows
-        self.shadow_vao: VertexArray = self.app.mesh.vao.vao_map[
-            "shadow_" + self.vao_name
-        ]
-        self.shadow_program: Program = self.shadow_vao.program
-        self.shadow_program["m_proj"].write(self.camera.m_proj)
-        self.shadow_program["m_view_light"].write(self.app.light.m_view_light)
-        self.shadow_program["m_model"].write(self.m_model)
-
+        # The model matrix gets written before every draw, see `draw` and `render_shadow`.
         self.texture = self.app.mesh.texture.textures[self.texture_id]
         self.program["u_texture_0"] = 0
         self.texture.use(location=0)
 
-        self.program["m_proj"].write(self.app.camera.m_proj)
-        self.program["m_view"].write(self.app.camera.m_view)
-        self.program["m_model"].write(self.m_model)
-
-        self.program["light.position"].write(self.app.light.position)
-        self.program["light.Ia"].write(self.app.light.intensity_ambient)
-        self.program["light.Id"].write(self.app.light.intensity_diffuse)
-        self.program["light.Is"].write(self.app.light.intensity_specular)
-
     @staticmethod
     def get_data(vertices, indices):
         data = [vertices[ind] for triangle in indices for ind in triangle]
@@ -463,8 +529,6 @@ class ColliderModel(BaseModel):
         super().__init__(app, *args, **kwargs)
 
     def update(self):
-        self.program["camPos"].write(self.camera.position)
-        self.program["m_view"].write(self.camera.m_view)
         self.program["m_model"].write(self.m_model)
 
 
@@ -504,7 +568,7 @@ class UIText:
         self.app: GraphicsEngine = app
         self.ctx: GraphicsEngine = app.ctx
         self.vao_name = "ui_text"
-        self.vao: VertexArray = app.mesh.vao.vao_map[self.vao_name]
+        self.vao: VertexArray = app.mesh.vao.vao_map.acquire(self.vao_name)
         self.program: Program = self.vao.program
 
         width, height, texture_data = load_char_texture("A", self.app.font_face)
@@ -518,3 +582,7 @@ class UIText:
         # self.program["text_texture"].value = 0
         # self.program["text_color"].value = (1.0, 1.0, 1.0)
         self.vao.render()
+
+    def destroy(self) -> None:
+        self.app.mesh.vao.vao_map.release(self.vao_name)
+        self.texture.release()
@@ -10,6 +10,24 @@ from . import settings
 logging.getLogger("pywavefront").setLevel(logging.ERROR)
 
 
+class RunFileHandler(logging.FileHandler):
+    """
+    Only creates and opens its file once the first record gets logged, the loggers are set up at
+    import time and most of them never log anything in a run.
+    """
+
+    def __init__(self, filepath: str):
+        super().__init__(filepath, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        stream = super()._open()
+        # Only annotate new run if its not the first iteration for that log file
+        if stream.tell() > 0:
+            stream.write("\nStarting a new run.\n\n")
+        return stream
+
+
 def setup(logger_name: str, logger_folderpath: str = settings.Folders.LOGS) -> Logger:
     """
     Creates a logger for that project name and creates the filehandler with
@@ -19,22 +37,15 @@ def setup(logger_name: str, logger_folderpath: str = settings.Folders.LOGS) -> L
     logging.basicConfig(level=settings.Logging.LEVEL)
     logger: Logger = logging.getLogger(logger_name)
 
-    os.makedirs("logs", exist_ok=True)
-
     logger_filepath: str = os.path.join(logger_folderpath, f"{logger_name}.log")
 
-    file_handler = logging.FileHandler(logger_filepath)
+    file_handler = RunFileHandler(logger_filepath)
     file_handler.setLevel(settings.Logging.LEVEL_FILE)
     file_handler.setFormatter(
         logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     )
     logger.addHandler(file_handler)
 
-    # Only annotate new run if its not the first iteration for that log file
-    if os.path.getsize(logger_filepath) > 0:
-        with open(logger_filepath, "a") as file:
-            file.write("\nStarting a new run.\n\n")
-
     return logger
 
 
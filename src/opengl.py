@@ -2,6 +2,8 @@ from . import *
 
 """"""
 
+from moderngl import Context, Framebuffer
+
 from . import settings
 
 
@@ -18,3 +20,24 @@ def setup_opengl(window_size: tuple[int, int]) -> pg.Surface:
     pg.display.gl_set_attribute(pg.GL_CONTEXT_PROFILE_MASK, pg.GL_CONTEXT_PROFILE_CORE)
     # OpenGL Context
     return pg.display.set_mode(window_size, flags=pg.OPENGL | pg.DOUBLEBUF)
+
+
+def create_standalone_context() -> Context:
+    """
+    Creates an OpenGL context without a window, falls back to EGL for machines that don't have a
+    display server (e.g. CI runners which only have a software rasterizer).
+    """
+    try:
+        return mgl.create_standalone_context(require=settings.OpenGL.REQUIRED_VERSION)
+    except Exception:
+        return mgl.create_standalone_context(
+            require=settings.OpenGL.REQUIRED_VERSION, backend="egl"
+        )
+
+
+def create_offscreen_framebuffer(ctx: Context, size: tuple[int, int]) -> Framebuffer:
+    """Takes the place of the default framebuffer of the window for standalone contexts."""
+    return ctx.framebuffer(
+        color_attachments=ctx.renderbuffer(size),
+        depth_attachment=ctx.depth_renderbuffer(size),
+    )
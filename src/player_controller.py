@@ -7,11 +7,12 @@ import logging
 from . import my_logger
 from .camera import Camera
 from .constants import *
-from .settings import Physics
+from .settings import Physics, Simulation
 from .util import clamp_vector_above, normalize_or_zero
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
+    from .headless import HeadlessKeys
 
 
 class PlayerController:
@@ -25,6 +26,8 @@ class PlayerController:
 
         self.initial_position = initial_position
         self.position = vec3(initial_position)
+        # Where the last simulation step started, the camera is interpolated in between.
+        self.previous_position = vec3(initial_position)
 
         self.camera_offset: vec3 = vec3_y()
 
@@ -62,7 +65,12 @@ class PlayerController:
         self.validate()
 
         if self.app.player_controller_mode == PLAYER_CONTROLLER_MODE.FPS:
-            self.camera.position = self.position + self.camera_offset
+            self.camera.position = (
+                glm.mix(
+                    self.previous_position, self.position, self.app.simulation_alpha
+                )
+                + self.camera_offset
+            )
 
             self.forward: vec3 = glm.normalize(
                 vec3(self.camera.forward.x, 0, self.camera.forward.z)
@@ -70,14 +78,12 @@ class PlayerController:
             # glm.cross(self.foward, vec3_y()) == (vx, 0, vz) x (0, 1, 0) == (-vz, 0, vx)
             self.right: vec3 = vec3(-self.forward.z, 0, self.forward.x)
 
-        self.fixed_update()
-
     def move(self) -> None:
         """
         When controlling a floating camera we can just pass through objects so we
         don't need any bound checks.
         """
-        keys: pg.ScancodeWrapper = pg.key.get_pressed()
+        keys: pg.key.ScancodeWrapper | HeadlessKeys = self.app.get_pressed_keys()
 
         self.is_sprinting = keys[pg.K_LSHIFT] and self.on_ground
         velocity: float = self.speed * self.app.delta_time
@@ -131,15 +137,16 @@ class PlayerController:
 
     def fixed_update(self) -> None:
         """
-        Deals with all the physics stuff, later the game logic, rendering pipeline and physics
-        will be out of sync (for example physics will need more than 1 iteration per frame).
+        Deals with all the physics stuff, runs once per simulation step which can be any number
+        of times per frame, see `fixed_timestep.py`.
         """
+        self.previous_position = vec3(self.position)
         self.process_physics()
 
     def process_physics(self) -> None:
         if not self.on_ground:
             self.force_vector.y -= (
-                Physics.GRAVITATIONAL_CONSTANT * self.app.delta_time_s
+                Physics.GRAVITATIONAL_CONSTANT * self.app.simulation.step_s
             )
 
         self.position += (
@@ -147,10 +154,10 @@ class PlayerController:
             + self.move_force
             + self.jump_force_vector
             + self.aircontrol_vector
-        )
+        ) * (self.app.simulation.step_s * Simulation.REFERENCE_STEP_RATE)
 
         move_force_reduction = (
-            20 * self.app.delta_time_s * normalize_or_zero(self.move_force)
+            20 * self.app.simulation.step_s * normalize_or_zero(self.move_force)
         )
         move_magnitude = glm.length(self.move_force)
         if (move_magnitude < glm.length(move_force_reduction)) or (
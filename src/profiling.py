@@ -0,0 +1,199 @@
+from . import *
+
+"""
+Measures how long the CPU spends in each stage of a frame and, for the render passes, how long the
+GPU spends on the commands issued in them. The timings of the last `settings.Profiling.HISTORY`
+frames are kept so they can be summarized into percentiles, see `benchmarks/frame_times.py`.
+
+Next to the timings it keeps counters that get recorded once per frame, like the number of draw
+calls, see `FrameProfiler.count`.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+from moderngl import Context, Query
+
+from . import settings
+
+NS_TO_MS = 1e-6
+
+
+@dataclass
+class TimingSummary:
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @staticmethod
+    def from_samples(samples_ms: Iterable[float]) -> "TimingSummary":
+        samples: np.ndarray = np.fromiter(samples_ms, dtype=np.float64)
+        p50, p95, p99 = np.percentile(samples, (50, 95, 99)).tolist()
+        return TimingSummary(float(samples.mean()), p50, p95, p99)
+
+
+@dataclass
+class CounterSummary:
+    mean: float
+    p50: float
+    max: float
+
+    @staticmethod
+    def from_samples(samples: Iterable[float]) -> "CounterSummary":
+        values: np.ndarray = np.fromiter(samples, dtype=np.float64)
+        return CounterSummary(
+            float(values.mean()), float(np.median(values)), float(values.max())
+        )
+
+
+class GpuTimer:
+    """
+    Time elapsed queries of a single render pass. Reading the result of a query waits until the GPU
+    has finished the pass, so every frame uses its own query and the results only get read
+    `latency` frames later, when the GPU is long done with them.
+    """
+
+    def __init__(self, ctx: Context, latency: int):
+        self.queries: list[Query] = [ctx.query(time=True) for _ in range(latency)]
+        # Whether the query of the slot has a result that wasn't read yet.
+        self.pending: list[bool] = [False] * latency
+
+    def get_query(self, frame: int) -> Query:
+        slot: int = frame % len(self.queries)
+        self.pending[slot] = True
+        return self.queries[slot]
+
+    def collect(self, frame: int) -> Optional[float]:
+        """GPU time of the pass in milliseconds in the frame, None if it didn't run then."""
+        slot: int = frame % len(self.queries)
+        if not self.pending[slot]:
+            return None
+        self.pending[slot] = False
+        return self.queries[slot].elapsed * NS_TO_MS
+
+    def discard(self) -> None:
+        """Drops the results that weren't read yet."""
+        self.pending = [False] * len(self.pending)
+
+
+class FrameProfiler:
+    def __init__(
+        self,
+        history: int = settings.Profiling.HISTORY,
+        ctx: Optional[Context] = None,
+        gpu_latency: int = settings.Profiling.GPU_QUERY_LATENCY,
+    ):
+        """Without a `ctx` the GPU stages only measure the CPU time."""
+        self.history: int = history
+        # Stage name to its CPU wall times of the last frames in milliseconds.
+        self.cpu_times_ms: dict[str, deque[float]] = {}
+        # Stage name to the GPU times of the last frames in milliseconds, they lag behind the CPU
+        # times by `gpu_latency` frames.
+        self.gpu_times_ms: dict[str, deque[float]] = {}
+        # Counter name to its values of the last frames.
+        self.counters: dict[str, deque[float]] = {}
+
+        self.ctx: Optional[Context] = ctx
+        self.gpu_latency: int = gpu_latency
+        self.gpu_timers: dict[str, GpuTimer] = {}
+        self.frame = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Records the time spent inside of the `with` block under the stage name."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * SECOND_TO_MS)
+
+    @contextmanager
+    def gpu_stage(self, name: str) -> Iterator[None]:
+        """
+        Like `stage`, but also measures the GPU time of the commands issued inside of the `with`
+        block. Only one of them can be measured at a time, so GPU stages can't be nested, and each
+        one should only run once per frame.
+        """
+        if self.ctx is None:
+            with self.stage(name):
+                yield
+            return
+
+        if name not in self.gpu_timers:
+            self.gpu_timers[name] = GpuTimer(self.ctx, self.gpu_latency)
+        with self.stage(name), self.gpu_timers[name].get_query(self.frame):
+            yield
+
+    def end_frame(self) -> None:
+        """Reads back the GPU times of the frame whose queries get reused next."""
+        self.frame += 1
+        for name, gpu_timer in self.gpu_timers.items():
+            time_ms: Optional[float] = gpu_timer.collect(self.frame)
+            if time_ms is not None:
+                self.record(name, time_ms, self.gpu_times_ms)
+
+    def record(
+        self,
+        name: str,
+        time_ms: float,
+        times_ms: Optional[dict[str, deque[float]]] = None,
+    ) -> None:
+        """Records into the CPU times if no other `times_ms` are given."""
+        if times_ms is None:
+            times_ms = self.cpu_times_ms
+        if name not in times_ms:
+            times_ms[name] = deque(maxlen=self.history)
+        times_ms[name].append(time_ms)
+
+    def count(self, name: str, value: float) -> None:
+        """Records the value of a counter for the frame, should be called once per frame."""
+        self.record(name, value, self.counters)
+
+    def count_fields(self, prefix: str, stats: object) -> None:
+        """Records every field of the stats dataclass as a counter, named `prefix.field`."""
+        for field in dataclasses.fields(stats):
+            self.count(f"{prefix}.{field.name}", getattr(stats, field.name))
+
+    def clear(self) -> None:
+        """Drops all timings, including the GPU times that weren't read back yet."""
+        self.cpu_times_ms = {}
+        self.gpu_times_ms = {}
+        self.counters = {}
+        for gpu_timer in self.gpu_timers.values():
+            gpu_timer.discard()
+
+    def summarize(self, gpu: bool = False) -> dict[str, TimingSummary]:
+        """Summaries of the CPU times of the stages, of the GPU times with `gpu`."""
+        times_ms: dict[str, deque[float]] = (
+            self.gpu_times_ms if gpu else self.cpu_times_ms
+        )
+        return {
+            name: TimingSummary.from_samples(stage_times_ms)
+            for name, stage_times_ms in times_ms.items()
+            if len(stage_times_ms) > 0
+        }
+
+    def summarize_counters(self) -> dict[str, CounterSummary]:
+        return {
+            name: CounterSummary.from_samples(values)
+            for name, values in self.counters.items()
+            if len(values) > 0
+        }
+
+    def log_summary(self, logger: Logger) -> None:
+        gpu_summaries: dict[str, TimingSummary] = self.summarize(gpu=True)
+        for name, summary in self.summarize().items():
+            message: str = (
+                f"{name:>14}: CPU p50 {summary.p50_ms:7.3f} ms, p95 {summary.p95_ms:7.3f} ms"
+            )
+            if name in gpu_summaries:
+                gpu_summary: TimingSummary = gpu_summaries[name]
+                message += f" | GPU p50 {gpu_summary.p50_ms:7.3f} ms, p95 {gpu_summary.p95_ms:7.3f} ms"
+            logger.info(message)
+        for name, summary in self.summarize_counters().items():
+            logger.info(
+                f"{name:>36}: mean {summary.mean:9.1f}, p50 {summary.p50:9.1f}, max {summary.max:9.1f}"
+            )
@@ -0,0 +1,104 @@
+from . import *
+
+"""
+Instead of drawing the objects in the order they were added to the scene, the `SceneRenderer`
+submits all draws of a frame into a `RenderQueue` which sorts them by program, texture, vao and
+front-to-back depth, so consecutive draws share as much GL state as possible.
+
+Textures are only bound when they change. Programs and vaos get bound by moderngl inside of
+`VertexArray.render` on every draw, so those binds can't be skipped here, the counters only track
+how often consecutive draws share them, which is what the sorting improves.
+
+A pass can be split into layers that get executed separately, like the shadow cascades which all
+draw into a different part of the shadow map.
+"""
+
+from moderngl import Program, Texture, VertexArray
+
+from .constants import RENDER_PASS
+
+
+@dataclass
+class DrawCommand:
+    program: Program
+    texture: Optional[Texture]
+    vao: VertexArray
+    depth: float
+    # Issues the draw call, the texture is already bound to location 0 when it's called.
+    draw: Callable[[], None]
+
+    @property
+    def sort_key(self) -> tuple[int, int, int, float]:
+        texture_glo: int = 0 if self.texture is None else self.texture.glo
+        return (self.program.glo, texture_glo, self.vao.glo, self.depth)
+
+
+@dataclass
+class RenderQueueStats:
+    draw_calls: int = 0
+    # Draws with a different program or vao than the draw before them, and with the same one.
+    program_changes: int = 0
+    same_program_draws: int = 0
+    # Only these binds actually get skipped.
+    texture_binds: int = 0
+    texture_binds_avoided: int = 0
+    vao_changes: int = 0
+    same_vao_draws: int = 0
+
+
+class RenderQueue:
+    def __init__(self):
+        self.commands: dict[tuple[RENDER_PASS, int], list[DrawCommand]] = {}
+        self.stats = RenderQueueStats()
+
+    def clear(self) -> None:
+        for commands in self.commands.values():
+            commands.clear()
+        self.stats = RenderQueueStats()
+
+    def submit(
+        self,
+        render_pass: RENDER_PASS,
+        program: Program,
+        texture: Optional[Texture],
+        vao: VertexArray,
+        depth: float,
+        draw: Callable[[], None],
+        layer: int = 0,
+    ) -> None:
+        self.commands.setdefault((render_pass, layer), []).append(
+            DrawCommand(program, texture, vao, depth, draw)
+        )
+
+    def execute(self, render_pass: RENDER_PASS, layer: int = 0) -> None:
+        """Issues the draws of the pass in sorted order into the currently bound framebuffer."""
+        # Anything drawn between the passes (like the skybox) may have changed the bound state.
+        program: Optional[Program] = None
+        texture: Optional[Texture] = None
+        vao: Optional[VertexArray] = None
+
+        stats: RenderQueueStats = self.stats
+        commands: list[DrawCommand] = self.commands.get((render_pass, layer), [])
+        for command in sorted(commands, key=lambda c: c.sort_key):
+            if command.program is program:
+                stats.same_program_draws += 1
+            else:
+                stats.program_changes += 1
+                program = command.program
+
+            if command.texture is not None:
+                if command.texture is texture:
+                    stats.texture_binds_avoided += 1
+                else:
+                    stats.texture_binds += 1
+                    texture = command.texture
+                    texture.use(location=0)
+
+            if command.vao is vao:
+                stats.same_vao_draws += 1
+            else:
+                stats.vao_changes += 1
+                vao = command.vao
+
+            command.draw()
+            stats.draw_calls += 1
@@ -13,16 +13,41 @@ if typing.TYPE_CHECKING:
 
 
 class Scene:
-    def __init__(self, app: "GraphicsEngine", scene_id=None):
+    # Name of the loader method for every `scene_id`, None is the default scene.
+    LOADERS: dict[Optional[str], str] = {
+        None: "load_cat_circle_animated_scale",
+        "DEBUG": "load_debug",
+        "GRID": "load",
+        "BASIC": "load_basic",
+        "BASIC_EXAMPLE": "load_basic_example",
+        "CAT_CIRCLE": "load_cat_circle",
+        "CAT_CIRCLE_ANIMATED_SCALE": "load_cat_circle_animated_scale",
+    }
+    # The loaders that build a grid of cubes, `scene_size` is the half extent of it.
+    SIZED_LOADERS: tuple[str, ...] = (
+        "load",
+        "load_cat_circle",
+        "load_cat_circle_animated_scale",
+    )
+
+    def __init__(
+        self, app: "GraphicsEngine", scene_id=None, scene_size: Optional[int] = None
+    ):
         self.app: GraphicsEngine = app
         # Tracks a unique index for every object
         self.object_idx = 0
         self.objects: list[Model] = []
+        self.transform_index_array: np.ndarray = np.zeros(0, dtype=np.int64)
 
-        if scene_id == "DEBUG":
-            self.load_debug()
+        if scene_id not in self.LOADERS:
+            raise ValueError(
+                f"Unknown {scene_id=}, has to be one of {list(self.LOADERS)}."
+            )
+        loader_name: str = self.LOADERS[scene_id]
+        if scene_size is not None and loader_name in self.SIZED_LOADERS:
+            getattr(self, loader_name)(scene_size)
         else:
-            self.load_cat_circle_animated_scale()
+            getattr(self, loader_name)()
         self.skybox = SkyBox(app)
         self.quad = Quad(app)
         self.line = Line(app, pos=vec3_xy(4.0), scale=vec3(30.0))
@@ -61,8 +86,8 @@ class Scene:
             )
         )
 
-    def load(self) -> None:
-        n, s = 30, 2
+    def load(self, n: int = 30) -> None:
+        s = 2
         for x in range(-n, n, s):
             for z in range(-n, n, s):
                 self.add_object(
@@ -91,8 +116,8 @@ class Scene:
             )
         self.add_object(Cat(self.app, pos=vec3(0, -2, -15)))
 
-    def load_cat_circle_animated_scale(self) -> None:
-        n, s = 80, 2
+    def load_cat_circle_animated_scale(self, n: int = 80) -> None:
+        s = 2
         for i, x in enumerate(range(-n, n + 1, s)):
             for j, z in enumerate(range(-n, n + 1, s)):
                 self.add_object(
@@ -108,10 +133,10 @@ class Scene:
                     )
                 )
 
-        def cat_scale_func(sigma):
-            return 0.5 * (1 + glm.cos(2 * sigma)) * (vec3(1.0)) + 0.5 * (
-                1 - glm.cos(2 * sigma)
-            ) * (vec3_xy() + 0.3 * vec3_z())
+        def cat_scale_func(sigma: np.ndarray) -> np.ndarray:
+            # Evaluated for all the cats at once, see `TransformStore.set_scale_animation`.
+            blend: np.ndarray = 0.5 * (1 - np.cos(2 * sigma))[:, np.newaxis]
+            return (1 - blend) * np.ones(3) + blend * np.array((1.0, 1.0, 0.3))
 
         for alpha in np.linspace(0, 2 * np.pi, 15 + 1)[:-1]:
             alpha_normalized = alpha / (2 * np.pi)
@@ -121,15 +146,14 @@ class Scene:
                 pos=(pos.x, -1, pos.y),
                 rot=-float(alpha + np.pi / 2) * vec3_z(),
             )
-            cat.alpha = alpha
-            cat.scale_animation_function = lambda x: cat_scale_func(x)
+            cat.set_scale_animation(cat_scale_func, phase=alpha)
             self.add_object(cat)
             self.add_object(
                 Cube(self.app, pos=vec3(pos.x, 12, pos.y), rot_update=2.5 * vec3_xy())
             )
 
-    def load_cat_circle(self) -> None:
-        n, s = 30, 2
+    def load_cat_circle(self, n: int = 30) -> None:
+        s = 2
         for x in range(-n, n, s):
             for z in range(-n, n, s):
                 self.add_object(Cube(self.app, pos=glm.vec3(x, -s, z)))
@@ -187,8 +211,38 @@ class Scene:
         for obj in self.get_basic_example():
             self.add_object(obj)
 
-    def update(self) -> None:
-        for obj in self.objects:
-            obj.update()
+    @property
+    def transform_indices(self) -> np.ndarray:
+        """The rows of the objects in `app.transforms`, in the order of `objects`."""
+        if len(self.transform_index_array) != len(self.objects):
+            self.transform_index_array = np.array(
+                [obj.transform_index for obj in self.objects], dtype=np.int64
+            )
+        return self.transform_index_array
+
+    @property
+    def m_models(self) -> np.ndarray:
+        """The (N, 4, 4) model matrices of the objects, in the order of `objects`."""
+        return self.app.transforms.m_models[self.transform_indices]
+
+    @property
+    def is_dynamic(self) -> np.ndarray:
+        return self.app.transforms.is_dynamic[self.transform_indices]
+
+    def fixed_update(self) -> None:
+        """Advances the animations of the objects by a simulation step."""
+        self.app.transforms.fixed_update()
+
+    def update_transforms(self) -> None:
+        """Computes the model matrices of the objects between the last two simulation steps."""
+        self.app.transforms.update(self.app.simulation_alpha)
         self.quad.update()
         self.line.update()
+
+    def destroy(self) -> None:
+        """Releases the vaos of the objects, see `BaseModel.get_vao`."""
+        for obj in self.objects:
+            obj.destroy()
+        self.skybox.destroy()
+        self.quad.destroy()
+        self.line.destroy()
@@ -2,11 +2,41 @@ from . import *
 
 """"""
 
+import functools
+
+from moderngl import Context, Framebuffer, Program, Texture
+
+from . import settings
+from .constants import RENDER_PASS
+from .culling import (
+    BoundingSphere,
+    CullingStats,
+    get_frustum_planes,
+    get_ndc_bounds,
+    get_visible_mask,
+    transform_bounding_spheres,
+)
+from .instancing import InstanceBatch, InstanceBuffer
+from .level_of_detail import get_screen_sizes, select_levels_of_detail
 from .mesh import Mesh
+from .model import Model
+from .profiling import FrameProfiler
+from .render_queue import RenderQueue
 from .scene import Scene
+from .shader_program import get_program_variant
+from .shadow_cache import StaticShadowCache
+from .shadow_cascades import ShadowCascade, ShadowCascades
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
+    from .vbo import VertexBufferObject
+
+# Get told which cascade they draw into, see `execute_shadow_cascades`.
+SHADOW_PROGRAM_NAMES: list[str] = [
+    get_program_variant(program_name, quantized)
+    for program_name in ("shadow_map", "shadow_map_instanced")
+    for quantized in (False, True)
+]
 
 
 class SceneRenderer:
@@ -21,21 +51,459 @@ class SceneRenderer:
             depth_attachment=self.depth_texture
         )
 
-    def render_shadow(self):
-        self.depth_fbo.clear()
-        self.depth_fbo.use()
+        # Version of the vaos the batches and bounds were built with, they have to be built again
+        # when a streamed mesh replaces its placeholder.
+        self.vao_version: int = self.mesh.vao.version
+
+        self.use_instancing: bool = settings.Rendering.INSTANCING
+        self.instance_batches: dict[tuple[str, int | str], InstanceBatch] = {}
+        # Number of scene objects the batches were built from, the scene only ever grows.
+        self.batched_object_count = 0
+
+        self.shadow_cascades = ShadowCascades()
+
+        self.rebuild_static_shadows = False
+
+        self.use_frustum_culling: bool = settings.Rendering.FRUSTUM_CULLING
+        self.use_shadow_caster_culling: bool = settings.Rendering.SHADOW_CASTER_CULLING
+        self.frustum_planes: np.ndarray = np.zeros((6, 4), dtype=np.float32)
+        self.culling_stats = CullingStats()
+        self.render_queue = RenderQueue()
+        # Local bounding sphere centers and radii of the scene objects, for the per object path.
+        self.object_bounds: tuple[np.ndarray, np.ndarray] = (
+            np.zeros((0, 3), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+        )
+
+        self.use_level_of_detail: bool = settings.Rendering.LEVEL_OF_DETAIL
+        # Levels of detail the VBOs of the scene objects have and the ones they were drawn at
+        # last frame, for the per object path, the instance batches keep their own.
+        self.object_level_counts: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.object_levels_of_detail: np.ndarray = np.zeros(0, dtype=np.int32)
+
+        # The instanced main and shadow program by whether they are for VBOs with quantized
+        # vertices, only acquired once a batch needs them, see `get_instanced_programs`.
+        self.instanced_programs: dict[bool, tuple[Program, Program]] = {}
+        # Names of the VBOs the instance batches acquired.
+        self.batch_vbo_names: list[str] = []
+
+        # Only there if it's used, it holds a second shadow map atlas.
+        self.shadow_cache: Optional[StaticShadowCache] = None
+        if settings.Rendering.STATIC_SHADOW_CACHE:
+            self.shadow_cache = StaticShadowCache(
+                self.ctx,
+                self.mesh.vao.program.programs.acquire("depth_copy"),
+                self.depth_texture.size,
+            )
+
+    def get_instanced_programs(self, quantized: bool) -> tuple[Program, Program]:
+        if quantized not in self.instanced_programs:
+            programs = self.mesh.vao.program.programs
+            program: Program = programs.acquire(
+                get_program_variant("default_instanced", quantized)
+            )
+            # Camera and light uniforms are shared by all programs, see `FrameUniformBuffer`.
+            program["shadowMap"] = 1
+            program["u_texture_0"] = 0
+            self.instanced_programs[quantized] = (
+                program,
+                programs.acquire(
+                    get_program_variant("shadow_map_instanced", quantized)
+                ),
+            )
+        return self.instanced_programs[quantized]
+
+    @property
+    def shadow_programs(self) -> list[Program]:
+        """Only the ones that have been built, see `lazy_resources.py`."""
+        programs = self.mesh.vao.program.programs
+        return [
+            program
+            for program_name in SHADOW_PROGRAM_NAMES
+            if (program := programs.get_built(program_name)) is not None
+        ]
+
+    def build_instance_batches(self) -> None:
+        """Groups all the scene objects by their VBO and texture."""
+        for batch in self.instance_batches.values():
+            batch.destroy()
+        self.instance_batches = {}
+        vbo_map = self.mesh.vao.vbo.vbo_map
+        for vbo_name in self.batch_vbo_names:
+            vbo_map.release(vbo_name)
+        self.batch_vbo_names = []
+
         for obj in self.scene.objects:
-            obj.render_shadow()
+            key: tuple[str, int | str] = (obj.vao_name, obj.texture_id)
+            if key not in self.instance_batches:
+                vbo_name: str = self.mesh.vao.get_vbo_name(obj.vao_name)
+                vbo: VertexBufferObject = vbo_map.acquire(vbo_name)
+                self.batch_vbo_names.append(vbo_name)
+                self.instance_batches[key] = InstanceBatch(
+                    self.ctx,
+                    *self.get_instanced_programs(vbo.is_quantized),
+                    vbo,
+                    obj.texture,
+                    self.shadow_cascades.count,
+                )
+            self.instance_batches[key].add(obj)
+
+        self.batched_object_count = len(self.scene.objects)
+
+    def update_streamed_meshes(self) -> None:
+        if self.vao_version == self.mesh.vao.version:
+            return
+
+        self.vao_version = self.mesh.vao.version
+        # The scene object count never matches -1, so the batches get built again.
+        self.batched_object_count = -1
+        self.object_bounds = (
+            np.zeros((0, 3), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+        )
+        self.object_levels_of_detail = np.zeros(0, dtype=np.int32)
+        if self.shadow_cache is not None:
+            self.shadow_cache.invalidate()
+
+    def update_instance_batches(self) -> None:
+        if self.batched_object_count != len(self.scene.objects):
+            self.build_instance_batches()
+
+        self.culling_stats = CullingStats()
+        if not self.instance_batches:
+            return
+
+        batches: list[InstanceBatch] = list(self.instance_batches.values())
+        m_models: np.ndarray = self.app.transforms.m_models
+        batch_m_models: list[np.ndarray] = [
+            m_models[batch.transform_indices] for batch in batches
+        ]
+        batch_bounds: list[tuple[np.ndarray, np.ndarray]] = []
+        for batch, m_models in zip(batches, batch_m_models):
+            bounding_sphere: Optional[BoundingSphere] = batch.vbo.bounding_sphere
+            if bounding_sphere is None:
+                center, radius = np.zeros(3, dtype=np.float32), np.inf
+            else:
+                center, radius = bounding_sphere.center, bounding_sphere.radius
+            batch_bounds.append(transform_bounding_spheres(m_models, center, radius))
+
+        centers: np.ndarray = np.concatenate([centers for centers, _ in batch_bounds])
+        radii: np.ndarray = np.concatenate([radii for _, radii in batch_bounds])
+        static: np.ndarray = ~self.app.transforms.is_dynamic[
+            np.concatenate([batch.transform_indices for batch in batches])
+        ]
+        depths: np.ndarray = self.get_camera_depths(centers)
+        visible, casts_shadow, static_casts_shadow = self.cull(
+            centers, radii, depths, static
+        )
+        levels_of_detail: np.ndarray = self.get_levels_of_detail(
+            centers,
+            radii,
+            np.concatenate([batch.levels_of_detail for batch in batches]),
+            np.repeat(
+                [batch.level_count for batch in batches],
+                [len(batch.objects) for batch in batches],
+            ),
+        )
+        splits: np.ndarray = np.cumsum([len(m_models) for m_models in batch_m_models])
+        for (
+            batch,
+            m_models,
+            batch_visible,
+            batch_casts_shadow,
+            batch_static_casts_shadow,
+            batch_depths,
+            batch_levels_of_detail,
+        ) in zip(
+            batches,
+            batch_m_models,
+            np.split(visible, splits[:-1]),
+            np.split(casts_shadow, splits[:-1]),
+            np.split(static_casts_shadow, splits[:-1]),
+            np.split(depths, splits[:-1]),
+            np.split(levels_of_detail, splits[:-1]),
+        ):
+            batch.levels_of_detail = batch_levels_of_detail
+            # Front to back within the instanced draw as well so early depth testing kicks in.
+            visible_depths: np.ndarray = batch_depths[batch_visible]
+            order: np.ndarray = np.argsort(visible_depths)
+            batch.write(
+                m_models[batch_visible][order],
+                [m_models[cascade_mask] for cascade_mask in batch_casts_shadow.T],
+                batch_levels_of_detail[batch_visible][order],
+                [
+                    batch_levels_of_detail[cascade_mask]
+                    for cascade_mask in batch_casts_shadow.T
+                ],
+            )
+            if self.rebuild_static_shadows:
+                batch.write_static_shadow(
+                    [
+                        m_models[cascade_mask]
+                        for cascade_mask in batch_static_casts_shadow.T
+                    ]
+                )
+            self.submit_instance_batch(
+                batch, float(visible_depths[order[0]]) if len(order) > 0 else 0.0
+            )
+
+    def submit_instance_batch(self, batch: InstanceBatch, depth: float) -> None:
+        submissions: list[
+            tuple[RENDER_PASS, list[InstanceBuffer], Optional[Texture], int]
+        ] = [(RENDER_PASS.MAIN, batch.instances, batch.texture, 0)]
+        for cascade in range(self.shadow_cascades.count):
+            submissions.append(
+                (RENDER_PASS.SHADOW, batch.shadow_instances[cascade], None, cascade)
+            )
+            if self.rebuild_static_shadows:
+                submissions.append(
+                    (
+                        RENDER_PASS.STATIC_SHADOW,
+                        batch.static_shadow_instances[cascade],
+                        None,
+                        cascade,
+                    )
+                )
+
+        for render_pass, level_instances, texture, layer in submissions:
+            for instances in level_instances:
+                if instances.instance_count > 0:
+                    self.render_queue.submit(
+                        render_pass,
+                        instances.program,
+                        texture,
+                        instances.vao,
+                        depth,
+                        instances.render,
+                        layer,
+                    )
+
+    def get_levels_of_detail(
+        self,
+        centers: np.ndarray,
+        radii: np.ndarray,
+        previous_levels: np.ndarray,
+        level_counts: np.ndarray,
+    ) -> np.ndarray:
+        """Picks the levels of detail of the objects by the screen size of their bounding spheres."""
+        if not self.use_level_of_detail:
+            return np.zeros(len(radii), dtype=np.int32)
+
+        camera = self.app.camera
+        screen_sizes: np.ndarray = get_screen_sizes(
+            centers, radii, camera.position, camera.m_proj[1][1]
+        )
+        return np.minimum(
+            select_levels_of_detail(screen_sizes, previous_levels), level_counts - 1
+        )
+
+    def get_object_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        """Objects whose mesh has no bounding sphere get an infinite one so they're never culled."""
+        if len(self.object_bounds[1]) != len(self.scene.objects):
+            centers: list[np.ndarray] = []
+            radii: list[float] = []
+            level_counts: list[int] = []
+            for obj in self.scene.objects:
+                level_counts.append(len(obj.lod_ranges))
+                bounding_sphere = self.mesh.vao.get_vbo(obj.vao_name).bounding_sphere
+                if bounding_sphere is None:
+                    centers.append(np.zeros(3, dtype=np.float32))
+                    radii.append(np.inf)
+                else:
+                    centers.append(bounding_sphere.center)
+                    radii.append(bounding_sphere.radius)
+            self.object_bounds = (
+                np.array(centers, dtype=np.float32).reshape(-1, 3),
+                np.array(radii, dtype=np.float32),
+            )
+            self.object_level_counts = np.array(level_counts, dtype=np.int32)
+            # The new objects start out at the finest level.
+            self.object_levels_of_detail = np.pad(
+                self.object_levels_of_detail,
+                (0, len(level_counts) - len(self.object_levels_of_detail)),
+            )
+        return self.object_bounds
+
+    def update_visible_objects(self) -> None:
+        objects: list[Model] = self.scene.objects
+        centers, radii = transform_bounding_spheres(
+            self.scene.m_models, *self.get_object_bounds()
+        )
+        static: np.ndarray = ~self.scene.is_dynamic
+        depths: np.ndarray = self.get_camera_depths(centers)
+        visible, casts_shadow, static_casts_shadow = self.cull(
+            centers, radii, depths, static
+        )
+        self.object_levels_of_detail = self.get_levels_of_detail(
+            centers, radii, self.object_levels_of_detail, self.object_level_counts
+        )
+        for (
+            obj,
+            obj_visible,
+            obj_casts_shadow,
+            obj_static_casts_shadow,
+            depth,
+            level_of_detail,
+        ) in zip(
+            objects,
+            visible,
+            casts_shadow,
+            static_casts_shadow,
+            depths.tolist(),
+            self.object_levels_of_detail.tolist(),
+        ):
+            # The static shadow cache outlives the current level, it gets the finest shadow level.
+            for render_pass, cascade_masks, render_shadow in (
+                (RENDER_PASS.STATIC_SHADOW, obj_static_casts_shadow, obj.render_shadow),
+                (
+                    RENDER_PASS.SHADOW,
+                    obj_casts_shadow,
+                    functools.partial(obj.render_shadow, level_of_detail),
+                ),
+            ):
+                for cascade in np.flatnonzero(cascade_masks).tolist():
+                    self.render_queue.submit(
+                        render_pass,
+                        obj.shadow_program,
+                        None,
+                        obj.shadow_vao,
+                        depth,
+                        render_shadow,
+                        cascade,
+                    )
+            if obj_visible:
+                self.render_queue.submit(
+                    RENDER_PASS.MAIN,
+                    obj.program,
+                    obj.texture,
+                    obj.vao,
+                    depth,
+                    functools.partial(obj.draw, level_of_detail),
+                )
+
+    def get_camera_depths(self, centers: np.ndarray) -> np.ndarray:
+        """Distances of the points along the view direction, used to draw front to back."""
+        camera = self.app.camera
+        return (centers - np.array(camera.position)) @ np.array(camera.forward)
+
+    def cull(
+        self,
+        centers: np.ndarray,
+        radii: np.ndarray,
+        depths: np.ndarray,
+        static: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Takes the world space bounding spheres of all objects, their camera depths and which of
+        them are static. Returns the mask of the objects the camera can see and the
+        (N, cascade count) masks of the objects that have to be drawn into the shadow cascades
+        this frame and of the static ones that go into the shadow cache.
+        """
+        visible: np.ndarray = np.ones(len(radii), dtype=bool)
+        if self.use_frustum_culling:
+            visible = get_visible_mask(self.frustum_planes, centers, radii)
+
+        cascades: list[ShadowCascade] = self.shadow_cascades.cascades
+        casts_shadow: np.ndarray = np.ones((len(radii), len(cascades)), dtype=bool)
+        if self.use_shadow_caster_culling:
+            for index, cascade in enumerate(cascades):
+                # Only the visible objects within the depth range of a cascade receive its shadow.
+                receivers: np.ndarray = (
+                    visible
+                    & (depths + radii >= cascade.near)
+                    & (depths - radii <= cascade.far)
+                )
+                caster_planes: Optional[np.ndarray] = self.get_shadow_caster_planes(
+                    cascade.m_light_proj_view, centers[receivers], radii[receivers]
+                )
+                if caster_planes is None:
+                    casts_shadow[:, index] = False
+                else:
+                    casts_shadow[:, index] = get_visible_mask(
+                        caster_planes, centers, radii
+                    )
+
+        # The cached shadow map doesn't depend on what the camera sees, so the static casters
+        # only get culled against the whole volume of the cascades.
+        static_casts_shadow: np.ndarray = np.zeros_like(casts_shadow)
+        if self.shadow_cache is not None:
+            self.rebuild_static_shadows = self.shadow_cache.update(
+                [cascade.m_light_proj_view for cascade in cascades], static
+            )
+            if self.rebuild_static_shadows:
+                static_casts_shadow[:] = static[:, np.newaxis]
+                if self.use_shadow_caster_culling:
+                    for index, cascade in enumerate(cascades):
+                        static_casts_shadow[:, index] &= get_visible_mask(
+                            get_frustum_planes(cascade.m_light_proj_view),
+                            centers,
+                            radii,
+                        )
+            casts_shadow &= ~static[:, np.newaxis]
+
+        self.culling_stats = CullingStats(
+            len(radii),
+            int(np.count_nonzero(visible)),
+            int(np.count_nonzero(casts_shadow.any(axis=1))),
+            int(np.count_nonzero(static_casts_shadow.any(axis=1))),
+        )
+        return visible, casts_shadow, static_casts_shadow
+
+    def get_shadow_caster_planes(
+        self,
+        m_light_proj_view: mat4,
+        receiver_centers: np.ndarray,
+        receiver_radii: np.ndarray,
+    ) -> Optional[np.ndarray]:
+        """
+        An object can only cast a shadow the camera can see if it's inside the part of the light
+        frustum covering the visible receivers and in front of the farthest one of them. Returns
+        None if there is nothing to receive a shadow.
+        """
+        if len(receiver_radii) == 0:
+            return None
+
+        bounds: Optional[tuple[tuple[float, float], ...]] = get_ndc_bounds(
+            m_light_proj_view, receiver_centers, receiver_radii
+        )
+        if bounds is None:
+            return get_frustum_planes(m_light_proj_view)
+
+        x_bounds, y_bounds, (_, z_max) = bounds
+        return get_frustum_planes(
+            m_light_proj_view, (x_bounds, y_bounds, (-1.0, z_max))
+        )
+
+    def execute_shadow_cascades(self, render_pass: RENDER_PASS) -> None:
+        """Draws the pass once per cascade into its part of the bound shadow map."""
+        for index, cascade in enumerate(self.shadow_cascades.cascades):
+            self.ctx.viewport = cascade.viewport
+            for program in self.shadow_programs:
+                program["u_cascade"] = index
+            self.render_queue.execute(render_pass, index)
+
+    def render_shadow(self):
+        if self.shadow_cache is not None:
+            if self.rebuild_static_shadows:
+                self.shadow_cache.begin_rebuild()
+                self.execute_shadow_cascades(RENDER_PASS.STATIC_SHADOW)
+            self.shadow_cache.copy_to(self.depth_fbo)
+        else:
+            self.depth_fbo.clear()
+            self.depth_fbo.use()
+        self.execute_shadow_cascades(RENDER_PASS.SHADOW)
 
     def main_render(self):
-        self.app.ctx.screen.use()
-        for obj in self.scene.objects:
-            obj.render()
-        self.scene.skybox.render()
+        self.app.framebuffer.use()
+        self.render_queue.execute(RENDER_PASS.MAIN)
         self.scene.quad.render()
         self.scene.line.render()
         # self.scene.global_coordinate_axis.render()
 
+    def skybox_render(self):
+        # Drawn after the opaque objects, so it's only shaded where nothing covers it.
+        self.scene.skybox.render()
+
     def debug_render(self):
         # Coordinate axis
         self.app.ctx.disable(mgl.DEPTH_TEST)
@@ -46,11 +514,35 @@ class SceneRenderer:
         self.app.ctx.enable(mgl.DEPTH_TEST)
 
     def render(self):
-        # Maybe also have a fixed_update function for physics stuff
-        self.scene.update()
-        self.render_shadow()
-        self.main_render()
-        self.debug_render()
+        profiler: FrameProfiler = self.app.profiler
+        with profiler.stage("scene.update"):
+            # Maybe also have a fixed_update function for physics stuff
+            camera = self.app.camera
+            self.frustum_planes = get_frustum_planes(camera.m_proj * camera.m_view)
+            self.shadow_cascades.update(camera, self.app.light)
+            self.app.frame_uniforms.write_shadow_cascades(self.shadow_cascades)
+            self.scene.update_transforms()
+            self.update_streamed_meshes()
+            self.render_queue.clear()
+            if self.use_instancing:
+                self.update_instance_batches()
+            else:
+                self.update_visible_objects()
+        with profiler.gpu_stage("render_shadow"):
+            self.render_shadow()
+        with profiler.gpu_stage("main_render"):
+            self.main_render()
+        with profiler.gpu_stage("skybox_render"):
+            self.skybox_render()
+        with profiler.gpu_stage("debug_render"):
+            self.debug_render()
+        profiler.count_fields("culling", self.culling_stats)
+        profiler.count("culling.culled", self.culling_stats.culled)
+        profiler.count_fields("render_queue", self.render_queue.stats)
 
     def destroy(self):
+        for batch in self.instance_batches.values():
+            batch.destroy()
+        if self.shadow_cache is not None:
+            self.shadow_cache.destroy()
         self.depth_fbo.release()
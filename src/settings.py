@@ -28,6 +28,21 @@ class Physics:
     GRAVITATIONAL_CONSTANT: float = 9.81  # Accelerates in -y with G meters per second
 
 
+@dataclass
+class Simulation:
+    # Simulation steps per second, independent of the frame rate, see `fixed_timestep.py`.
+    STEP_RATE: float = 60.0
+    # After a long frame the simulation falls behind instead of taking ever longer frames to
+    # catch up, the time beyond this many steps gets dropped.
+    MAX_STEPS_PER_FRAME: int = 5
+    # The speeds of the player are distances per step at this many steps per second, they get
+    # scaled by the actual step length so changing `STEP_RATE` doesn't change how fast it moves.
+    REFERENCE_STEP_RATE: float = 60.0
+    # Draws the transforms interpolated between the last two steps, otherwise they move in steps
+    # whenever the simulation runs at a lower rate than the rendering.
+    INTERPOLATION: bool = True
+
+
 @dataclass
 class Logging:
     LEVEL: int = logging.DEBUG
@@ -58,10 +73,94 @@ class OpenGL:
     WINDOW_SIZE: tuple[int, int] = (1600, 900)
     MAJOR_VERSION: int = 3
     MINOR_VERSION: int = 3
+    REQUIRED_VERSION: int = 100 * MAJOR_VERSION + 10 * MINOR_VERSION
 
     FPS_TARGET: float = 60.0
 
 
+@dataclass
+class Rendering:
+    # Draws all `Model`s sharing a vao and a texture with a single instanced draw call.
+    INSTANCING: bool = True
+    # Skips the objects whose bounding sphere is outside of the view frustum in the main pass.
+    FRUSTUM_CULLING: bool = True
+    # Only draws the objects into the shadow map that can shadow something the camera sees.
+    SHADOW_CASTER_CULLING: bool = True
+    # Renders the casters that don't move into a cached depth texture that gets reused.
+    STATIC_SHADOW_CACHE: bool = True
+    # Draws the generated meshes with fewer vertices the smaller they appear on the screen.
+    LEVEL_OF_DETAIL: bool = True
+    # Stores the shared vertices of the triangle meshes once and draws them through index buffers.
+    INDEXED_GEOMETRY: bool = True
+    # Packs the vertices of the meshes into 16 instead of 32 bytes, decoded in the vertex shaders.
+    QUANTIZED_VERTICES: bool = True
+
+
+@dataclass
+class Streaming:
+    # Loads the textures and the heavy meshes in the background, the models draw placeholders until
+    # they are uploaded. Otherwise the first frame waits until everything is loaded.
+    ENABLED: bool = True
+    # Threads loading the assets, 0 leaves the number to `ThreadPoolExecutor`.
+    WORKERS: int = 0
+    # Milliseconds per frame spent on uploading the loaded assets, at least one upload step runs
+    # every frame.
+    UPLOAD_BUDGET_MS: float = 2.0
+
+
+@dataclass
+class Textures:
+    # Caches the decoded textures with their mip chains on disk, so later launches neither decode
+    # the image files nor build the mip chains.
+    DISK_CACHE: bool = True
+
+
+@dataclass
+class LevelOfDetail:
+    # (sectors, stacks) of the sphere levels after the first one, which is loaded from its file.
+    SPHERE_LEVELS: tuple[tuple[int, int], ...] = ((16, 8), (8, 4))
+    # Sectors of the cylinder levels after the first one.
+    CYLINDER_LEVELS: tuple[int, ...] = (16, 8)
+    # Fractions of the triangles the decimated cat levels after the first one keep, the shadows use
+    # the last one.
+    CAT_LEVELS: tuple[float, ...] = (0.25, 0.05)
+    # Fractions of the screen height below which an object switches to the next coarser level.
+    SCREEN_SIZES: tuple[float, ...] = (0.1, 0.025)
+    # The screen size has to move this fraction past a threshold before the level changes.
+    HYSTERESIS: float = 0.15
+
+
+@dataclass
+class Shadows:
+    # Number of slices the view frustum gets split into, each with its own orthographic shadow map.
+    CASCADES: int = 3
+    # Width and height of the shadow map of a single cascade, they are placed side by side in one
+    # depth texture, so 3 cascades at 640 take less memory than the 1600x900 window.
+    RESOLUTION: int = 640
+    # Up to which distance from the camera shadows are drawn.
+    DISTANCE: float = Camera.FAR
+    # Blend between uniform (0.0) and logarithmic (1.0) split distances of the cascades.
+    SPLIT_LAMBDA: float = 0.8
+    # How far behind a cascade, towards the light, casters still get drawn into it.
+    CASTER_DISTANCE: float = 100.0
+    # The cascades only move in steps of this fraction of their radius so the shadow map doesn't
+    # shimmer and the static shadow cache stays valid while the camera moves within a step.
+    SNAP: float = 0.125
+
+
+@dataclass
+class Profiling:
+    # Number of frames the `FrameProfiler` keeps the timings of.
+    HISTORY: int = 600
+    # Measures the GPU time of the render passes with timer queries.
+    GPU_TIMERS: bool = True
+    # Frames until the GPU times get read back, reading them earlier would stall until the GPU
+    # caught up with the CPU.
+    GPU_QUERY_LATENCY: int = 3
+    # Every this many frames the timings get logged, 0 turns it off.
+    LOG_INTERVAL: int = 600
+
+
 @dataclass
 class Colors:
     # This should never be visible
@@ -80,6 +179,10 @@ class Folders:
     UTIL: str = "util"
     LOGS: str = "logs"
     OBJECTS: str = "objects"
+    CACHE: str = "cache"
+    CACHE_OBJ: str = os.path.join(CACHE, "obj")
+    CACHE_TEXTURES: str = os.path.join(CACHE, "textures")
+    CACHE_MESHES: str = os.path.join(CACHE, "meshes")
 
     DATA: str = "data"
     DATA_SOUND: str = os.path.join(DATA, "sound")
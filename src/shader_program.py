@@ -2,33 +2,90 @@ from . import *
 
 """"""
 
+from moderngl import Context, Program
+
+from .lazy_resources import LazyResources
 from .settings import Folders
+from .uniform_buffer import FRAME_DATA_BINDING, FRAME_DATA_BLOCK
+
+# Programs that are compiled from the shader files of another program with additional
+# preprocessor defines, so we don't have to keep multiple copies of the same shader in sync.
+# fmt: off
+program_variants: dict[str, tuple[str, tuple[str, ...]]] = {
+#     PROGRAM_NAME                       SHADER_NAME     DEFINES
+    "default_instanced"              : ("default"    , ("INSTANCED",)),
+    "shadow_map_instanced"           : ("shadow_map" , ("INSTANCED",)),
+    "default_quantized"              : ("default"    , ("QUANTIZED",)),
+    "default_instanced_quantized"    : ("default"    , ("INSTANCED", "QUANTIZED")),
+    "shadow_map_quantized"           : ("shadow_map" , ("QUANTIZED",)),
+    "shadow_map_instanced_quantized" : ("shadow_map" , ("INSTANCED", "QUANTIZED")),
+    "collider_quantized"             : ("collider"   , ("QUANTIZED",)),
+}
+# fmt: on
+
+
+def get_program_variant(program_name: str, quantized: bool) -> str:
+    """The variant of the program that decodes quantized vertices, see `vertex_quantization.py`."""
+    return f"{program_name}_quantized" if quantized else program_name
+
+
+def resolve_includes(source: str) -> str:
+    """GLSL has no includes, so `#include "filename"` lines get replaced by that shader file."""
+    lines: list[str] = []
+    for line in source.splitlines():
+        if line.strip().startswith("#include"):
+            filename: str = line.split('"')[1]
+            with open(os.path.join(Folders.SHADERS, filename)) as file:
+                lines.append(file.read())
+        else:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def add_defines(source: str, defines: Iterable[str]) -> str:
+    """Inserts the `#define`s directly after the `#version` directive, which has to come first."""
+    lines: list[str] = source.splitlines()
+    version_idx: int = next(
+        i for i, line in enumerate(lines) if line.strip().startswith("#version")
+    )
+    define_lines: list[str] = [f"#define {define}" for define in defines]
+    return "\n".join(lines[: version_idx + 1] + define_lines + lines[version_idx + 1 :])
+
+
+# Programs that are compiled from the shader files of the same name.
+# fmt: off
+program_names: list[str] = [
+    "default", "skybox", "advanced_skybox", "shadow_map", "quad", "coordinate_axis", "ui_text",
+    "line", "collider", "depth_copy",
+]
+# fmt: on
 
 
 class ShaderProgram:
     def __init__(self, ctx: Context):
         self.ctx: Context = ctx
-        self.programs: dict[str, Program] = {
-            k: self.get_shader_program(k)
-            for k in [
-                "default",
-                "skybox",
-                "advanced_skybox",
-                "shadow_map",
-                "quad",
-                "coordinate_axis",
-                "ui_text",
-                "line",
-                "collider",
-            ]
-        }
-
-    def get_shader_program(self, shader_name) -> Program:
+        # Only compiled once they're first used, see `lazy_resources.py`.
+        self.programs: LazyResources[Program] = LazyResources(
+            "program",
+            program_names + list(program_variants),
+            self.create_program,
+            lambda _, program: program.release(),
+        )
+
+    def create_program(self, program_name: str) -> Program:
+        shader_name, defines = program_variants.get(program_name, (program_name, ()))
+        program: Program = self.get_shader_program(shader_name, defines)
+        frame_data_block = program.get(FRAME_DATA_BLOCK, None)
+        if frame_data_block is not None:
+            frame_data_block.binding = FRAME_DATA_BINDING
+        return program
+
+    def get_shader_program(self, shader_name, defines: Iterable[str] = ()) -> Program:
         with open(os.path.join(Folders.SHADERS, f"{shader_name}.vert")) as file:
-            vertex_shader = file.read()
+            vertex_shader = add_defines(resolve_includes(file.read()), defines)
 
         with open(os.path.join(Folders.SHADERS, f"{shader_name}.frag")) as file:
-            fragment_shader = file.read()
+            fragment_shader = add_defines(resolve_includes(file.read()), defines)
 
         program: Program = self.ctx.program(
             vertex_shader=vertex_shader, fragment_shader=fragment_shader
@@ -36,5 +93,4 @@ class ShaderProgram:
         return program
 
     def destroy(self) -> None:
-        for program in self.programs.values():
-            program.release()
+        self.programs.destroy()
@@ -0,0 +1,74 @@
+from . import *
+
+"""
+The light doesn't move and the shadow cascades only move in coarse steps, so the depth of the
+shadow casters that don't move either only has to be rendered when a cascade moved. Every frame
+the cached depth gets copied into the shadow map and only the dynamic casters are drawn on top
+of it.
+"""
+
+from moderngl import Context, Framebuffer, Program, Texture, VertexArray
+
+
+class StaticShadowCache:
+    def __init__(self, ctx: Context, program: Program, size: tuple[int, int]):
+        self.ctx: Context = ctx
+
+        self.depth_texture: Texture = self.ctx.depth_texture(size)
+        # Read as plain depth values by `depth_copy.frag` instead of compared against.
+        self.depth_texture.compare_func = ""
+        self.fbo: Framebuffer = self.ctx.framebuffer(
+            depth_attachment=self.depth_texture
+        )
+
+        self.program: Program = program
+        self.program["u_depth"] = 0
+        # The fullscreen triangle is generated from gl_VertexID, no buffers needed.
+        self.vao: VertexArray = self.ctx.vertex_array(self.program, [])
+
+        # What the cached depth was rendered with, the cache is invalid if any of it changes.
+        self.m_light_proj_views_bytes: Optional[bytes] = None
+        self.static_mask: Optional[np.ndarray] = None
+
+        self.rebuild_count = 0
+
+    def update(self, m_light_proj_views: list[mat4], static_mask: np.ndarray) -> bool:
+        """
+        Takes the light projection view matrices of the shadow cascades and which scene objects
+        are static this frame, returns True if the cached depth is stale and has to be rendered
+        again.
+        """
+        m_light_proj_views_bytes: bytes = b"".join(
+            [m_light_proj_view.to_bytes() for m_light_proj_view in m_light_proj_views]
+        )
+        if (
+            self.m_light_proj_views_bytes == m_light_proj_views_bytes
+            and self.static_mask is not None
+            and np.array_equal(self.static_mask, static_mask)
+        ):
+            return False
+
+        self.m_light_proj_views_bytes = m_light_proj_views_bytes
+        self.static_mask = static_mask.copy()
+        self.rebuild_count += 1
+        return True
+
+    def invalidate(self) -> None:
+        """Makes the next `update` rebuild the cache, for when the meshes of the casters changed."""
+        self.static_mask = None
+
+    def begin_rebuild(self) -> None:
+        """Clears the cache and binds it so the static casters can be drawn into it."""
+        self.fbo.clear()
+        self.fbo.use()
+
+    def copy_to(self, fbo: Framebuffer) -> None:
+        """Replaces the depth of the framebuffer with the cached one and leaves it bound."""
+        fbo.clear()
+        fbo.use()
+        self.depth_texture.use(location=0)
+        self.vao.render(mgl.TRIANGLES, vertices=3)
+
+    def destroy(self) -> None:
+        for resource in (self.vao, self.fbo, self.depth_texture):
+            resource.release()
@@ -0,0 +1,156 @@
+from . import *
+
+"""
+Cascaded shadow maps, the view frustum up to `settings.Shadows.DISTANCE` gets split into slices
+and every slice gets its own orthographic light projection fitted tightly around it. Close to the
+camera the slices are small, so a texel of their shadow map covers much less of the scene than one
+of a single shadow map stretched over the whole frustum.
+
+The shadow maps of all cascades sit side by side in one depth texture, `default.frag` picks the
+cascade by the view space depth of the fragment.
+
+https://learn.microsoft.com/en-us/windows/win32/dxtecharticles/cascaded-shadow-maps
+"""
+
+import math
+
+from . import settings
+
+if TYPE_CHECKING:
+    from .camera import Camera
+    from .light import Light
+
+# Has to match `MAX_SHADOW_CASCADES` in `shaders/frame_data.glsl`.
+MAX_SHADOW_CASCADES = 4
+# Texels at the border of each cascade that nothing inside of the slice falls onto, so the PCF
+# samples in `default.frag` never reach into the neighbouring cascade of the atlas.
+BORDER_TEXELS = 2
+
+
+@dataclass
+class ShadowCascade:
+    # Distances along the camera view direction the cascade is used between.
+    near: float
+    far: float
+    m_light_proj_view: mat4
+    # Part of the depth texture atlas the cascade gets rendered into.
+    viewport: tuple[int, int, int, int]
+
+
+def get_cascade_splits(
+    near: float, far: float, count: int, split_lambda: float
+) -> np.ndarray:
+    """
+    The far distances of the `count` cascades, a blend of logarithmic splits that keep the texel
+    size proportional to the distance and uniform splits that don't spend as much of the
+    resolution right in front of the camera.
+
+    https://developer.nvidia.com/gpugems/gpugems3/part-ii-light-and-shadows/chapter-10-parallel-split-shadow-maps-programmable-gpus
+    """
+    ratios: np.ndarray = np.arange(1, count + 1) / count
+    logarithmic: np.ndarray = near * (far / near) ** ratios
+    uniform: np.ndarray = near + (far - near) * ratios
+    return split_lambda * logarithmic + (1.0 - split_lambda) * uniform
+
+
+def get_slice_bounding_sphere(
+    near: float, far: float, fov_y: float, aspect_ratio: float
+) -> tuple[float, float]:
+    """
+    Smallest sphere around the part of a symmetric view frustum between the `near` and `far`
+    distances, `fov_y` in radians. Returns the distance of its center along the view direction and
+    its radius, neither depends on the orientation of the camera so a cascade keeps its size when
+    the camera turns.
+    """
+    # Squared ratio between the half diagonal of a cross section and its distance.
+    diagonal_sq: float = math.tan(0.5 * fov_y) ** 2 * (1.0 + aspect_ratio**2)
+    # Equidistant to the corners of the near and the far cross section.
+    center: float = min(0.5 * (1.0 + diagonal_sq) * (near + far), far)
+    radius: float = math.sqrt((far - center) ** 2 + diagonal_sq * far**2)
+    return center, radius
+
+
+class ShadowCascades:
+    def __init__(
+        self,
+        count: int = settings.Shadows.CASCADES,
+        resolution: int = settings.Shadows.RESOLUTION,
+    ):
+        assert (
+            1 <= count <= MAX_SHADOW_CASCADES
+        ), f"Between 1 and {MAX_SHADOW_CASCADES} shadow cascades are supported, got {count}."
+        self.count: int = count
+        self.resolution: int = resolution
+        self.cascades: list[ShadowCascade] = []
+
+    @property
+    def atlas_size(self) -> tuple[int, int]:
+        return (self.count * self.resolution, self.resolution)
+
+    def update(self, camera: "Camera", light: "Light") -> None:
+        """Fits the cascades to the current view frustum of the camera."""
+        near: float = camera.near_plane
+        far: float = min(settings.Shadows.DISTANCE, camera.far_plane)
+        splits: np.ndarray = get_cascade_splits(
+            near, far, self.count, settings.Shadows.SPLIT_LAMBDA
+        )
+
+        self.cascades = []
+        for index, split_far in enumerate(splits.tolist()):
+            split_near: float = near if index == 0 else float(splits[index - 1])
+            center_distance, radius = get_slice_bounding_sphere(
+                split_near, split_far, glm.radians(camera.fov), camera.aspect_ratio
+            )
+            center: vec3 = camera.position + center_distance * camera.forward
+            self.cascades.append(
+                ShadowCascade(
+                    split_near,
+                    split_far,
+                    self.get_light_proj_view(light.m_view_light, center, radius),
+                    (index * self.resolution, 0, self.resolution, self.resolution),
+                )
+            )
+
+    def get_light_proj_view(
+        self, m_view_light: mat4, center: vec3, radius: float
+    ) -> mat4:
+        """
+        Orthographic projection around the sphere in light space that also reaches
+        `settings.Shadows.CASTER_DISTANCE` further towards the light, so casters outside of the
+        slice still shadow it.
+
+        The center is snapped to a grid of whole texels in light space, the projection only
+        changes when the camera moved across a grid cell, the radius gets padded so the slice
+        stays covered in between.
+        """
+        snap_fraction: float = settings.Shadows.SNAP
+        padded_radius: float = (
+            (1.0 + snap_fraction)
+            * radius
+            * self.resolution
+            / (self.resolution - 2 * BORDER_TEXELS)
+        )
+        texel_size: float = 2.0 * padded_radius / self.resolution
+        snap: float = texel_size * max(
+            1, math.floor(snap_fraction * radius / texel_size)
+        )
+
+        light_center: vec3 = vec3(m_view_light * vec4(center, 1.0))
+        light_center = glm.round(light_center / snap) * snap
+
+        # The light looks down -z in light space, it's a point light so nothing behind it casts
+        # a shadow.
+        near: float = max(
+            0.0, -light_center.z - padded_radius - settings.Shadows.CASTER_DISTANCE
+        )
+        return (
+            glm.ortho(
+                light_center.x - padded_radius,
+                light_center.x + padded_radius,
+                light_center.y - padded_radius,
+                light_center.y + padded_radius,
+                near,
+                max(near + EPS, -light_center.z + padded_radius),
+            )
+            * m_view_light
+        )
@@ -1,96 +1,217 @@
 from . import *
 
-""""""
+"""
+Loads the textures. Decoding the image files takes most of the startup time of the textures and
+doesn't need the OpenGL context, so they get decoded and flipped in the background by the
+`AssetStreamer`, PIL releases the GIL while it decodes. Only the uploads into the textures happen
+on the thread the context belongs to.
 
-from .settings import Folders
+The textures are created right away at their final size and filled with
+`settings.Colors.MISSING_TEXTURE`, the models keep using the same texture objects when the images
+get uploaded into them.
+
+With `settings.Textures.DISK_CACHE` the decoded and flipped images are cached on disk together
+with their mip chains, see `asset_cache.py` and `mip_chain.py`, later launches memory-map them and
+upload all the levels without decoding anything.
+"""
+
+import functools
+from typing import Iterator
+
+from moderngl import Context, Framebuffer, Texture, TextureCube
+
+from . import my_logger
+from .asset_cache import load_cached_array_with_attributes
+from .asset_streaming import AssetStreamer
+from .mip_chain import build_mip_chain, split_mip_chain
+from .settings import Colors, Folders, Shadows, Textures
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
 
+logger = my_logger.setup("Texture")
+
+# Order of the faces in a `TextureCube`, the side faces get mirrored horizontally and the top and
+# bottom ones vertically to match the orientation OpenGL expects for cube maps.
+CUBE_FACES: list[str] = ["right", "left", "top", "bottom", "back", "front"]
+CUBE_FACES_FLIPPED_X: list[str] = ["right", "left", "front", "back"]
+
+
+def decode_image(
+    filepath: str, flip_x: bool = False, flip_y: bool = False
+) -> np.ndarray:
+    """Decodes the image file into a contiguous RGB array (height, width, 3) of uint8."""
+    with Image.open(filepath) as image:
+        pixels: np.ndarray = np.asarray(image.convert("RGB"))
+    if flip_x:
+        pixels = pixels[:, ::-1]
+    if flip_y:
+        pixels = pixels[::-1]
+    return np.ascontiguousarray(pixels)
+
+
+def get_cache_name(filepath: str, flip_x: bool, flip_y: bool, mipmaps: bool) -> str:
+    """The file names of the cube faces repeat, so the path is part of the name."""
+    name: str = os.path.normpath(filepath).replace(os.sep, "-")
+    return f"{name}-x{flip_x:d}-y{flip_y:d}-mip{mipmaps:d}"
+
+
+def load_image_levels(
+    filepath: str, flip_x: bool = False, flip_y: bool = False, mipmaps: bool = True
+) -> list[np.ndarray]:
+    """
+    The decoded image followed by the rest of its mip chain, from the texture cache. Without the
+    cache it's only the decoded image and the rest of the levels have to be built on the GPU.
+    """
+    if not Textures.DISK_CACHE:
+        return [decode_image(filepath, flip_x, flip_y)]
+
+    def parse(filepath: str) -> tuple[np.ndarray, dict]:
+        pixels: np.ndarray = decode_image(filepath, flip_x, flip_y)
+        height, width, components = pixels.shape
+        chain: np.ndarray = build_mip_chain(pixels) if mipmaps else pixels.reshape(-1)
+        return chain, {"width": width, "height": height, "components": components}
+
+    chain, attributes = load_cached_array_with_attributes(
+        filepath,
+        parse,
+        Folders.CACHE_TEXTURES,
+        get_cache_name(filepath, flip_x, flip_y, mipmaps),
+    )
+    width, height, components = (
+        attributes["width"],
+        attributes["height"],
+        attributes["components"],
+    )
+    if not mipmaps:
+        return [chain.reshape(height, width, components)]
+    return split_mip_chain(chain, width, height, components)
+
+
+def load_cube_face(folderpath: str, face: str, ext: str = "png") -> np.ndarray:
+    """The cube maps are only sampled linearly, so their faces have no mip chains."""
+    return load_image_levels(
+        os.path.join(folderpath, f"{face}.{ext}"),
+        flip_x=face in CUBE_FACES_FLIPPED_X,
+        flip_y=face not in CUBE_FACES_FLIPPED_X,
+        mipmaps=False,
+    )[0]
+
+
+def get_image_size(filepath: str) -> tuple[int, int]:
+    """(width, height) of the image, only reads the header of the file."""
+    with Image.open(filepath) as image:
+        return image.size
+
 
 class TextureHandler:
-    def __init__(self, app: "GraphicsEngine"):
+    def __init__(self, app: "GraphicsEngine", streamer: AssetStreamer):
         self.app: GraphicsEngine = app
         self.ctx: Context = app.ctx
+        self.streamer: AssetStreamer = streamer
         self.texture_folderpath: str = Folders.TEXTURES
-        self.textures: dict[int, Texture] = {
-            i: self.get_texture(
-                os.path.join(self.texture_folderpath, f"img_{i}.png"), mode=0
+
+        self.textures: dict[int | str, Texture | TextureCube] = {}
+        for i in range(3):
+            self.stream_texture(
+                i,
+                os.path.join(self.texture_folderpath, f"img_{i}.png"),
+                anisotropy=16.0,
             )
-            for i in range(3)
-        }
-        self.textures["cat"] = self.get_texture(
-            os.path.join(Folders.DATA_OBJ, "cat", "20430_cat_diff_v1.jpg"), mode=1
+        self.stream_texture(
+            "cat",
+            os.path.join(Folders.DATA_OBJ, "cat", "20430_cat_diff_v1.jpg"),
+            flip_y=True,
+            anisotropy=32.0,
         )
-        self.textures["skybox_debug"] = self.get_texture_cube(
-            os.path.join(self.texture_folderpath, "skybox"), ext="png"
+        self.stream_texture_cube(
+            "skybox_debug", os.path.join(self.texture_folderpath, "skybox")
         )
-        self.textures["skybox"] = self.get_texture_cube(
-            os.path.join(self.texture_folderpath, "skybox1"), ext="png"
+        self.stream_texture_cube(
+            "skybox", os.path.join(self.texture_folderpath, "skybox1")
         )
-        self.textures["depth_texture"] = self.get_depth_texture()
 
-    def get_depth_texture(self) -> Texture:
-        depth_texture: Texture = self.ctx.depth_texture(self.app.window_size)
-        depth_texture.repeat_x = False
-        depth_texture.repeat_y = False
-        return depth_texture
-
-    def get_texture_cube(self, filepath: str, ext="png") -> TextureCube:
-        faces: list[str] = ["right", "left", "top", "bottom", "back", "front"]
+        self.textures["depth_texture"] = self.get_depth_texture()
 
-        textures: list[pg.Surface] = []
-        for face in faces:
-            texture: pg.Surface = pg.image.load(os.path.join(filepath, f"{face}.{ext}"))
-            if face in ["right", "left", "front", "back"]:
-                texture = pg.transform.flip(texture, flip_x=True, flip_y=False)
-            else:
-                texture = pg.transform.flip(texture, flip_x=False, flip_y=True)
-            textures.append(texture)
+    def stream_texture(
+        self,
+        texture_id: int | str,
+        filepath: str,
+        flip_x: bool = False,
+        flip_y: bool = False,
+        anisotropy: float = 16.0,
+    ) -> None:
+        texture: Texture = self.ctx.texture(get_image_size(filepath), components=3)
+        # Only the first level exists until the image is uploaded.
+        texture.filter = (mgl.LINEAR, mgl.LINEAR)
+        framebuffer: Framebuffer = self.ctx.framebuffer(color_attachments=[texture])
+        framebuffer.clear(color=Colors.MISSING_TEXTURE)
+        framebuffer.release()
+
+        self.textures[texture_id] = texture
+        self.streamer.submit(
+            f"texture {texture_id}",
+            functools.partial(load_image_levels, filepath, flip_x, flip_y),
+            functools.partial(self.upload_texture, texture, anisotropy=anisotropy),
+        )
 
-        assert len(set([texture.get_size() for texture in textures])) == 1
-        size: tuple[int] = textures[0].get_size()
+    def stream_texture_cube(self, texture_id: str, folderpath: str) -> None:
+        """Every face gets loaded on its own, the faces have to be of the same size."""
+        width, height = get_image_size(os.path.join(folderpath, f"{CUBE_FACES[0]}.png"))
         texture_cube: TextureCube = self.ctx.texture_cube(
-            size=size, components=3, data=None
+            size=(width, height), components=3
         )
-
-        for i in range(6):
-            texture_data: bytes = pg.image.tostring(textures[i], "RGB")
-            texture_cube.write(face=i, data=texture_data)
-
-        return texture_cube
-
-    def get_texture(self, filepath: str, mode=0) -> Texture:
-        if mode == 0:
-            image: Image.Image = Image.open(filepath)
-            image = image.convert("RGB")
-
-            data: bytes = np.array(image).tobytes()
-
-            texture: Texture = self.ctx.texture(
-                size=image.size, components=3, data=data
+        placeholder: np.ndarray = np.empty((height, width, 3), dtype=np.uint8)
+        placeholder[:] = np.round(np.array(Colors.MISSING_TEXTURE) * 255)
+        for i, face in enumerate(CUBE_FACES):
+            texture_cube.write(face=i, data=placeholder)
+            self.streamer.submit(
+                f"texture {texture_id} {face}",
+                functools.partial(load_cube_face, folderpath, face),
+                functools.partial(self.upload_cube_face, texture_cube, i),
             )
 
-            texture.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
+        self.textures[texture_id] = texture_cube
+
+    def upload_texture(
+        self, texture: Texture, levels: list[np.ndarray], anisotropy: float = 16.0
+    ) -> Iterator[None]:
+        """
+        Uploads the levels `load_image_levels` returned one per step, builds the mip chain on the
+        GPU if it only returned the first one.
+        """
+        assert levels[0].shape[1::-1] == texture.size
+        # mipmaps
+        if len(levels) == 1:
+            texture.write(levels[0])
             texture.build_mipmaps()
-
-            texture.anisotropy = 16.0
-
-            return texture
         else:
-            texture: Texture = pg.image.load(filepath).convert()
-            texture = pg.transform.flip(texture, flip_x=False, flip_y=True)
-            texture = self.ctx.texture(
-                size=texture.get_size(),
-                components=3,
-                data=pg.image.tostring(texture, "RGB"),
-            )
-            # mipmaps
-            texture.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
-            texture.build_mipmaps()
-            # AF
-            texture.anisotropy = 32.0
-            return texture
+            # moderngl can only allocate the levels by generating them, that's cheap on the GPU
+            # with nothing to read back and they get overwritten right away. Until they are, only
+            # the first level gets sampled.
+            texture.build_mipmaps(max_level=len(levels) - 1)
+            texture.filter = (mgl.LINEAR, mgl.LINEAR)
+            for level, pixels in enumerate(levels):
+                texture.write(pixels, level=level)
+                yield
+        texture.filter = (mgl.LINEAR_MIPMAP_LINEAR, mgl.LINEAR)
+        # AF
+        texture.anisotropy = anisotropy
+
+    def upload_cube_face(
+        self, texture_cube: TextureCube, face: int, pixels: np.ndarray
+    ) -> None:
+        assert pixels.shape[1::-1] == texture_cube.size
+        texture_cube.write(face=face, data=pixels)
+
+    def get_depth_texture(self) -> Texture:
+        """The shadow maps of all the shadow cascades side by side, independent of the window size."""
+        depth_texture: Texture = self.ctx.depth_texture(
+            (Shadows.CASCADES * Shadows.RESOLUTION, Shadows.RESOLUTION)
+        )
+        depth_texture.repeat_x = False
+        depth_texture.repeat_y = False
+        return depth_texture
 
     def destroy(self) -> None:
         for texture in self.textures.values():
@@ -0,0 +1,239 @@
+from . import *
+
+"""
+The transforms of all the models are kept in contiguous arrays, one row per model, instead of in
+the models themselves. A model only remembers its row, see `Model.transform_index`. Once a frame
+a single vectorized kernel turns the rows of the animated models into their model matrices, the
+static ones are only computed again when their position, rotation or scale changes.
+
+The model matrices end up in a (N, 4, 4) float32 array in the column-major layout of glm and
+OpenGL, `m_models[n, i]` is the i-th column of the model matrix of row n, so they can be uploaded
+as instance data as they are.
+
+The model matrix of a row is `translate(pos) * rotate_xyz(rot) * scale(scale) * animation`. The
+animation is the rotation `rot_update` accumulated over the simulation steps or, if the model has
+one, the scale animation, which replaces the rotation.
+"""
+
+from .fixed_timestep import FixedTimestep
+from .math import get_model_matrix_batched, rotate_xyz_batched
+
+# Takes the phases of the models, shape (K,), returns their scale factors, shape (K, 3).
+ScaleAnimation = Callable[[np.ndarray], np.ndarray]
+
+# How far the phases of the scale animations advance per second of simulation time.
+SCALE_ANIMATION_SPEED = 1.2
+
+
+class TransformStore:
+    def __init__(self, simulation: FixedTimestep, capacity: int = 64):
+        self.simulation: FixedTimestep = simulation
+        self.count = 0
+        self.capacity = 0
+
+        self.positions: np.ndarray = np.zeros((0, 3))
+        self.rotations: np.ndarray = np.zeros((0, 3))
+        self.scales: np.ndarray = np.zeros((0, 3))
+        # Radians per second around each of the axes, zero for the rows that don't rotate.
+        self.rot_updates: np.ndarray = np.zeros((0, 3))
+        self.is_rotating: np.ndarray = np.zeros(0, dtype=bool)
+        # Offset into the scale animation of the row.
+        self.phases: np.ndarray = np.zeros(0)
+        self.scale_animations: list[Optional[ScaleAnimation]] = []
+
+        # `translate(pos) * rotate_xyz(rot) * scale(scale)` in row-major order.
+        self.m_models_initial: np.ndarray = np.zeros((0, 4, 4))
+        # The rotation `rot_update` accumulated over all steps, and over all but the last one.
+        self.step_rotations: np.ndarray = np.zeros((0, 3, 3))
+        self.previous_step_rotations: np.ndarray = np.zeros((0, 3, 3))
+        # The rows whose initial model matrix has to be computed again.
+        self.is_dirty: np.ndarray = np.zeros(0, dtype=bool)
+        self.has_dirty_rows = False
+
+        self.m_model_data: np.ndarray = np.zeros((0, 4, 4), dtype=np.float32)
+
+        # The animated rows, grouped by their scale animation, see `update_animation_indices`.
+        self.rotating_indices: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.scale_animation_indices: dict[ScaleAnimation, np.ndarray] = {}
+        self.dynamic_rows: np.ndarray = np.zeros(0, dtype=bool)
+        self.has_new_animations = False
+        # The alpha the animated rows were last computed with, see `update`.
+        self.alpha = 1.0
+
+        self.reserve(capacity)
+
+    def reserve(self, capacity: int) -> None:
+        """Makes sure that many rows fit, the arrays grow by doubling."""
+        if capacity <= self.capacity:
+            return
+        self.capacity = max(capacity, 2 * self.capacity)
+
+        def grow(array: np.ndarray, fill: Optional[np.ndarray] = None) -> np.ndarray:
+            grown: np.ndarray = np.zeros((self.capacity, *array.shape[1:]), array.dtype)
+            if fill is not None:
+                grown[:] = fill
+            grown[: len(array)] = array
+            return grown
+
+        identity3: np.ndarray = np.eye(3)
+        self.positions = grow(self.positions)
+        self.rotations = grow(self.rotations)
+        self.scales = grow(self.scales)
+        self.rot_updates = grow(self.rot_updates)
+        self.is_rotating = grow(self.is_rotating)
+        self.phases = grow(self.phases)
+        self.m_models_initial = grow(self.m_models_initial, np.eye(4))
+        self.step_rotations = grow(self.step_rotations, identity3)
+        self.previous_step_rotations = grow(self.previous_step_rotations, identity3)
+        self.is_dirty = grow(self.is_dirty)
+        self.m_model_data = grow(self.m_model_data, np.eye(4, dtype=np.float32))
+
+    def add(
+        self, pos: vec3, rot: vec3, scale: vec3, rot_update: Optional[vec3] = None
+    ) -> int:
+        """Adds a row and returns its index, the model matrix is computed on first use."""
+        self.reserve(self.count + 1)
+        index: int = self.count
+        self.count += 1
+        self.scale_animations.append(None)
+        self.set_transform(index, pos, rot, scale)
+        self.set_rot_update(index, rot_update)
+        return index
+
+    def set_transform(
+        self,
+        index: int,
+        pos: Optional[vec3] = None,
+        rot: Optional[vec3] = None,
+        scale: Optional[vec3] = None,
+    ) -> None:
+        if pos is not None:
+            self.positions[index] = pos
+        if rot is not None:
+            self.rotations[index] = rot
+        if scale is not None:
+            self.scales[index] = scale
+        self.is_dirty[index] = True
+        self.has_dirty_rows = True
+
+    def set_rot_update(self, index: int, rot_update: Optional[vec3]) -> None:
+        self.is_rotating[index] = rot_update is not None
+        self.rot_updates[index] = (0.0, 0.0, 0.0) if rot_update is None else rot_update
+        self.has_new_animations = True
+
+    def set_scale_animation(
+        self, index: int, function: Optional[ScaleAnimation], phase: float = 0.0
+    ) -> None:
+        """
+        The same function should be shared by all rows that are animated alike, it's evaluated
+        once per frame for all of them.
+        """
+        self.scale_animations[index] = function
+        self.phases[index] = phase
+        self.has_new_animations = True
+        # Back to the initial model matrix if the animation got removed.
+        self.is_dirty[index] = True
+        self.has_dirty_rows = True
+
+    @property
+    def is_dynamic(self) -> np.ndarray:
+        """Whether the animations change the model matrix of each row, otherwise it's static."""
+        if self.has_new_animations:
+            self.update_animation_indices()
+        return self.dynamic_rows
+
+    @property
+    def m_models(self) -> np.ndarray:
+        """The (N, 4, 4) float32 model matrices of all rows, in column-major layout."""
+        if self.has_dirty_rows:
+            self.update(self.alpha)
+        return self.m_model_data[: self.count]
+
+    def get_m_model(self, index: int) -> mat4:
+        return mat4(*self.m_models[index].ravel())
+
+    def update_animation_indices(self) -> None:
+        self.has_new_animations = False
+        groups: dict[ScaleAnimation, list[int]] = {}
+        for index, function in enumerate(self.scale_animations):
+            if function is not None:
+                groups.setdefault(function, []).append(index)
+        self.scale_animation_indices = {
+            function: np.array(indices, dtype=np.int64)
+            for function, indices in groups.items()
+        }
+        # The scale animation replaces the rotation.
+        is_rotating: np.ndarray = self.is_rotating[: self.count].copy()
+        self.dynamic_rows = is_rotating.copy()
+        for indices in self.scale_animation_indices.values():
+            is_rotating[indices] = False
+            self.dynamic_rows[indices] = True
+        self.rotating_indices = np.flatnonzero(is_rotating)
+
+    def update_dirty_rows(self) -> None:
+        self.has_dirty_rows = False
+        indices: np.ndarray = np.flatnonzero(self.is_dirty[: self.count])
+        self.is_dirty[indices] = False
+
+        m_models: np.ndarray = get_model_matrix_batched(
+            self.positions[indices], self.rotations[indices], self.scales[indices]
+        )
+        self.m_models_initial[indices] = m_models
+        self.write_m_models(indices, m_models)
+
+    def write_m_models(self, indices: np.ndarray, m_models: np.ndarray) -> None:
+        self.m_model_data[indices] = m_models.transpose(0, 2, 1)
+
+    def fixed_update(self) -> None:
+        """Advances the rotations by a simulation step, see `fixed_timestep.py`."""
+        if self.has_new_animations:
+            self.update_animation_indices()
+        indices: np.ndarray = self.rotating_indices
+        if len(indices) == 0:
+            return
+
+        rotations: np.ndarray = rotate_xyz_batched(
+            self.rot_updates[indices] * self.simulation.step_s
+        )
+        step_rotations: np.ndarray = self.step_rotations[indices]
+        self.previous_step_rotations[indices] = step_rotations
+        self.step_rotations[indices] = step_rotations @ rotations[:, :3, :3]
+
+    def update(self, alpha: Optional[float] = None) -> None:
+        """
+        Computes the model matrices of all animated rows, `alpha` of the way between the last two
+        simulation steps, by default as far as the simulation is into the next step.
+        """
+        if self.has_new_animations:
+            self.update_animation_indices()
+        if self.has_dirty_rows:
+            self.update_dirty_rows()
+        if alpha is None:
+            alpha = self.simulation.alpha
+        self.alpha = alpha
+
+        indices: np.ndarray = self.rotating_indices
+        if len(indices) > 0:
+            self.apply_animation(
+                indices,
+                self.previous_step_rotations[indices]
+                @ rotate_xyz_batched(
+                    self.rot_updates[indices] * (alpha * self.simulation.step_s)
+                )[:, :3, :3],
+            )
+
+        # Nothing to interpolate from before the first step.
+        elapsed_s: float = (
+            max(self.simulation.step_count - 1 + alpha, 0.0) * self.simulation.step_s
+        )
+        for function, indices in self.scale_animation_indices.items():
+            scale_factors: np.ndarray = function(
+                self.phases[indices] + elapsed_s * SCALE_ANIMATION_SPEED
+            )
+            self.apply_animation(indices, np.eye(3) * scale_factors[:, np.newaxis, :])
+
+    def apply_animation(self, indices: np.ndarray, animations: np.ndarray) -> None:
+        """Writes the model matrices of the rows with their (K, 3, 3) animation applied."""
+        m_models: np.ndarray = self.m_models_initial[indices]
+        m_models[:, :3, :3] = m_models[:, :3, :3] @ animations
+        self.write_m_models(indices, m_models)
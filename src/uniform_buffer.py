@@ -0,0 +1,80 @@
+from . import *
+
+"""
+The camera and light state that every program needs lives in a single std140 uniform block
+(`shaders/frame_data.glsl`) which gets written once per frame, instead of being written into every
+program by every single object.
+"""
+
+from moderngl import Buffer, Context
+
+if TYPE_CHECKING:
+    from .camera import Camera
+    from .light import Light
+    from .shadow_cascades import ShadowCascades
+
+FRAME_DATA_BLOCK = "FrameData"
+FRAME_DATA_BINDING = 0
+
+
+# std140 offsets in bytes, a vec3 takes up 12 bytes but is aligned to 16 bytes like the Light struct.
+@dataclass
+class FrameDataLayout:
+    M_PROJ: int = 0
+    M_VIEW: int = 64
+    CAM_POS: int = 128
+    LIGHT_POSITION: int = 144
+    LIGHT_IA: int = 160
+    LIGHT_ID: int = 176
+    LIGHT_IS: int = 192
+    # Array of `MAX_SHADOW_CASCADES` matrices.
+    M_SHADOW: int = 208
+    M_SHADOW_STRIDE: int = 64
+    SHADOW_SPLITS: int = 464
+    SHADOW_CASCADE_COUNT: int = 480
+
+    SIZE: int = 496
+
+
+class FrameUniformBuffer:
+    def __init__(self, ctx: Context):
+        self.ctx: Context = ctx
+        # CPU side copy of the block so every update is a single buffer write.
+        self.data = bytearray(FrameDataLayout.SIZE)
+        self.buffer: Buffer = self.ctx.buffer(self.data)
+        self.buffer.bind_to_uniform_block(FRAME_DATA_BINDING)
+
+    def set(self, offset: int, value: VEC_N | mat4 | glm.ivec1) -> None:
+        value_bytes: bytes = value.to_bytes()
+        self.data[offset : offset + len(value_bytes)] = value_bytes
+
+    def write_camera(self, camera: "Camera") -> None:
+        self.set(FrameDataLayout.M_PROJ, camera.m_proj)
+        self.set(FrameDataLayout.M_VIEW, camera.m_view)
+        self.set(FrameDataLayout.CAM_POS, camera.position)
+        self.buffer.write(self.data)
+
+    def write_light(self, light: "Light") -> None:
+        self.set(FrameDataLayout.LIGHT_POSITION, light.position)
+        self.set(FrameDataLayout.LIGHT_IA, light.intensity_ambient)
+        self.set(FrameDataLayout.LIGHT_ID, light.intensity_diffuse)
+        self.set(FrameDataLayout.LIGHT_IS, light.intensity_specular)
+        self.buffer.write(self.data)
+
+    def write_shadow_cascades(self, shadow_cascades: "ShadowCascades") -> None:
+        splits = vec4()
+        for index, cascade in enumerate(shadow_cascades.cascades):
+            self.set(
+                FrameDataLayout.M_SHADOW + FrameDataLayout.M_SHADOW_STRIDE * index,
+                cascade.m_light_proj_view,
+            )
+            splits[index] = cascade.far
+        self.set(FrameDataLayout.SHADOW_SPLITS, splits)
+        self.set(
+            FrameDataLayout.SHADOW_CASCADE_COUNT,
+            glm.ivec1(len(shadow_cascades.cascades)),
+        )
+        self.buffer.write(self.data)
+
+    def destroy(self) -> None:
+        self.buffer.release()
@@ -2,9 +2,16 @@ from . import *
 
 """"""
 
-from .shader_program import ShaderProgram
+from moderngl import Context, Program, VertexArray
+
+from .asset_streaming import AssetStreamer
+from .lazy_resources import LazyResources
+from .shader_program import ShaderProgram, get_program_variant
 from .vbo import VBOHandler, VertexBufferObject
 
+# Drawn in place of the streamed VBOs until they are loaded.
+PLACEHOLDER_VBO = "cube"
+
 # TODO: Consider if we should make the vao map into a named tuple
 # fmt: off
 vao_tuples: list[tuple[str, str, str]] = [
@@ -29,25 +36,89 @@ vao_tuples: list[tuple[str, str, str]] = [
 
 
 class VertexArrayObject:
-    def __init__(self, ctx: Context):
+    def __init__(self, ctx: Context, streamer: AssetStreamer):
         self.ctx: Context = ctx
-        self.vbo = VBOHandler(ctx)
+        self.vbo = VBOHandler(ctx, streamer, self.on_vbo_uploaded)
         self.program = ShaderProgram(ctx)
 
-        self.vao_map: dict[str, VertexArray] = {
-            vao_name: self.create_vao_from_vbo(
-                self.program.programs[program_name], self.vbo.vbo_map[vbo_name]
-            )
-            for vao_name, program_name, vbo_name in vao_tuples
+        self.program_names: dict[str, str] = {
+            vao_name: program_name for vao_name, program_name, _ in vao_tuples
         }
+        self.vbo_names: dict[str, str] = {
+            vao_name: vbo_name for vao_name, _, vbo_name in vao_tuples
+        }
+
+        # Counts the streamed VBOs that replaced the placeholder, whatever was built from the vaos
+        # or VBOs has to be built again when it changes.
+        self.version = 0
+        # Only built once they're first used, see `lazy_resources.py`.
+        self.vao_map: LazyResources[VertexArray] = LazyResources(
+            "vao", self.program_names, self.create_vao, self.release_vao
+        )
+        # The program and VBOs each of the built vaos acquired, released along with it.
+        self.vao_dependencies: dict[VertexArray, tuple[str, list[str]]] = {}
+
+    def create_vao(self, vao_name: str) -> VertexArray:
+        """The vao reading from the VBO of that name, or from the placeholder until it's loaded."""
+        vbo_names: list[str] = [self.vbo_names[vao_name]]
+        vbo: VertexBufferObject = self.vbo.vbo_map.acquire(vbo_names[0])
+        if not vbo.is_ready:
+            vbo_names.append(PLACEHOLDER_VBO)
+            vbo = self.vbo.vbo_map.acquire(PLACEHOLDER_VBO)
+        program_name: str = get_program_variant(
+            self.program_names[vao_name], vbo.is_quantized
+        )
+        vao: VertexArray = self.create_vao_from_vbo(
+            self.program.programs.acquire(program_name), vbo
+        )
+        self.vao_dependencies[vao] = (program_name, vbo_names)
+        return vao
+
+    def release_vao(self, vao_name: str, vao: VertexArray) -> None:
+        vao.release()
+        program_name, vbo_names = self.vao_dependencies.pop(vao)
+        self.program.programs.release(program_name)
+        for vbo_name in vbo_names:
+            self.vbo.vbo_map.release(vbo_name)
 
     def create_vao_from_vbo(
         self, program: Program, vbo: VertexBufferObject
     ) -> VertexArray:
         return self.ctx.vertex_array(
-            program, [(vbo.vbo, vbo.buffer_format, *vbo.attributes)], skip_errors=True
+            program,
+            vbo.get_vao_content(),
+            index_buffer=vbo.ibo,
+            index_element_size=4,
+            skip_errors=True,
+        )
+
+    def on_vbo_uploaded(self, vbo_name: str) -> None:
+        """Replaces the placeholder vaos of a streamed VBO with ones reading from it."""
+        for vao_name, name in self.vbo_names.items():
+            if name == vbo_name:
+                self.vao_map.rebuild(vao_name)
+        self.version += 1
+
+    def get_vbo_name(self, vao_name: str) -> str:
+        """
+        Name of the VBO the VAO of that name reads its vertices from, the placeholder while the
+        VBO is still being streamed in.
+        """
+        vbo_name: str = self.vbo_names[vao_name]
+        return vbo_name if self.vbo.vbo_map[vbo_name].is_ready else PLACEHOLDER_VBO
+
+    def get_vbo(self, vao_name: str) -> VertexBufferObject:
+        return self.vbo.vbo_map[self.get_vbo_name(vao_name)]
+
+    def get_report(self) -> str:
+        """What got built so far, see `lazy_resources.py`."""
+        return "\n".join(
+            resources.get_report()
+            for resources in (self.vao_map, self.program.programs, self.vbo.vbo_map)
         )
 
     def destroy(self) -> None:
+        # The vaos go first, they release the programs and VBOs they acquired.
+        self.vao_map.destroy()
         self.vbo.destroy()
         self.program.destroy()
@@ -2,17 +2,35 @@ from . import *
 
 """"""
 
-import pywavefront
-import pywavefront.material
+import functools
+import logging
+from dataclasses import asdict
+
+from moderngl import Buffer, Context
+
+from util.data_parser import load_obj
 
 from . import my_logger
+from .asset_cache import load_cached_array, load_derived_array_with_attributes
+from .asset_streaming import AssetStreamer
 from .constants import VBO
-from .settings import Folders
+from .culling import BoundingSphere
+from .lazy_resources import LazyResources
+from .mesh_decimation import load_decimated_levels
+from .mesh_indexing import IndexingStats, index_mesh_rows
+from .settings import Folders, LevelOfDetail, Rendering, Streaming
 from .vertex_data_generator import (
     generate_CubeVertices,
     generate_CylinderVertices,
     generate_SphereVertices,
 )
+from .vertex_quantization import (
+    DECODE_ATTRIBUTES,
+    DECODE_FORMAT,
+    QUANTIZED_ATTRIBUTES,
+    QUANTIZED_FORMAT,
+    quantize_vertices,
+)
 
 if TYPE_CHECKING:
     from .graphics_engine import GraphicsEngine
@@ -28,29 +46,100 @@ FILENAME_TO_GENERATOR_FUNC_MAP: dict[str, Callable[[], any]] = {
 
 
 class VBOHandler:
-    def __init__(self, ctx: Context):
-        self.vbo_map: dict[str, VertexBufferObject] = {
-            "cube": Cube(ctx),
-            "cat": Cat(ctx),
-            "skybox": NaiveSkyBox(ctx),
-            "advanced_skybox": SkyBox(ctx),
-            "quad": Quad(ctx),
-            "sphere": Sphere(ctx),
-            "cylinder": Cylinder(ctx),
-            "coordinate_axis": Coordinate_Axis(ctx),
-            "ui_text": UI_text(ctx),
-            "line": Line(ctx),
+    def __init__(
+        self,
+        ctx: Context,
+        streamer: AssetStreamer,
+        on_uploaded: Callable[[str], None],
+    ):
+        """`on_uploaded` gets called with the name of a streamed VBO once it has been uploaded."""
+        self.ctx: Context = ctx
+        self.streamer: AssetStreamer = streamer
+        self.on_uploaded: Callable[[str], None] = on_uploaded
+        self.vbo_classes: dict[str, type[VertexBufferObject]] = {
+            "cube": Cube,
+            "cat": Cat,
+            "skybox": NaiveSkyBox,
+            "advanced_skybox": SkyBox,
+            "quad": Quad,
+            "sphere": Sphere,
+            "cylinder": Cylinder,
+            "coordinate_axis": Coordinate_Axis,
+            "ui_text": UI_text,
+            "line": Line,
         }
+        # Only built once they're first used, see `lazy_resources.py`.
+        self.vbo_map: LazyResources[VertexBufferObject] = LazyResources(
+            "VBO", self.vbo_classes, self.create_vbo, lambda _, vbo: vbo.destroy()
+        )
+
+    def create_vbo(self, vbo_name: str) -> "VertexBufferObject":
+        """Streamed VBOs get submitted to the streamer, they aren't ready until they're uploaded."""
+        vbo: VertexBufferObject = self.vbo_classes[vbo_name](self.ctx)
+        if not vbo.is_ready:
+            if Streaming.ENABLED:
+                self.streamer.submit(
+                    f"VBO {vbo_name}",
+                    vbo.load,
+                    functools.partial(self.upload_vbo, vbo_name, vbo),
+                )
+            else:
+                vbo.upload(vbo.load())
+        return vbo
+
+    def upload_vbo(
+        self,
+        vbo_name: str,
+        vbo: "VertexBufferObject",
+        data: tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]],
+    ) -> None:
+        # Nothing uses it anymore if it got released while it was loading.
+        if self.vbo_map.get_built(vbo_name) is vbo:
+            vbo.upload(data)
+            self.on_uploaded(vbo_name)
 
     def destroy(self):
-        for vbo in self.vbo_map.values():
-            vbo.destroy()
+        self.vbo_map.destroy()
+
+
+def get_attribute_offsets(buffer_format: str) -> Optional[list[int]]:
+    """
+    Offsets of the attributes within a vertex in floats, the last entry is the vertex size. Only
+    works for formats made up entirely of floats like "2f 3f 3f".
+    """
+    offsets: list[int] = [0]
+    for size in buffer_format.split():
+        if not (size.endswith("f") and size[:-1].isdigit()):
+            return None
+        offsets.append(offsets[-1] + int(size[:-1]))
+    return offsets
 
 
 class VertexBufferObject(ABC):
+    # Triangle meshes set this to get drawn through an index buffer, see `mesh_indexing.py`.
+    indexed: bool = False
+    # Meshes with texture coordinates, normals and positions set this to get their vertices packed
+    # into half the memory, see `vertex_quantization.py`.
+    quantized: bool = False
+    # Meshes that take a while to load set this to get loaded in the background, they have to be
+    # submitted to an `AssetStreamer` then, see `VBOHandler`.
+    streamed: bool = False
+
     def __init__(self, ctx: Context):
         self.ctx: Context = ctx
-        self.vbo: Buffer = self.get_vbo()
+        # Used for culling, None if the vertices don't have a 3D position.
+        self.bounding_sphere: Optional[BoundingSphere] = None
+        # First vertex and vertex count of each level of detail, -1 draws the whole buffer. With
+        # an index buffer these are the first index and the index count instead.
+        self.lod_ranges: list[tuple[int, int]] = [(0, -1)]
+        # The shadow passes draw at least at this level, a coarse mesh casts almost the same shadow.
+        self.shadow_lod = 0
+        self.ibo: Optional[Buffer] = None
+        # Scale and offset of the positions, only for quantized vertices.
+        self.decode_buffer: Optional[Buffer] = None
+        self.vbo: Optional[Buffer] = None
+        if not self.streamed:
+            self.upload(self.load())
 
     @abstractmethod
     def get_vertex_data(self) -> np.ndarray: ...
@@ -63,12 +152,168 @@ class VertexBufferObject(ABC):
     @abstractmethod
     def attributes(self) -> list[str]: ...
 
-    def get_vbo(self) -> Buffer:
+    def load(self) -> tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Everything that doesn't need the context, so it can run on a worker thread. Returns the
+        vertex data, the indices and the data of the decode buffer, the last two are None if the
+        VBO isn't indexed or quantized. It also sets `lod_ranges`, `shadow_lod` and
+        `bounding_sphere`, so a VBO can't be used before it's uploaded.
+        """
         vertex_data: Iterable[VERTEX_POSITION] = self.get_vertex_data()
-        return self.ctx.buffer(vertex_data)
+        self.bounding_sphere = self.get_bounding_sphere(vertex_data)
+        indices: Optional[np.ndarray] = None
+        if self.indexed and Rendering.INDEXED_GEOMETRY:
+            vertex_data, indices = self.index_levels(np.asarray(vertex_data))
+        decode_data: Optional[np.ndarray] = None
+        if self.quantized and Rendering.QUANTIZED_VERTICES:
+            vertex_data, decode_data = self.quantize(np.asarray(vertex_data))
+        return vertex_data, indices, decode_data
+
+    def upload(
+        self, data: tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]
+    ) -> None:
+        """Creates the buffers from what `load` returned."""
+        vertex_data, indices, decode_data = data
+        if indices is not None:
+            self.ibo = self.ctx.buffer(indices)
+        if decode_data is not None:
+            self.decode_buffer = self.ctx.buffer(decode_data)
+        self.vbo = self.ctx.buffer(vertex_data)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.vbo is not None
+
+    @property
+    def is_quantized(self) -> bool:
+        """Quantized vertices have to be drawn with the `QUANTIZED` variants of the programs."""
+        return self.decode_buffer is not None
+
+    def get_vao_content(self) -> list[tuple[Buffer | str, ...]]:
+        """The entries of the VBO in the content of a vertex array."""
+        if self.decode_buffer is None:
+            return [(self.vbo, self.buffer_format, *self.attributes)]
+        return [
+            (self.vbo, QUANTIZED_FORMAT, *QUANTIZED_ATTRIBUTES),
+            (self.decode_buffer, DECODE_FORMAT, *DECODE_ATTRIBUTES),
+        ]
+
+    def quantize(self, vertex_data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Packs the float vertices, returns them and the data the shaders decode them with."""
+        offsets: list[int] = get_attribute_offsets(self.buffer_format)
+        vertices: np.ndarray = vertex_data.reshape(-1, offsets[-1])
+
+        def get_attribute(attribute: str) -> np.ndarray:
+            idx: int = self.attributes.index(attribute)
+            return vertices[:, offsets[idx] : offsets[idx + 1]]
+
+        packed_vertices, decode_data, stats = quantize_vertices(
+            get_attribute(VBO.IN_POSITION),
+            get_attribute(VBO.IN_NORMAL),
+            get_attribute(VBO.IN_TEXCOORD_0),
+        )
+        logger.info(
+            f"{type(self).__name__} quantized: {stats.bytes_before / 1024:.1f} -> "
+            f"{stats.bytes_after / 1024:.1f} KiB, max errors position "
+            f"{stats.max_position_error:.2e} ({100 * stats.max_position_error_relative:.4f}% of"
+            f" the extent), normal {stats.max_normal_error_degrees:.4f} degrees, texture"
+            f" coordinates {stats.max_texcoord_error:.2e}"
+        )
+        return packed_vertices, decode_data
+
+    def index_levels(self, vertex_data: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Indexes each level of detail on its own, the vertices and indices of the levels are placed
+        one after another and `lod_ranges` is changed to index ranges. Reordering the triangles
+        takes a while for large meshes, so the order is cached, keyed on the vertex data.
+        """
+        vertex_size: int = get_attribute_offsets(self.buffer_format)[-1]
+        vertex_data = vertex_data.reshape(-1, vertex_size)
+
+        all_vertices: list[np.ndarray] = []
+        all_indices: list[np.ndarray] = []
+        lod_ranges: list[tuple[int, int]] = []
+        vertex_count, index_count = 0, 0
+        for level, (first, vertices) in enumerate(self.lod_ranges):
+            end: Optional[int] = None if vertices < 0 else first + vertices
+            level_vertex_data: np.ndarray = vertex_data[first:end]
+            level_rows, level_indices = self.index_level(
+                level, level_vertex_data, vertex_size
+            )
+
+            all_vertices.append(level_vertex_data[level_rows].reshape(-1))
+            all_indices.append(level_indices + vertex_count)
+            lod_ranges.append((index_count, level_indices.size))
+            vertex_count += len(level_rows)
+            index_count += level_indices.size
+
+        self.lod_ranges = lod_ranges
+        return np.concatenate(all_vertices), np.concatenate(all_indices)
+
+    def index_level(
+        self, level: int, vertex_data: np.ndarray, vertex_size: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """The rows of the vertex data the indexed vertices are and the indices into them."""
+        # The ACMRs take about as long as the reordering, only worth it when they get logged.
+        measure_acmr: bool = logger.isEnabledFor(logging.DEBUG)
+
+        def derive(vertex_data: np.ndarray) -> tuple[np.ndarray, dict]:
+            rows, indices, stats = index_mesh_rows(
+                vertex_data, vertex_size, measure_acmr=measure_acmr
+            )
+            return np.concatenate([rows, indices]), asdict(stats)
+
+        rows_and_indices, attributes = load_derived_array_with_attributes(
+            vertex_data,
+            derive,
+            Folders.CACHE_MESHES,
+            f"{type(self).__name__}_level_{level}",
+        )
+        stats = IndexingStats(**attributes)
+        self.log_indexing_stats(level, stats)
+        return (
+            rows_and_indices[: stats.vertices_after],
+            np.asarray(rows_and_indices[stats.vertices_after :]),
+        )
+
+    def log_indexing_stats(self, level: int, stats: IndexingStats) -> None:
+        acmr: str = ""
+        if stats.acmr_before is not None and stats.acmr_after is not None:
+            acmr = f", ACMR {stats.acmr_before:.2f} -> {stats.acmr_after:.2f}"
+        logger.debug(
+            f"{type(self).__name__} level {level}: {stats.vertices_before} -> "
+            f"{stats.vertices_after} vertices, {stats.bytes_before / 1024:.1f} -> "
+            f"{stats.bytes_after / 1024:.1f} KiB with indices{acmr}, indexing took "
+            f"{stats.seconds * 1000:.1f}ms"
+        )
+
+    def get_bounding_sphere(self, vertex_data: np.ndarray) -> Optional[BoundingSphere]:
+        offsets: Optional[list[int]] = get_attribute_offsets(self.buffer_format)
+        if offsets is None or VBO.IN_POSITION not in self.attributes:
+            return None
+
+        idx: int = self.attributes.index(VBO.IN_POSITION)
+        if offsets[idx + 1] - offsets[idx] != 3:
+            return None
+
+        vertices: np.ndarray = np.asarray(vertex_data, dtype=np.float32)
+        vertices = vertices.reshape(-1, offsets[-1])
+        return BoundingSphere.from_positions(
+            vertices[:, offsets[idx] : offsets[idx + 1]]
+        )
+
+    def concatenate_levels(self, levels: list[np.ndarray]) -> np.ndarray:
+        """Places the levels of detail, finest first, one after another and sets `lod_ranges`."""
+        vertex_size: int = get_attribute_offsets(self.buffer_format)[-1]
+        vertex_counts: list[int] = [level.size // vertex_size for level in levels]
+        firsts: list[int] = np.cumsum([0] + vertex_counts[:-1]).tolist()
+        self.lod_ranges = list(zip(firsts, vertex_counts))
+        return np.concatenate([level.reshape(-1) for level in levels])
 
     def destroy(self) -> None:
-        self.vbo.release()
+        for buffer in (self.vbo, self.ibo, self.decode_buffer):
+            if buffer is not None:
+                buffer.release()
 
 
 class VBOFromFile(VertexBufferObject):
@@ -100,7 +345,25 @@ class VBOFromFile(VertexBufferObject):
         return cast(np.ndarray, np.load(os.path.join(Folders.OBJECTS, self.filename)))
 
 
+class LevelOfDetailVBO(VBOFromFile):
+    """
+    The level loaded from the file is the finest one, the coarser levels get generated and placed
+    behind it in the same buffer, `lod_ranges` holds where each of them is.
+    """
+
+    @abstractmethod
+    def get_coarser_levels(self) -> list[np.ndarray]: ...
+
+    def get_vertex_data(self) -> np.ndarray:
+        return self.concatenate_levels(
+            [super().get_vertex_data()] + self.get_coarser_levels()
+        )
+
+
 class Cube(VBOFromFile):
+    indexed = True
+    quantized = True
+
     def __init__(self, ctx: Context):
         super().__init__(ctx, VBO.FILE_CUBE)
 
@@ -113,10 +376,20 @@ class Cube(VBOFromFile):
         return [VBO.IN_TEXCOORD_0, VBO.IN_NORMAL, VBO.IN_POSITION]
 
 
-class Sphere(VBOFromFile):
+class Sphere(LevelOfDetailVBO):
+    indexed = True
+    quantized = True
+    streamed = True
+
     def __init__(self, ctx: Context):
         super().__init__(ctx, VBO.FILE_SPHERE)
 
+    def get_coarser_levels(self) -> list[np.ndarray]:
+        return [
+            generate_SphereVertices(filename=None, sectors=sectors, stacks=stacks)
+            for sectors, stacks in LevelOfDetail.SPHERE_LEVELS
+        ]
+
     @property
     def buffer_format(self) -> str:
         return "3f 3f 2f"
@@ -126,10 +399,20 @@ class Sphere(VBOFromFile):
         return [VBO.IN_NORMAL, VBO.IN_POSITION, VBO.IN_TEXCOORD_0]
 
 
-class Cylinder(VBOFromFile):
+class Cylinder(LevelOfDetailVBO):
+    indexed = True
+    quantized = True
+    streamed = True
+
     def __init__(self, ctx: Context):
         super().__init__(ctx, VBO.FILE_CYLINDER)
 
+    def get_coarser_levels(self) -> list[np.ndarray]:
+        return [
+            generate_CylinderVertices(filename=None, sectors=sectors)
+            for sectors in LevelOfDetail.CYLINDER_LEVELS
+        ]
+
     @property
     def buffer_format(self) -> str:
         return "3f 3f 2f"
@@ -140,6 +423,8 @@ class Cylinder(VBOFromFile):
 
 
 class NaiveSkyBox(VertexBufferObject):
+    indexed = True
+
     @property
     def buffer_format(self) -> str:
         return "3f"
@@ -206,7 +491,35 @@ class SkyBox(VertexBufferObject):
         return vertex_data
 
 
+def parse_cat_obj(filepath: str) -> np.ndarray:
+    # Layout of `Cat`, texture coordinates, normal and position.
+    material_vertex_data, _ = load_obj(
+        filepath, "2f 3f 3f", [VBO.IN_TEXCOORD_0, VBO.IN_NORMAL, VBO.IN_POSITION]
+    )
+    assert len(material_vertex_data) == 1
+    vertex_data: np.ndarray = material_vertex_data.popitem()[1]
+    assert vertex_data.size == 4740096
+    return vertex_data
+
+
+def load_cat_vertex_data() -> np.ndarray:
+    """Only parses the OBJ file if it changed since the last time, see `asset_cache.py`."""
+    return load_cached_array(
+        os.path.join(Folders.DATA_OBJ, "cat", "20430_Cat_v1_NEW.obj"), parse_cat_obj
+    )
+
+
 class Cat(VertexBufferObject):
+    """
+    The coarser levels of detail are decimated versions of the model, cached until the model
+    changes, see `mesh_decimation.py`. Decimating takes a while, run `python -m
+    src.mesh_decimation` to do it ahead of time. The shadows use the coarsest one.
+    """
+
+    indexed = True
+    quantized = True
+    streamed = True
+
     @property
     def buffer_format(self) -> str:
         return "2f 3f 3f"
@@ -215,21 +528,19 @@ class Cat(VertexBufferObject):
     def attributes(self) -> list[str]:
         return [VBO.IN_TEXCOORD_0, VBO.IN_NORMAL, VBO.IN_POSITION]
 
-    def get_vertex_data(self) -> Iterable[tuple[float, float, float]]:
-        objs = pywavefront.Wavefront(
-            file_name=os.path.join(Folders.DATA_OBJ, "cat", "20430_Cat_v1_NEW.obj"),
-            cache=True,
-            parse=True,
+    def get_vertex_data(self) -> np.ndarray:
+        vertex_data: np.ndarray = load_cat_vertex_data()
+        offsets: list[int] = get_attribute_offsets(self.buffer_format)
+        levels, _ = load_decimated_levels(
+            vertex_data,
+            offsets[-1],
+            offsets[self.attributes.index(VBO.IN_POSITION)],
+            LevelOfDetail.CAT_LEVELS,
+            [VBO.CACHE_CAT_DECIMATED(ratio) for ratio in LevelOfDetail.CAT_LEVELS],
         )
-        assert len(objs.materials) == 1
-        obj: pywavefront.material.Material = objs.materials.popitem()[1]
-
-        vertex_data: tuple[float, ...] = obj.vertices
-        assert isinstance(vertex_data, tuple)
-        assert all(isinstance(x, float) for x in vertex_data)
-        assert len(vertex_data) == 4740096
 
-        return np.array(vertex_data, dtype=np.float32)
+        self.shadow_lod = len(levels)
+        return self.concatenate_levels([vertex_data] + levels)
 
 
 class Quad(VertexBufferObject):
@@ -1,11 +1,15 @@
+import functools
 import os
-from typing import Iterable, TypeAlias
+from typing import Iterable, Optional, TypeAlias
 
 import numpy as np
 
-from .constants import VBO
+from .constants import PARAMETRIC_MESH, VBO
 from .settings import Folders
 
+# Number of distinct parametric meshes kept by `get_parametric_vertex_data`.
+MESH_CACHE_SIZE = 32
+
 
 # TODO: Either remove this by inlining the functionality, solve it in another way or make this func
 #       more general, only using it for one construction feels weird.
@@ -13,8 +17,7 @@ from .settings import Folders
 def vertex_idx_transform(
     vertices: list[tuple[float, float, float]], indices: list[tuple[int, int, int]]
 ) -> np.ndarray[np.float32]:
-    data = [vertices[ind] for triangle in indices for ind in triangle]
-    return np.array(data, dtype=np.float32)
+    return np.array(vertices, dtype=np.float32)[np.array(indices).reshape(-1)]
 
 
 # TODO: Rewrite this, this is from a tutorial I watched when starting out and I don't like the
@@ -82,170 +85,175 @@ def generate_CubeVertices(folderpath=Folders.OBJECTS, filename=VBO.FILE_CUBE) ->
     np.save(os.path.join(folderpath, filename), vertex_data)
 
 
+@functools.lru_cache(maxsize=MESH_CACHE_SIZE)
+def get_parametric_vertex_data(
+    kind: PARAMETRIC_MESH,
+    radius: float = 1.0,
+    sectors: int = 36,
+    stacks: int = 18,
+    height: float = 2.0,
+) -> np.ndarray[np.float32]:
+    """
+    Non-indexed vertex data, normal, position and texture coordinates, of a sphere or a cylinder,
+    the sides of the cylinder are split into `stacks` rings. The result is cached and read-only.
+    """
+    match kind:
+        case PARAMETRIC_MESH.SPHERE:
+            vertices, indices = get_sphere(radius, sectors, stacks)
+        case PARAMETRIC_MESH.CYLINDER:
+            vertices, indices = get_cylinder(radius, height, sectors, stacks)
+        case _:
+            raise ValueError(f"Unknown parametric mesh {kind=}.")
+
+    vertex_data: np.ndarray = vertices.astype(np.float32)[indices].reshape(-1)
+    vertex_data.setflags(write=False)
+    return vertex_data
+
+
+def get_sphere(
+    radius: float, sectors: int, stacks: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vertices (V, 8) and triangles (T, 3) of a UV sphere around the z axis."""
+    i, j = np.meshgrid(np.arange(stacks + 1), np.arange(sectors + 1), indexing="ij")
+    stack_angle: np.ndarray = np.pi / 2 - i * np.pi / stacks  # from pi/2 to -pi/2
+    sector_angle: np.ndarray = j * 2 * np.pi / sectors  # from 0 to 2pi
+    xy: np.ndarray = radius * np.cos(stack_angle)  # r * cos(u)
+
+    positions: np.ndarray = np.stack(
+        (
+            xy * np.cos(sector_angle),  # r * cos(u) * cos(v)
+            xy * np.sin(sector_angle),  # r * cos(u) * sin(v)
+            radius * np.sin(stack_angle),  # r * sin(u)
+        ),
+        axis=-1,
+    )
+    vertices: np.ndarray = np.concatenate(
+        (positions / radius, positions, np.stack((j / sectors, i / stacks), axis=-1)),
+        axis=-1,
+    ).reshape(-1, 8)
+
+    first: np.ndarray = (i[:-1, :-1] * (sectors + 1) + j[:-1, :-1]).reshape(-1)
+    second: np.ndarray = first + sectors + 1
+    indices: np.ndarray = np.stack(
+        (first, second, first + 1, second, second + 1, first + 1), axis=-1
+    ).reshape(-1, 3)
+    return vertices, indices
+
+
+def get_cylinder(
+    radius: float, height: float, sectors: int, stacks: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vertices (V, 8) and triangles (T, 3) of a cylinder along the z axis, the caps are fans around
+    their center.
+    """
+    half_height: float = height / 2
+    sector_angle: np.ndarray = np.arange(sectors + 1) * 2 * np.pi / sectors
+    x: np.ndarray = radius * np.cos(sector_angle)
+    y: np.ndarray = radius * np.sin(sector_angle)
+    u: np.ndarray = np.arange(sectors + 1) / sectors
+    zeros, ones = np.zeros(sectors + 1), np.ones(sectors + 1)
+
+    # Top and bottom circle, alternating.
+    # fmt: off
+    caps: np.ndarray = np.stack(
+        (
+            np.stack((zeros, zeros,  ones, x, y,  half_height * ones, u, ones), axis=-1),
+            np.stack((zeros, zeros, -ones, x, y, -half_height * ones, u, zeros), axis=-1),
+        ),
+        axis=1,
+    ).reshape(-1, 8)
+    # fmt: on
+
+    # Rings of the sides from the top to the bottom, ring after ring for each sector.
+    v: np.ndarray = 1.0 - np.arange(stacks + 1) / stacks
+    sector, ring = np.meshgrid(np.arange(sectors + 1), v, indexing="ij")
+    sides: np.ndarray = np.stack(
+        (
+            x[sector] / radius,
+            y[sector] / radius,
+            np.zeros_like(ring),
+            x[sector],
+            y[sector],
+            (2 * ring - 1) * half_height,
+            u[sector],
+            ring,
+        ),
+        axis=-1,
+    ).reshape(-1, 8)
+
+    centers = np.array(
+        [
+            (0, 0, 1, 0, 0, half_height, 0.5, 0.5),
+            (0, 0, -1, 0, 0, -half_height, 0.5, 0.5),
+        ],
+    )
+    vertices: np.ndarray = np.concatenate((caps, sides, centers))
+
+    # The last sector wraps around to the first vertices.
+    i: np.ndarray = np.arange(sectors)
+    next_i: np.ndarray = (i + 1) % sectors
+    top_center, bottom_center = len(caps) + len(sides), len(caps) + len(sides) + 1
+    cap_indices: np.ndarray = np.stack(
+        (
+            np.full(sectors, top_center),
+            2 * i,
+            2 * next_i,
+            np.full(sectors, bottom_center),
+            2 * next_i + 1,
+            2 * i + 1,
+        ),
+        axis=-1,
+    ).reshape(-1, 3)
+
+    # Top and bottom of each segment of the sides.
+    k: np.ndarray = np.arange(stacks)
+    top: np.ndarray = (len(caps) + (stacks + 1) * i[:, np.newaxis] + k).reshape(-1)
+    next_top: np.ndarray = (
+        len(caps) + (stacks + 1) * next_i[:, np.newaxis] + k
+    ).reshape(-1)
+    side_indices: np.ndarray = np.stack(
+        (top, top + 1, next_top, top + 1, next_top + 1, next_top), axis=-1
+    ).reshape(-1, 3)
+
+    return vertices, np.concatenate((cap_indices, side_indices))
+
+
 # TODO: Improve the type hinting
 def generate_SphereVertices(
     folderpath=Folders.OBJECTS,
-    filename=VBO.FILE_SPHERE,
+    filename: Optional[str] = VBO.FILE_SPHERE,
     radius: float = 1.0,
     sectors: int = 36,
     stacks: int = 18,
 ) -> np.ndarray[np.float32]:
-    vertices = []
-    normals = []
-    tex_coords = []
-    indices = []
-
-    for i in range(stacks + 1):
-        stack_angle = np.pi / 2 - i * np.pi / stacks  # from pi/2 to -pi/2
-        xy = radius * np.cos(stack_angle)  # r * cos(u)
-        z = radius * np.sin(stack_angle)  # r * sin(u)
-
-        for j in range(sectors + 1):
-            sector_angle = j * 2 * np.pi / sectors  # from 0 to 2pi
-
-            x = xy * np.cos(sector_angle)  # r * cos(u) * cos(v)
-            y = xy * np.sin(sector_angle)  # r * cos(u) * sin(v)
-            vertices.append((x, y, z))
-
-            nx = x / radius
-            ny = y / radius
-            nz = z / radius
-            normals.append((nx, ny, nz))
-
-            s = j / sectors
-            t = i / stacks
-            tex_coords.append((s, t))
-
-    for i in range(stacks):
-        for j in range(sectors):
-            first = i * (sectors + 1) + j
-            second = first + sectors + 1
-
-            indices.append((first, second, first + 1))
-            indices.append((second, second + 1, first + 1))
-
-    vertices = np.array(vertices, dtype=np.float32)
-    normals = np.array(normals, dtype=np.float32)
-    tex_coords = np.array(tex_coords, dtype=np.float32)
-    indices = np.array(indices, dtype=np.uint32)
-
-    def vertex_idx_transform(vertices, normals, tex_coords, indices):
-        transformed_data = []
-        for triangle in indices:
-            for ind in triangle:
-                transformed_data.extend(normals[ind])
-                transformed_data.extend(vertices[ind])
-                transformed_data.extend(tex_coords[ind])
-        return np.array(transformed_data, dtype=np.float32)
-
-    vertex_data = vertex_idx_transform(vertices, normals, tex_coords, indices)
-
-    os.makedirs(folderpath, exist_ok=True)
-    np.save(os.path.join(folderpath, filename), vertex_data)
+    vertex_data: np.ndarray = get_parametric_vertex_data(
+        PARAMETRIC_MESH.SPHERE, radius, sectors, stacks
+    )
+
+    # Without a filename the vertices are only returned, like the coarser levels of detail.
+    if filename is not None:
+        os.makedirs(folderpath, exist_ok=True)
+        np.save(os.path.join(folderpath, filename), vertex_data)
     return vertex_data
 
 
 # TODO: Improve the type hinting
 def generate_CylinderVertices(
     folderpath=Folders.OBJECTS,
-    filename=VBO.FILE_CYLINDER,
+    filename: Optional[str] = VBO.FILE_CYLINDER,
     radius: float = 1.0,
     height: float = 2.0,
     sectors: int = 36,
+    stacks: int = 1,
 ) -> np.ndarray[np.float32]:
-    vertices = []
-    normals = []
-    tex_coords = []
-    indices = []
-
-    half_height = height / 2
-
-    # Vertices for the top and bottom circles
-    for i in range(sectors + 1):
-        sector_angle = i * 2 * np.pi / sectors
-
-        x = radius * np.cos(sector_angle)
-        y = radius * np.sin(sector_angle)
-
-        # Top circle
-        vertices.append((x, y, half_height))
-        normals.append((0, 0, 1))
-        tex_coords.append((i / sectors, 1))
-
-        # Bottom circle
-        vertices.append((x, y, -half_height))
-        normals.append((0, 0, -1))
-        tex_coords.append((i / sectors, 0))
-
-    # Vertices for the sides
-    for i in range(sectors + 1):
-        sector_angle = i * 2 * np.pi / sectors
-
-        x = radius * np.cos(sector_angle)
-        y = radius * np.sin(sector_angle)
-
-        # Top edge of the side
-        vertices.append((x, y, half_height))
-        normals.append((x / radius, y / radius, 0))
-        tex_coords.append((i / sectors, 1))
-
-        # Bottom edge of the side
-        vertices.append((x, y, -half_height))
-        normals.append((x / radius, y / radius, 0))
-        tex_coords.append((i / sectors, 0))
-
-    # Indices for the top and bottom circles
-    top_center_index = len(vertices)
-    bottom_center_index = len(vertices) + 1
-    vertices.append((0, 0, half_height))  # Top center
-    normals.append((0, 0, 1))
-    tex_coords.append((0.5, 0.5))
-    vertices.append((0, 0, -half_height))  # Bottom center
-    normals.append((0, 0, -1))
-    tex_coords.append((0.5, 0.5))
-
-    for i in range(sectors):
-        next_i = (i + 1) % sectors
-        top_vertex = 2 * i
-        next_top_vertex = 2 * next_i
-        bottom_vertex = 2 * i + 1
-        next_bottom_vertex = 2 * next_i + 1
-
-        # Top circle
-        indices.append((top_center_index, top_vertex, next_top_vertex))
-
-        # Bottom circle
-        indices.append((bottom_center_index, next_bottom_vertex, bottom_vertex))
-
-    # Indices for the side surface
-    side_offset = 2 * (sectors + 1)
-    for i in range(sectors):
-        top_edge = side_offset + 2 * i
-        next_top_edge = side_offset + 2 * ((i + 1) % sectors)
-        bottom_edge = top_edge + 1
-        next_bottom_edge = next_top_edge + 1
-
-        indices.append((top_edge, bottom_edge, next_top_edge))
-        indices.append((bottom_edge, next_bottom_edge, next_top_edge))
-
-    vertices = np.array(vertices, dtype=np.float32)
-    normals = np.array(normals, dtype=np.float32)
-    tex_coords = np.array(tex_coords, dtype=np.float32)
-    indices = np.array(indices, dtype=np.uint32)
-
-    def vertex_idx_transform(vertices, normals, tex_coords, indices):
-        transformed_data = []
-        for triangle in indices:
-            for ind in triangle:
-                transformed_data.extend(normals[ind])
-                transformed_data.extend(vertices[ind])
-                transformed_data.extend(tex_coords[ind])
-        return np.array(transformed_data, dtype=np.float32)
-
-    vertex_data = vertex_idx_transform(vertices, normals, tex_coords, indices)
+    vertex_data: np.ndarray = get_parametric_vertex_data(
+        PARAMETRIC_MESH.CYLINDER, radius, sectors, stacks, height
+    )
 
-    os.makedirs(folderpath, exist_ok=True)
-    np.save(os.path.join(folderpath, filename), vertex_data)
+    if filename is not None:
+        os.makedirs(folderpath, exist_ok=True)
+        np.save(os.path.join(folderpath, filename), vertex_data)
     return vertex_data
 
 
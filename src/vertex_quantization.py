@@ -0,0 +1,115 @@
+from . import *
+
+"""
+Packs the float vertices of the meshes into 16 bytes per vertex instead of 32, which halves the
+memory of the VBOs and the bandwidth the vertex fetch needs.
+
+- Positions are 16 bit integers spanning the bounding box of the mesh, the per mesh scale and
+  offset that map them back are a per render attribute, so the programs need no uniforms for it.
+- Normals are octahedral encoded, the unit sphere is projected onto an octahedron which is
+  unfolded into a square, with two 16 bit integers for that the error is about a hundredth of a
+  degree.
+- Texture coordinates are half floats.
+
+The vertex shaders compiled with `QUANTIZED` decode them, see `shaders/quantization.glsl`.
+"""
+
+from .constants import VBO
+
+INT16_MAX = 32767
+
+# fmt: off
+QUANTIZED_DTYPE = np.dtype([
+    ("position", "<i2", 3),
+    ("padding" , "<i2"),
+    ("normal"  , "<i2", 2),
+    ("texcoord", "<f2", 2),
+])
+# fmt: on
+QUANTIZED_FORMAT = "3i2 x2 2i2 2f2"
+QUANTIZED_ATTRIBUTES: list[str] = [VBO.IN_POSITION, VBO.IN_NORMAL, VBO.IN_TEXCOORD_0]
+# Per render attributes, the same values for all vertices of a draw call.
+DECODE_FORMAT = "3f 3f/r"
+DECODE_ATTRIBUTES: list[str] = [VBO.IN_POSITION_SCALE, VBO.IN_POSITION_OFFSET]
+
+
+@dataclass
+class QuantizationStats:
+    bytes_before: int
+    bytes_after: int
+    # Largest distance between a decoded and the original position in model space.
+    max_position_error: float
+    # The same relative to the largest extent of the bounding box.
+    max_position_error_relative: float
+    max_normal_error_degrees: float
+    max_texcoord_error: float
+
+
+def encode_octahedral(normals: np.ndarray) -> np.ndarray:
+    """Maps unit vectors (N, 3) onto the square [-1, 1]^2 (N, 2)."""
+    normals = normals / np.maximum(np.sum(np.abs(normals), axis=1, keepdims=True), EPS)
+    encoded: np.ndarray = normals[:, :2].copy()
+    # The lower half of the octahedron gets folded over the diagonals of the square.
+    lower: np.ndarray = normals[:, 2] < 0.0
+    signs: np.ndarray = np.where(encoded[lower] >= 0.0, 1.0, -1.0)
+    encoded[lower] = (1.0 - np.abs(encoded[lower][:, ::-1])) * signs
+    return encoded
+
+
+def decode_octahedral(encoded: np.ndarray) -> np.ndarray:
+    """Inverse of `encode_octahedral`, the same as `decodeOctahedral` in the shaders."""
+    normals: np.ndarray = np.concatenate(
+        (encoded, 1.0 - np.sum(np.abs(encoded), axis=1, keepdims=True)), axis=1
+    )
+    folded: np.ndarray = np.maximum(-normals[:, 2:], 0.0)
+    normals[:, :2] += np.where(normals[:, :2] >= 0.0, -folded, folded)
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def to_int16(values: np.ndarray) -> np.ndarray:
+    """Values in [-1, 1] as normalized 16 bit integers."""
+    return np.round(np.clip(values, -1.0, 1.0) * INT16_MAX).astype(np.int16)
+
+
+def quantize_vertices(
+    positions: np.ndarray, normals: np.ndarray, texcoords: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, QuantizationStats]:
+    """
+    Returns the packed vertices of `QUANTIZED_DTYPE` and the scale and offset of the positions,
+    the shaders get the position with `in_position * scale + offset`.
+    """
+    positions = positions.astype(np.float64)
+    lower, upper = positions.min(axis=0), positions.max(axis=0)
+    offset: np.ndarray = (lower + upper) / 2.0
+    # Flat meshes have no extent along one of the axes.
+    half_extent: np.ndarray = np.where(upper > lower, (upper - lower) / 2.0, 1.0)
+
+    vertices: np.ndarray = np.zeros(len(positions), dtype=QUANTIZED_DTYPE)
+    vertices["position"] = to_int16((positions - offset) / half_extent)
+    vertices["normal"] = to_int16(encode_octahedral(normals.astype(np.float64)))
+    vertices["texcoord"] = texcoords.astype(np.float16)
+
+    # The shaders read the integers as they are, so the normalization goes into the scale.
+    scale: np.ndarray = half_extent / INT16_MAX
+
+    decoded_positions: np.ndarray = vertices["position"] * scale + offset
+    position_error: float = float(
+        np.max(np.linalg.norm(decoded_positions - positions, axis=1), initial=0.0)
+    )
+    unit_normals: np.ndarray = normals / np.maximum(
+        np.linalg.norm(normals, axis=1, keepdims=True), EPS
+    )
+    decoded_normals: np.ndarray = decode_octahedral(vertices["normal"] / INT16_MAX)
+    cosines: np.ndarray = np.clip(np.sum(decoded_normals * unit_normals, axis=1), -1, 1)
+    extent: float = max(float(np.max(upper - lower)), EPS)
+    stats = QuantizationStats(
+        bytes_before=4 * (positions.size + normals.size + texcoords.size),
+        bytes_after=vertices.nbytes,
+        max_position_error=position_error,
+        max_position_error_relative=position_error / extent,
+        max_normal_error_degrees=float(np.degrees(np.arccos(cosines.min(initial=1.0)))),
+        max_texcoord_error=float(
+            np.max(np.abs(vertices["texcoord"] - texcoords), initial=0.0)
+        ),
+    )
+    return vertices, np.concatenate((scale, offset)).astype(np.float32), stats
@@ -0,0 +1,4 @@
+def pytest_configure(config) -> None:
+    config.addinivalue_line(
+        "markers", "slow: tests that take long, deselect them with `-m 'not slow'`"
+    )
@@ -0,0 +1,70 @@
+from src import *
+
+""""""
+
+from pathlib import Path
+
+from src.asset_cache import load_cached_array, load_derived_array_with_attributes
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, filepath: str) -> np.ndarray:
+        self.calls += 1
+        with open(filepath, "r") as file:
+            return np.array(file.read().split(), dtype=np.float32)
+
+
+def test_load_cached_array(tmp_path: Path) -> None:
+    source: Path = tmp_path / "mesh.obj"
+    source.write_text("1 2 3")
+    cache_folderpath = str(tmp_path / "cache")
+    parse = CountingParser()
+
+    array: np.ndarray = load_cached_array(str(source), parse, cache_folderpath)
+    assert array.tolist() == [1.0, 2.0, 3.0]
+    assert parse.calls == 1
+
+    # Memory-mapped from the cache.
+    array = load_cached_array(str(source), parse, cache_folderpath)
+    assert isinstance(array, np.memmap)
+    assert array.tolist() == [1.0, 2.0, 3.0]
+    assert parse.calls == 1
+
+    # Same content with a new modification time.
+    stat: os.stat_result = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    load_cached_array(str(source), parse, cache_folderpath)
+    assert parse.calls == 1
+
+    source.write_text("4 5 6 7")
+    array = load_cached_array(str(source), parse, cache_folderpath)
+    assert array.tolist() == [4.0, 5.0, 6.0, 7.0]
+    assert parse.calls == 2
+
+
+def test_load_derived_array(tmp_path: Path) -> None:
+    calls: list[np.ndarray] = []
+
+    def derive(source: np.ndarray) -> tuple[np.ndarray, dict]:
+        calls.append(source)
+        return 2 * source, {"total": float(source.sum())}
+
+    def load(source: np.ndarray) -> tuple[np.ndarray, dict]:
+        return load_derived_array_with_attributes(
+            source, derive, str(tmp_path), "doubled"
+        )
+
+    array, attributes = load(np.arange(4, dtype=np.float32))
+    assert array.tolist() == [0.0, 2.0, 4.0, 6.0] and attributes == {"total": 6.0}
+    array, attributes = load(np.arange(4, dtype=np.float32))
+    assert isinstance(array, np.memmap) and attributes == {"total": 6.0}
+    assert len(calls) == 1
+
+    # Same values, but not the same array.
+    load(np.arange(4, dtype=np.float64))
+    array, _ = load(np.arange(1, 5, dtype=np.float64))
+    assert array.tolist() == [2.0, 4.0, 6.0, 8.0]
+    assert len(calls) == 3
@@ -0,0 +1,87 @@
+from src import *
+
+""""""
+
+import threading
+from typing import Iterator
+
+import pytest
+
+from src.asset_streaming import AssetStreamer
+
+
+def test_uploads_in_steps() -> None:
+    streamer = AssetStreamer(workers=2)
+    uploaded: list[tuple[str, int]] = []
+
+    def upload_in_steps(value: int) -> Iterator[None]:
+        for step in range(3):
+            uploaded.append(("steps", value + step))
+            yield
+
+    streamer.submit("steps", lambda: 10, upload_in_steps)
+    streamer.submit(
+        "single", lambda: 20, lambda value: uploaded.append(("single", value))
+    )
+    streamer.finish()
+
+    assert streamer.is_done
+    assert sorted(uploaded) == [
+        ("single", 20),
+        ("steps", 10),
+        ("steps", 11),
+        ("steps", 12),
+    ]
+    # A generator runs to its end before the next asset starts uploading.
+    steps: list[int] = [value for name, value in uploaded if name == "steps"]
+    assert steps == [10, 11, 12]
+    streamer.shutdown()
+
+
+def test_update_waits_for_loads() -> None:
+    streamer = AssetStreamer(workers=1)
+    loaded = threading.Event()
+    uploaded: list[int] = []
+    streamer.submit("blocked", lambda: loaded.wait() and 1, uploaded.append)
+
+    # Nothing is loaded yet, the frame doesn't block.
+    streamer.update(budget_ms=100.0)
+    assert uploaded == [] and not streamer.is_done
+
+    loaded.set()
+    streamer.finish()
+    assert uploaded == [1]
+    streamer.shutdown()
+
+
+def test_update_budget() -> None:
+    streamer = AssetStreamer(workers=1)
+    uploaded: list[int] = []
+
+    def upload_in_steps(value: int) -> Iterator[None]:
+        for step in range(value):
+            uploaded.append(step)
+            yield
+
+    streamer.submit("steps", lambda: 5, upload_in_steps)
+    streamer.loading[0].future.result()
+    # Without any budget a single step still runs every frame.
+    streamer.update(budget_ms=0.0)
+    assert uploaded == [0]
+    streamer.update(budget_ms=0.0)
+    assert uploaded == [0, 1]
+    streamer.update(budget_ms=1000.0)
+    assert uploaded == list(range(5))
+    streamer.shutdown()
+
+
+def test_load_errors_are_raised_on_upload() -> None:
+    streamer = AssetStreamer(workers=1)
+
+    def load() -> None:
+        raise FileNotFoundError("missing.png")
+
+    streamer.submit("missing", load, lambda _: None)
+    with pytest.raises(FileNotFoundError):
+        streamer.finish()
+    streamer.shutdown()
@@ -0,0 +1,99 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.culling import (
+    BoundingSphere,
+    get_frustum_planes,
+    get_ndc_bounds,
+    get_visible_mask,
+    transform_bounding_spheres,
+)
+
+# Camera at the origin looking down -z.
+M_PROJ_VIEW: mat4 = glm.perspective(glm.radians(60.0), 16 / 9, 0.1, 200.0) * glm.lookAt(
+    vec3(), -vec3_z(), vec3_y()
+)
+
+
+def get_m_models(transforms: list[mat4]) -> np.ndarray:
+    data: bytes = b"".join([m.to_bytes() for m in transforms])
+    return np.frombuffer(data, dtype=np.float32).reshape(-1, 4, 4)
+
+
+def test_bounding_sphere_from_positions() -> None:
+    positions = np.array([[-1, -2, -3], [3, 2, 1], [1, 0, -1]], dtype=np.float32)
+    sphere = BoundingSphere.from_positions(positions)
+    assert np.allclose(sphere.center, (1.0, 0.0, -1.0))
+    assert np.isclose(sphere.radius, np.sqrt(12.0))
+
+
+def test_frustum_planes_are_normalized() -> None:
+    planes: np.ndarray = get_frustum_planes(M_PROJ_VIEW)
+    assert planes.shape == (6, 4)
+    assert np.allclose(np.linalg.norm(planes[:, :3], axis=1), 1.0)
+
+
+def test_transform_bounding_spheres() -> None:
+    m_models = get_m_models(
+        [
+            glm.translate(vec3(1.0, 2.0, 3.0)),
+            glm.translate(vec3(0.0, 0.0, -5.0)) * glm.scale(vec3(1.0, 3.0, 2.0)),
+            glm.rotate(glm.radians(90.0), vec3_y()),
+        ]
+    )
+    centers, radii = transform_bounding_spheres(
+        m_models, np.array([1.0, 0.0, 0.0], dtype=np.float32), 2.0
+    )
+    assert np.allclose(
+        centers, [(2.0, 2.0, 3.0), (1.0, 0.0, -5.0), (0.0, 0.0, -1.0)], atol=EPS
+    )
+    assert np.allclose(radii, [2.0, 6.0, 2.0])
+
+
+# fmt: off
+@pytest.mark.parametrize(
+    "position, radius, expected",
+[
+    (vec3(0.0, 0.0, -10.0)  , 1.0, True),  # Straight ahead
+    (vec3(0.0, 0.0, 10.0)   , 1.0, False), # Behind the camera
+    (vec3(0.0, 0.0, 0.5)    , 1.0, True),  # Behind the camera but intersecting the near plane
+    (vec3(0.0, 0.0, -250.0) , 1.0, False), # Beyond the far plane
+    (vec3(0.0, 0.0, -250.0) , 60.0, True), # Beyond the far plane but large enough to reach in
+    (vec3(100.0, 0.0, -10.0), 1.0, False), # Far to the right
+    (vec3(0.0, -50.0, -10.0), 1.0, False), # Far below
+])
+# fmt: on
+def test_get_visible_mask(position: vec3, radius: float, expected: bool) -> None:
+    centers, radii = transform_bounding_spheres(
+        get_m_models([glm.translate(position)]), np.zeros(3, dtype=np.float32), radius
+    )
+    visible = get_visible_mask(get_frustum_planes(M_PROJ_VIEW), centers, radii)
+    assert visible.tolist() == [expected]
+
+
+def test_get_ndc_bounds() -> None:
+    centers = np.array([[0.0, 0.0, -10.0], [2.0, 1.0, -20.0]], dtype=np.float32)
+    radii = np.array([1.0, 1.0], dtype=np.float32)
+    (x_min, x_max), (y_min, y_max), (z_min, z_max) = get_ndc_bounds(
+        M_PROJ_VIEW, centers, radii
+    )
+    assert -1.0 < x_min < 0.0 < x_max < 1.0
+    assert -1.0 < y_min < 0.0 < y_max < 1.0
+    assert -1.0 < z_min < z_max < 1.0
+
+    # Spheres reaching behind the camera have no bounded projection.
+    assert (
+        get_ndc_bounds(M_PROJ_VIEW, np.zeros((1, 3), dtype=np.float32), radii[:1])
+        is None
+    )
+
+
+def test_get_frustum_planes_with_bounds() -> None:
+    """Only the spheres inside the right half of the screen pass the planes of that half."""
+    planes = get_frustum_planes(M_PROJ_VIEW, ((0.0, 1.0), (-1.0, 1.0), (-1.0, 1.0)))
+    centers = np.array([[5.0, 0.0, -20.0], [-5.0, 0.0, -20.0]], dtype=np.float32)
+    radii = np.array([1.0, 1.0], dtype=np.float32)
+    assert get_visible_mask(planes, centers, radii).tolist() == [True, False]
@@ -0,0 +1,77 @@
+from src import *
+
+""""""
+
+from pathlib import Path
+
+import pytest
+
+from util.data_parser import load_obj, triangulate
+
+# fmt: off
+QUAD_OBJ = """mtllib quad.mtl
+o quad
+v 0.0 0.0 0.0
+v 1.0 0.0 0.0
+v 1.0 1.0 0.0
+v 0.0 1.0 0.0 0.5 0.5 0.5
+vt 0.0 0.0
+vt 1.0 0.0
+vt 1.0 1.0 0.0
+vt 0.0 1.0
+vn 0.0 0.0 1.0
+usemtl red
+f 1/1/1 2/2/1 3/3/1 4/4/1
+usemtl green
+f -4/-4/-1 -2/-2/-1 -1/-1/-1
+"""
+QUAD_MTL = """newmtl red
+Kd 1.0 0.0 0.0
+newmtl green
+Kd 0.0 1.0 0.0
+map_Kd -bm 1.0 green.png
+"""
+# fmt: on
+
+
+def test_triangulate() -> None:
+    assert triangulate(np.array([3, 5])).tolist() == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 3, 5],
+        [7, 3, 6],
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [16, 1 << 20])
+def test_load_obj(tmp_path: Path, chunk_size: int) -> None:
+    (tmp_path / "quad.obj").write_text(QUAD_OBJ)
+    (tmp_path / "quad.mtl").write_text(QUAD_MTL)
+    vertex_data, materials = load_obj(
+        str(tmp_path / "quad.obj"),
+        "2f 3f",
+        ["in_texcoord_0", "in_position"],
+        chunk_size=chunk_size,
+    )
+
+    # fmt: off
+    assert vertex_data["red"].reshape(-1, 5).tolist() == [
+        [0, 0, 0, 0, 0], [1, 0, 1, 0, 0], [1, 1, 1, 1, 0],
+        [0, 1, 0, 1, 0], [0, 0, 0, 0, 0], [1, 1, 1, 1, 0],
+    ]
+    assert vertex_data["green"].reshape(-1, 5).tolist() == [
+        [0, 0, 0, 0, 0], [1, 1, 1, 1, 0], [0, 1, 0, 1, 0],
+    ]
+    # fmt: on
+    assert vertex_data["red"].dtype == np.float32
+    assert materials["red"].diffuse == (1.0, 0.0, 0.0)
+    assert materials["green"].diffuse_texture == "green.png"
+
+
+def test_load_obj_missing_attribute(tmp_path: Path) -> None:
+    # Texture coordinates but no normals.
+    (tmp_path / "quad.obj").write_text(
+        "v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nf 1/1 2/1 3/1\n"
+    )
+    with pytest.raises(ValueError):
+        load_obj(str(tmp_path / "quad.obj"), "3f 3f", ["in_normal", "in_position"])
@@ -0,0 +1,40 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.fixed_timestep import FixedTimestep
+
+
+def test_steps_match_elapsed_time() -> None:
+    timestep = FixedTimestep(step_ms=10.0, max_steps=5)
+    assert timestep.advance(4.0) == 0
+    assert timestep.alpha == pytest.approx(0.4)
+    assert timestep.advance(4.0) == 0
+    assert timestep.advance(4.0) == 1
+    assert timestep.alpha == pytest.approx(0.2)
+    assert timestep.advance(25.0) == 2
+    assert timestep.alpha == pytest.approx(0.7)
+    assert timestep.step_count == 3
+    assert timestep.step_s == pytest.approx(10.0 * MS_TO_SECOND)
+
+
+@pytest.mark.parametrize("step_ms", [5.0, 1000.0 / 60.0, 40.0])
+def test_independent_of_frame_rate(step_ms: float) -> None:
+    """Rendering at 30 or 144 frames per second runs the same number of steps per second."""
+    for frame_ms in (1000.0 / 30.0, 1000.0 / 144.0):
+        timestep = FixedTimestep(step_ms, max_steps=100)
+        steps: int = sum(
+            timestep.advance(frame_ms) for _ in range(round(1000 / frame_ms))
+        )
+        assert abs(steps - 1000.0 / step_ms) <= 1
+
+
+def test_caps_steps_per_frame() -> None:
+    timestep = FixedTimestep(step_ms=10.0, max_steps=3)
+    assert timestep.advance(1005.0) == 3
+    # The time that didn't fit into the steps is dropped, not caught up later.
+    assert timestep.dropped_ms == pytest.approx(970.0)
+    assert timestep.alpha == pytest.approx(0.5)
+    assert timestep.advance(10.0) == 1
@@ -0,0 +1,85 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.lazy_resources import LazyResources
+
+
+class Recorder:
+    """Builds strings and records which ones were built and released."""
+
+    def __init__(self):
+        self.built: list[str] = []
+        self.released: list[str] = []
+
+    def build(self, name: str) -> str:
+        self.built.append(name)
+        return f"{name} {len(self.built)}"
+
+    def release(self, name: str, resource: str) -> None:
+        self.released.append(resource)
+
+
+def test_builds_on_first_access() -> None:
+    recorder = Recorder()
+    resources = LazyResources("test", ["a", "b"], recorder.build, recorder.release)
+    assert recorder.built == []
+    assert "a" in resources and "c" not in resources
+
+    assert resources["a"] == "a 1"
+    assert resources["a"] == "a 1"
+    assert recorder.built == ["a"]
+    assert resources.get_built("b") is None
+    assert "1/2 tests built: a" in resources.get_report()
+
+    with pytest.raises(KeyError):
+        resources["c"]
+
+
+def test_releases_with_last_user() -> None:
+    recorder = Recorder()
+    resources = LazyResources("test", ["a"], recorder.build, recorder.release)
+    resources.acquire("a")
+    resources.acquire("a")
+
+    resources.release("a")
+    assert recorder.released == []
+    resources.release("a")
+    assert recorder.released == ["a 1"]
+    assert resources.get_built("a") is None
+
+    # Built again when it's used again.
+    assert resources.acquire("a") == "a 2"
+
+
+def test_rebuild_releases_after_building() -> None:
+    recorder = Recorder()
+    events: list[str] = []
+    resources = LazyResources(
+        "test",
+        ["a"],
+        lambda name: events.append("build") or recorder.build(name),
+        lambda name, resource: events.append(f"release {resource}"),
+    )
+    resources.rebuild("a")
+    assert events == []
+
+    resources.acquire("a")
+    resources.rebuild("a")
+    assert events == ["build", "build", "release a 1"]
+    assert resources["a"] == "a 2"
+
+    resources.release("a")
+    assert events[-1] == "release a 2"
+
+
+def test_destroy_releases_everything() -> None:
+    recorder = Recorder()
+    resources = LazyResources("test", ["a", "b", "c"], recorder.build, recorder.release)
+    resources["a"]
+    resources.acquire("b")
+    resources.destroy()
+    assert sorted(recorder.released) == ["a 1", "b 2"]
+    assert resources.get_built("a") is None
@@ -0,0 +1,38 @@
+from src import *
+
+""""""
+
+from src.level_of_detail import get_screen_sizes, select_levels_of_detail
+
+THRESHOLDS: tuple[float, ...] = (0.1, 0.025)
+HYSTERESIS: float = 0.2
+
+
+def select(screen_sizes: list[float], previous_levels: list[int]) -> list[int]:
+    return select_levels_of_detail(
+        np.array(screen_sizes), np.array(previous_levels), THRESHOLDS, HYSTERESIS
+    ).tolist()
+
+
+def test_screen_sizes() -> None:
+    centers = np.array([[0.0, 0.0, -10.0], [0.0, 0.0, -20.0], [0.0, 0.5, 0.0]])
+    radii = np.array([1.0, 1.0, 1.0])
+    screen_sizes: np.ndarray = get_screen_sizes(centers, radii, vec3(), 2.0)
+    assert np.allclose(screen_sizes[:2], [0.2, 0.1])
+    # The camera is inside of the last sphere.
+    assert np.isinf(screen_sizes[2])
+
+
+def test_levels_far_from_thresholds() -> None:
+    assert select([1.0, 0.05, 0.001], [2, 0, 0]) == [0, 1, 2]
+
+
+def test_levels_keep_within_hysteresis() -> None:
+    # Just below and above the first threshold, not by enough to switch.
+    assert select([0.09, 0.11], [0, 1]) == [0, 1]
+    # Past the hysteresis band.
+    assert select([0.07, 0.13], [0, 1]) == [1, 0]
+
+
+def test_levels_skip_over_thresholds() -> None:
+    assert select([0.001, 1.0], [0, 2]) == [2, 0]
@@ -115,3 +115,61 @@ def test_glm_reimplementation() -> None:
             assert np.allclose(glm.perspective(*floats), src.math.perspective(*floats))
             assert np.allclose(glm.translate(vecs[0]), src.math.translate(vecs[0]))
             assert np.allclose(glm.scale(vecs[0]), src.math.scale(vecs[0]))
+
+
+def get_random_vecs(seed: int, n: int = 100) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-5.0, 5.0, size=(n, 3))
+
+
+def test_batched_matches_glm() -> None:
+    vecs: np.ndarray = get_random_vecs(0x2024_07_03)
+    angles: np.ndarray = get_random_vecs(0x2024_07_04)
+    scales: np.ndarray = np.abs(get_random_vecs(0x2024_07_05)) + 0.1
+
+    translations = src.math.translate_batched(vecs)
+    scalings = src.math.scale_batched(vecs)
+    rotations = src.math.rotate_batched(angles[:, 0], vecs)
+    axis_rotations = src.math.get_axis_rotation_matrix_batched(angles)
+    m_models = src.math.get_model_matrix_batched(vecs, angles, scales)
+    for n, (v, a, s) in enumerate(zip(vecs, angles, scales)):
+        v, a, s = vec3(*v), vec3(*a), vec3(*s)
+        assert np.allclose(translations[n], glm.translate(v), atol=1e-5)
+        assert np.allclose(scalings[n], glm.scale(v), atol=1e-5)
+        assert np.allclose(rotations[n], glm.rotate(a.x, v), atol=1e-5)
+        assert np.allclose(
+            axis_rotations[n], src.math.get_axis_rotation_matrix(a), atol=1e-5
+        )
+        m_model: mat4 = glm.translate(v)
+        for angle, axis in zip(a, (vec3_x(), vec3_y(), vec3_z())):
+            m_model = glm.rotate(m_model, angle, axis)
+        assert np.allclose(m_models[n], glm.scale(m_model, s), atol=1e-4)
+
+
+def test_batched_cross_and_line_to_line() -> None:
+    p1, p2, q1, q2 = (get_random_vecs(seed, n=50) for seed in range(4))
+    crosses = src.math.cross_batched(p1, p2)
+    transformations = src.math.get_line_to_line_transformation_batched(p1, p2, q1, q2)
+    for n in range(50):
+        assert np.allclose(crosses[n], glm.cross(vec3(*p1[n]), vec3(*p2[n])), atol=1e-4)
+        expected: mat4 = get_line_to_line_transformation(
+            *(vec3(*points[n]) for points in (p1, p2, q1, q2))
+        )
+        assert np.allclose(transformations[n], expected, atol=1e-4)
+
+    mapped = src.math.mat4_x_vec3_batched(transformations, np.stack([p1, p2]))
+    assert np.allclose(mapped, np.stack([q1, q2]), atol=1e-6)
+
+
+def test_batched_normal_matrices_and_products() -> None:
+    m_models = src.math.get_model_matrix_batched(
+        get_random_vecs(5), get_random_vecs(6), np.abs(get_random_vecs(7)) + 0.1
+    )
+    normal_matrices = src.math.get_normal_matrices(m_models)
+    vecs: np.ndarray = get_random_vecs(8)
+    products = src.math.mat4_x_vec4_batched(m_models, np.c_[vecs, np.ones(100)])
+    for m_model, normal_matrix, v, product in zip(
+        m_models, normal_matrices, vecs, products
+    ):
+        expected: mat4 = glm.transpose(glm.inverse(glm.mat4(*m_model.T.ravel())))
+        assert np.allclose(normal_matrix, np.array(expected)[:3, :3], atol=1e-4)
+        assert np.allclose(product, m_model @ np.append(v, 1.0))
@@ -0,0 +1,95 @@
+from src import *
+
+""""""
+
+from pathlib import Path
+
+import pytest
+
+from src.mesh_decimation import decimate, load_decimated_levels
+from src.vertex_data_generator import generate_SphereVertices
+
+# Layout of the generated sphere, normal, position and texture coordinates.
+VERTEX_SIZE = 8
+POSITION_OFFSET = 3
+
+
+@pytest.fixture(scope="module")
+def sphere_vertex_data() -> np.ndarray:
+    return generate_SphereVertices(filename=None, sectors=48, stacks=24)
+
+
+@pytest.mark.parametrize("ratio", [0.5, 0.2])
+def test_decimate_reduces_triangles(
+    sphere_vertex_data: np.ndarray, ratio: float
+) -> None:
+    vertex_data, stats = decimate(
+        sphere_vertex_data, VERTEX_SIZE, POSITION_OFFSET, ratio
+    )
+    assert vertex_data.size % (3 * VERTEX_SIZE) == 0
+    assert stats.triangles_after == vertex_data.size // (3 * VERTEX_SIZE)
+    assert stats.triangles_after <= ratio * stats.triangles_before + 2
+
+
+def test_decimate_keeps_vertices_and_seams(sphere_vertex_data: np.ndarray) -> None:
+    vertex_data, _ = decimate(sphere_vertex_data, VERTEX_SIZE, POSITION_OFFSET, 0.2)
+    before: set[bytes] = {
+        vertex.tobytes() for vertex in sphere_vertex_data.reshape(-1, VERTEX_SIZE)
+    }
+    after: set[bytes] = {
+        vertex.tobytes() for vertex in vertex_data.reshape(-1, VERTEX_SIZE)
+    }
+    # Vertices only ever move onto other vertices with all of their attributes.
+    assert after <= before
+
+    # The texture coordinate seam at u = 0 and u = 1 stays where it is.
+    def seam(vertices: set[bytes]) -> set[bytes]:
+        return {
+            vertex
+            for vertex in vertices
+            if np.frombuffer(vertex, dtype=np.float32)[6] in (0.0, 1.0)
+        }
+
+    assert seam(after) == seam(before)
+
+
+def test_decimate_doesnt_flip_triangles(sphere_vertex_data: np.ndarray) -> None:
+    vertex_data, _ = decimate(sphere_vertex_data, VERTEX_SIZE, POSITION_OFFSET, 0.2)
+    corners: np.ndarray = vertex_data.reshape(-1, 3, VERTEX_SIZE)[
+        :, :, POSITION_OFFSET : POSITION_OFFSET + 3
+    ]
+    normals: np.ndarray = np.cross(
+        corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+    )
+    # The sphere is centered at the origin, all triangles face outwards.
+    assert np.all(np.sum(normals * corners.mean(axis=1), axis=1) > 0.0)
+
+
+def test_decimated_levels_follow_the_mesh(
+    sphere_vertex_data: np.ndarray, tmp_path: Path
+) -> None:
+    def load(vertex_data: np.ndarray) -> list[np.ndarray]:
+        levels, _ = load_decimated_levels(
+            vertex_data,
+            VERTEX_SIZE,
+            POSITION_OFFSET,
+            (0.5, 0.2),
+            ("sphere_0.5", "sphere_0.2"),
+            str(tmp_path),
+        )
+        return levels
+
+    levels: list[np.ndarray] = load(sphere_vertex_data)
+    assert [level.size // (3 * VERTEX_SIZE) for level in levels] == [
+        pytest.approx(ratio * sphere_vertex_data.size // (3 * VERTEX_SIZE), abs=2)
+        for ratio in (0.5, 0.2)
+    ]
+    cached_levels: list[np.ndarray] = load(sphere_vertex_data)
+    assert all(isinstance(level, np.memmap) for level in cached_levels)
+    assert all(map(np.array_equal, levels, cached_levels))
+
+    # The levels of the old mesh don't get reused once it moved.
+    moved: np.ndarray = sphere_vertex_data.reshape(-1, VERTEX_SIZE).copy()
+    moved[:, POSITION_OFFSET] += 10.0
+    for level in load(moved):
+        assert np.all(level.reshape(-1, VERTEX_SIZE)[:, POSITION_OFFSET] > 5.0)
@@ -0,0 +1,60 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.mesh_indexing import deduplicate, get_acmr, index_mesh
+from src.vertex_data_generator import generate_SphereVertices
+
+VERTEX_SIZE = 8
+
+
+@pytest.fixture(scope="module")
+def sphere_vertex_data() -> np.ndarray:
+    return generate_SphereVertices(filename=None, sectors=48, stacks=24)
+
+
+def get_triangles(vertex_data: np.ndarray) -> np.ndarray:
+    """The triangles as sorted raw bytes, to compare meshes regardless of the triangle order."""
+    rows: np.ndarray = np.ascontiguousarray(vertex_data, dtype=np.float32).reshape(
+        -1, 3 * VERTEX_SIZE
+    )
+    return np.sort(rows.view(np.dtype((np.void, 12 * VERTEX_SIZE))).reshape(-1))
+
+
+def test_deduplicate() -> None:
+    vertex_data = np.array([[0, 0], [1, 0], [0, 1], [0, 1], [1, 0], [1, 1]], np.float32)
+    vertices, indices = deduplicate(vertex_data, 2)
+    assert vertices.tolist() == [[0, 0], [1, 0], [0, 1], [1, 1]]
+    assert indices.tolist() == [[0, 1, 2], [2, 1, 3]]
+
+
+def test_get_acmr() -> None:
+    assert get_acmr(np.arange(12).reshape(-1, 3)) == 3.0
+    # A quad made of two triangles only misses on its four corners.
+    assert get_acmr(np.array([[0, 1, 2], [2, 1, 3]])) == 2.0
+    # The first triangle only stays in a cache that still has room for it after the second one.
+    triangles = np.array([[0, 1, 2], [3, 4, 5], [0, 1, 2]])
+    assert get_acmr(triangles, cache_size=5) == 3.0
+    assert get_acmr(triangles, cache_size=6) == 2.0
+
+
+def test_index_mesh_keeps_triangles(sphere_vertex_data: np.ndarray) -> None:
+    vertices, indices, stats = index_mesh(sphere_vertex_data, VERTEX_SIZE)
+    assert vertices.dtype == np.float32 and indices.dtype == np.uint32
+    unindexed: np.ndarray = vertices.reshape(-1, VERTEX_SIZE)[indices]
+    assert np.array_equal(get_triangles(unindexed), get_triangles(sphere_vertex_data))
+
+    assert stats.vertices_before == sphere_vertex_data.size // VERTEX_SIZE
+    assert stats.vertices_after == vertices.size // VERTEX_SIZE
+    assert stats.bytes_after < stats.bytes_before / 2
+    assert stats.acmr_after < stats.acmr_before
+
+
+def test_index_mesh_fetch_order(sphere_vertex_data: np.ndarray) -> None:
+    _, indices, _ = index_mesh(sphere_vertex_data, VERTEX_SIZE)
+    # Every vertex is first used right after all the vertices before it.
+    first_uses: np.ndarray = np.maximum.accumulate(indices.astype(np.int64))
+    assert first_uses[0] == 0
+    assert np.all(np.diff(first_uses) <= 1)
@@ -0,0 +1,33 @@
+from src import *
+
+""""""
+
+from src.mip_chain import build_mip_chain, downsample, get_mip_sizes, split_mip_chain
+
+
+def test_get_mip_sizes() -> None:
+    assert get_mip_sizes(8, 8) == [(8, 8), (4, 4), (2, 2), (1, 1)]
+    assert get_mip_sizes(5, 2) == [(5, 2), (2, 1), (1, 1)]
+    assert get_mip_sizes(1, 1) == [(1, 1)]
+
+
+def test_downsample() -> None:
+    pixels: np.ndarray = np.array([[0, 1, 7], [2, 4, 7]], dtype=np.uint8)[..., None]
+    # The odd column is left out and the average of 7 / 4 gets rounded up.
+    assert downsample(pixels).tolist() == [[[2]]]
+    # Only the axes longer than 1 get halved.
+    assert downsample(pixels[:1]).tolist() == [[[1]]]
+    assert downsample(pixels[:, :1]).tolist() == [[[1]]]
+
+
+def test_mip_chain_round_trip() -> None:
+    pixels: np.ndarray = np.random.default_rng(0).integers(
+        0, 256, size=(12, 20, 3), dtype=np.uint8
+    )
+    chain: np.ndarray = build_mip_chain(pixels)
+    levels: list[np.ndarray] = split_mip_chain(chain, 20, 12, 3)
+
+    assert [level.shape[1::-1] for level in levels] == get_mip_sizes(20, 12)
+    assert np.array_equal(levels[0], pixels)
+    assert np.array_equal(levels[1], downsample(pixels))
+    assert levels[-1].shape == (1, 1, 3)
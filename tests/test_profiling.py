@@ -0,0 +1,45 @@
+from src import *
+
+""""""
+
+from src.profiling import CounterSummary, FrameProfiler, TimingSummary
+from src.render_queue import RenderQueueStats
+
+
+def test_timing_summary() -> None:
+    summary = TimingSummary.from_samples(float(x) for x in range(1, 101))
+    assert np.isclose(summary.mean_ms, 50.5)
+    assert np.isclose(summary.p50_ms, 50.5)
+    assert summary.p50_ms <= summary.p95_ms <= summary.p99_ms <= 100.0
+
+
+def test_history_is_rolling() -> None:
+    profiler = FrameProfiler(history=3)
+    for time_ms in range(10):
+        profiler.record("stage", float(time_ms))
+    assert list(profiler.cpu_times_ms["stage"]) == [7.0, 8.0, 9.0]
+
+
+def test_gpu_stage_without_context_only_measures_cpu() -> None:
+    profiler = FrameProfiler(history=10)
+    for _ in range(5):
+        with profiler.gpu_stage("pass"):
+            pass
+        profiler.end_frame()
+    assert len(profiler.cpu_times_ms["pass"]) == 5
+    assert profiler.summarize(gpu=True) == {}
+
+    profiler.clear()
+    assert profiler.summarize() == {}
+
+
+def test_counters() -> None:
+    profiler = FrameProfiler(history=3)
+    for draw_calls in (1, 2, 3, 7):
+        profiler.count_fields("queue", RenderQueueStats(draw_calls=draw_calls))
+    summaries: dict[str, CounterSummary] = profiler.summarize_counters()
+    assert summaries["queue.draw_calls"] == CounterSummary(4.0, 3.0, 7.0)
+    assert summaries["queue.same_vao_draws"].max == 0.0
+
+    profiler.clear()
+    assert profiler.summarize_counters() == {}
@@ -0,0 +1,89 @@
+from src import *
+
+""""""
+
+import itertools
+
+import pytest
+
+from src.shadow_cascades import (
+    BORDER_TEXELS,
+    ShadowCascades,
+    get_cascade_splits,
+    get_slice_bounding_sphere,
+)
+
+FOV_Y: float = glm.radians(60.0)
+ASPECT_RATIO: float = 16 / 9
+M_VIEW_LIGHT: mat4 = glm.lookAt(vec3(50.0, 50.0, -10.0), vec3(), vec3_y())
+
+
+def get_slice_corners(near: float, far: float) -> list[vec3]:
+    """Corners of the frustum slice of a camera at the origin looking down -z."""
+    tan_y: float = np.tan(0.5 * FOV_Y)
+    tan_x: float = tan_y * ASPECT_RATIO
+    return [
+        vec3(sx * tan_x * distance, sy * tan_y * distance, -distance)
+        for distance, sx, sy in itertools.product((near, far), (-1, 1), (-1, 1))
+    ]
+
+
+@pytest.mark.parametrize("split_lambda", [0.0, 0.5, 1.0])
+def test_get_cascade_splits(split_lambda: float) -> None:
+    splits: np.ndarray = get_cascade_splits(0.1, 200.0, 4, split_lambda)
+    assert len(splits) == 4
+    assert np.all(np.diff(splits) > 0.0)
+    assert np.isclose(splits[-1], 200.0)
+
+
+def test_uniform_and_logarithmic_splits() -> None:
+    assert np.allclose(get_cascade_splits(1.0, 100.0, 2, 0.0), [50.5, 100.0])
+    assert np.allclose(get_cascade_splits(1.0, 100.0, 2, 1.0), [10.0, 100.0])
+
+
+@pytest.mark.parametrize("near, far", [(0.1, 10.0), (10.0, 40.0), (40.0, 200.0)])
+def test_slice_bounding_sphere_contains_corners(near: float, far: float) -> None:
+    center_distance, radius = get_slice_bounding_sphere(near, far, FOV_Y, ASPECT_RATIO)
+    center = vec3(0.0, 0.0, -center_distance)
+    distances: list[float] = [
+        glm.distance(corner, center) for corner in get_slice_corners(near, far)
+    ]
+    assert max(distances) <= radius + EPS
+    # The sphere is tight, at least one of the corners is on it.
+    assert np.isclose(max(distances), radius, rtol=1e-4)
+
+
+def test_light_proj_view_covers_slice_inside_border() -> None:
+    shadow_cascades = ShadowCascades(count=1, resolution=512)
+    near, far = 1.0, 30.0
+    center_distance, radius = get_slice_bounding_sphere(near, far, FOV_Y, ASPECT_RATIO)
+    m_light_proj_view: mat4 = shadow_cascades.get_light_proj_view(
+        M_VIEW_LIGHT, vec3(0.0, 0.0, -center_distance), radius
+    )
+
+    border: float = 2 * BORDER_TEXELS / shadow_cascades.resolution
+    for corner in get_slice_corners(near, far):
+        clip: vec4 = m_light_proj_view * vec4(corner, 1.0)
+        assert abs(clip.x) <= 1.0 - border
+        assert abs(clip.y) <= 1.0 - border
+        assert -1.0 <= clip.z <= 1.0
+
+
+def test_light_proj_view_is_snapped() -> None:
+    """Small movements of the slice keep the projection, so the static shadow cache stays valid."""
+    shadow_cascades = ShadowCascades(count=1, resolution=512)
+    center = vec3(0.0, 0.0, -20.0)
+    # Moves by much less than the snapping step in total, so each of the three light space axes
+    # crosses at most one grid line, without the snapping all 20 projections would differ.
+    m_light_proj_views: set[bytes] = {
+        shadow_cascades.get_light_proj_view(
+            M_VIEW_LIGHT, center + vec3(0.01 * step, 0.0, 0.0), 25.0
+        ).to_bytes()
+        for step in range(20)
+    }
+    assert len(m_light_proj_views) <= 4
+
+    far_away: mat4 = shadow_cascades.get_light_proj_view(
+        M_VIEW_LIGHT, center + vec3(25.0, 0.0, 0.0), 25.0
+    )
+    assert far_away.to_bytes() not in m_light_proj_views
@@ -21,7 +21,7 @@ def test_fresh_startup():
         else:
             print(f"Directory not found: {folder}")
 
-    graphics_engine = GraphicsEngine(scene_id="DEBUG")
+    graphics_engine = GraphicsEngine(scene_id="DEBUG", headless=True)
     graphics_engine.take_screenshot_after_render = True
     graphics_engine.screenshot_prefix = "test_fresh_startup_"
 
@@ -0,0 +1,69 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.mip_chain import get_mip_sizes
+from src.settings import Folders, Textures
+from src.texture import CUBE_FACES, decode_image, load_cube_face, load_image_levels
+
+
+@pytest.fixture
+def image_filepath(tmp_path) -> str:
+    pixels: np.ndarray = np.random.default_rng(0).integers(
+        0, 256, size=(24, 40, 3), dtype=np.uint8
+    )
+    filepath: str = str(tmp_path / "image.png")
+    Image.fromarray(pixels).save(filepath)
+    return filepath
+
+
+@pytest.mark.parametrize("flip_x", [False, True])
+@pytest.mark.parametrize("flip_y", [False, True])
+def test_decode_image_matches_pygame(
+    image_filepath: str, flip_x: bool, flip_y: bool
+) -> None:
+    surface: pg.Surface = pg.transform.flip(
+        pg.image.load(image_filepath), flip_x=flip_x, flip_y=flip_y
+    )
+    pixels: np.ndarray = decode_image(image_filepath, flip_x=flip_x, flip_y=flip_y)
+
+    assert pixels.flags.c_contiguous
+    assert pixels.shape == (surface.get_height(), surface.get_width(), 3)
+    assert pixels.tobytes() == pg.image.tostring(surface, "RGB")
+
+
+@pytest.fixture(params=[False, True], ids=["decoded", "cached"])
+def texture_cache(request, tmp_path, monkeypatch) -> bool:
+    monkeypatch.setattr(Textures, "DISK_CACHE", request.param)
+    monkeypatch.setattr(Folders, "CACHE_TEXTURES", str(tmp_path / "cache"))
+    return request.param
+
+
+def test_load_cube_face_flips(image_filepath: str, tmp_path, texture_cache) -> None:
+    pixels: np.ndarray = decode_image(image_filepath)
+    for face in CUBE_FACES:
+        os.replace(image_filepath, tmp_path / f"{face}.png")
+        image_filepath = str(tmp_path / f"{face}.png")
+
+        decoded: np.ndarray = load_cube_face(str(tmp_path), face)
+        if face in ["top", "bottom"]:
+            assert np.array_equal(decoded, pixels[::-1])
+        else:
+            assert np.array_equal(decoded, pixels[:, ::-1])
+
+
+def test_load_image_levels(image_filepath: str, texture_cache: bool) -> None:
+    pixels: np.ndarray = decode_image(image_filepath, flip_y=True)
+    for _ in range(2):
+        levels: list[np.ndarray] = load_image_levels(image_filepath, flip_y=True)
+        assert np.array_equal(levels[0], pixels)
+
+    if not texture_cache:
+        assert len(levels) == 1
+        return
+
+    assert isinstance(levels[0].base, np.memmap)
+    assert [level.shape[1::-1] for level in levels] == get_mip_sizes(40, 24)
+    assert levels[-1].shape == (1, 1, 3)
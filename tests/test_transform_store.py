@@ -0,0 +1,109 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.fixed_timestep import FixedTimestep
+from src.transform_store import SCALE_ANIMATION_SPEED, TransformStore
+
+
+def get_glm_model_matrix(pos: vec3, rot: vec3, scale: vec3) -> mat4:
+    """How `BaseModel.get_initial_model_matrix` builds it."""
+    m_model: mat4 = glm.translate(glm.mat4(), pos)
+    m_model = glm.rotate(m_model, rot.x, vec3_x())
+    m_model = glm.rotate(m_model, rot.y, vec3_y())
+    m_model = glm.rotate(m_model, rot.z, vec3_z())
+    return glm.scale(m_model, scale)
+
+
+def rotate_xyz(m_model: mat4, angles: vec3) -> mat4:
+    m_model = glm.rotate(m_model, angles.x, vec3_x())
+    m_model = glm.rotate(m_model, angles.y, vec3_y())
+    return glm.rotate(m_model, angles.z, vec3_z())
+
+
+def test_matches_glm_layout() -> None:
+    transforms = TransformStore(FixedTimestep(step_ms=10.0, max_steps=5), capacity=1)
+    _rng = np.random.default_rng(0x2024_07_02)
+    rows: list[tuple[vec3, vec3, vec3]] = [
+        (vec3(*pos), vec3(*rot), vec3(*scale))
+        for pos, rot, scale in zip(
+            _rng.uniform(-10.0, 10.0, (20, 3)),
+            _rng.uniform(-np.pi, np.pi, (20, 3)),
+            _rng.uniform(0.1, 3.0, (20, 3)),
+        )
+    ]
+    indices: list[int] = [transforms.add(*row) for row in rows]
+    assert indices == list(range(20)) and transforms.capacity >= 20
+
+    m_models: np.ndarray = transforms.m_models
+    assert m_models.shape == (20, 4, 4) and m_models.dtype == np.float32
+    for index, row in zip(indices, rows):
+        expected = np.frombuffer(get_glm_model_matrix(*row).to_bytes(), np.float32)
+        assert np.allclose(m_models[index].ravel(), expected, atol=1e-5)
+
+    # Moving a model only computes its matrix again.
+    transforms.set_transform(3, pos=vec3(1.0, 2.0, 3.0))
+    assert np.allclose(transforms.m_models[3, 3], (1.0, 2.0, 3.0, 1.0))
+    assert transforms.get_m_model(3)[3] == glm.vec4(1.0, 2.0, 3.0, 1.0)
+
+
+@pytest.mark.parametrize("alpha", [0.0, 0.25, 1.0])
+def test_rotation_is_interpolated_between_steps(alpha: float) -> None:
+    simulation = FixedTimestep(step_ms=1000.0 / 60.0, max_steps=5)
+    transforms = TransformStore(simulation)
+    pos, rot, scale = vec3(1.0, -2.0, 3.0), vec3(0.3, 0.0, -1.2), vec3(1.0, 2.0, 0.5)
+    rot_update = 2.5 * vec3(1.0, 1.0, 0.0)
+    rotating: int = transforms.add(pos, rot, scale, rot_update)
+    static: int = transforms.add(pos, rot, scale)
+
+    m_model: mat4 = get_glm_model_matrix(pos, rot, scale)
+    for _ in range(7):
+        previous_m_model: mat4 = m_model
+        m_model = rotate_xyz(m_model, rot_update * simulation.step_s)
+        transforms.fixed_update()
+    transforms.update(alpha)
+
+    expected: mat4 = rotate_xyz(
+        previous_m_model, rot_update * alpha * simulation.step_s
+    )
+    assert np.allclose(
+        transforms.m_models[rotating].ravel(),
+        np.frombuffer(expected.to_bytes(), np.float32),
+        atol=1e-5,
+    )
+    assert list(transforms.is_dynamic) == [True, False]
+    assert np.allclose(
+        transforms.m_models[static].ravel(),
+        np.frombuffer(get_glm_model_matrix(pos, rot, scale).to_bytes(), np.float32),
+        atol=1e-6,
+    )
+
+
+def test_scale_animation_is_evaluated_once() -> None:
+    simulation = FixedTimestep(step_ms=10.0, max_steps=5)
+    transforms = TransformStore(simulation)
+    calls: list[np.ndarray] = []
+
+    def animation(phases: np.ndarray) -> np.ndarray:
+        calls.append(phases)
+        return np.stack([1.0 + phases, np.ones_like(phases), 2.0 * phases], axis=1)
+
+    # The scale animation replaces the rotation.
+    rows: list[int] = [
+        transforms.add(vec3(i), vec3(), vec3(1.0), vec3(1.0)) for i in range(3)
+    ]
+    for row, phase in zip(rows, (0.5, 1.0, 2.0)):
+        transforms.set_scale_animation(row, animation, phase)
+    simulation.advance(25.0)
+    transforms.update(0.5)
+
+    assert len(calls) == 1
+    elapsed_s: float = (simulation.step_count - 1 + 0.5) * simulation.step_s
+    assert np.allclose(
+        calls[0], np.array((0.5, 1.0, 2.0)) + elapsed_s * SCALE_ANIMATION_SPEED
+    )
+    for row, phases in zip(rows, calls[0]):
+        scale_factors: np.ndarray = np.diag(transforms.m_models[row])[:3]
+        assert np.allclose(scale_factors, (1.0 + phases, 1.0, 2.0 * phases))
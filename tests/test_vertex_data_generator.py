@@ -0,0 +1,52 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.constants import PARAMETRIC_MESH
+from src.vertex_data_generator import (
+    generate_CylinderVertices,
+    generate_SphereVertices,
+    get_parametric_vertex_data,
+)
+
+
+def test_parametric_vertex_data_is_cached() -> None:
+    vertex_data: np.ndarray = generate_SphereVertices(
+        filename=None, sectors=12, stacks=6
+    )
+    assert vertex_data is get_parametric_vertex_data(PARAMETRIC_MESH.SPHERE, 1.0, 12, 6)
+    assert not vertex_data.flags.writeable
+    assert vertex_data.dtype == np.float32
+    # Two triangles per quad of the grid.
+    assert vertex_data.size == 12 * 6 * 2 * 3 * 8
+
+
+@pytest.mark.parametrize("radius", [0.5, 2.0])
+def test_sphere(radius: float) -> None:
+    vertices: np.ndarray = generate_SphereVertices(
+        filename=None, radius=radius, sectors=24, stacks=12
+    ).reshape(-1, 8)
+    normals, positions, tex_coords = vertices[:, :3], vertices[:, 3:6], vertices[:, 6:]
+    assert np.allclose(np.linalg.norm(positions, axis=1), radius, atol=1e-6)
+    assert np.allclose(normals * radius, positions, atol=1e-6)
+    assert np.all((tex_coords >= 0.0) & (tex_coords <= 1.0))
+
+
+@pytest.mark.parametrize("stacks", [1, 4])
+def test_cylinder(stacks: int) -> None:
+    radius, height, sectors = 0.5, 3.0, 16
+    triangles: np.ndarray = generate_CylinderVertices(
+        filename=None, radius=radius, height=height, sectors=sectors, stacks=stacks
+    ).reshape(-1, 3, 8)
+    # A fan for each cap and two triangles per segment of the sides.
+    assert len(triangles) == 2 * sectors + 2 * sectors * stacks
+
+    positions: np.ndarray = triangles[:, :, 3:6]
+    assert np.all(np.abs(positions[:, :, 2]) <= height / 2 + 1e-6)
+    # All triangles face outwards.
+    face_normals: np.ndarray = np.cross(
+        positions[:, 1] - positions[:, 0], positions[:, 2] - positions[:, 0]
+    )
+    assert np.all(np.sum(face_normals * triangles[:, 0, :3], axis=1) > 0.0)
@@ -0,0 +1,51 @@
+from src import *
+
+""""""
+
+import pytest
+
+from src.vertex_data_generator import generate_SphereVertices
+from src.vertex_quantization import (
+    INT16_MAX,
+    QUANTIZED_DTYPE,
+    decode_octahedral,
+    encode_octahedral,
+    quantize_vertices,
+)
+
+
+def test_quantized_vertex_size() -> None:
+    assert QUANTIZED_DTYPE.itemsize == 16
+
+
+def test_octahedral_round_trip() -> None:
+    normals: np.ndarray = np.random.default_rng(0).normal(size=(1000, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    axes: np.ndarray = np.concatenate((np.eye(3), -np.eye(3)))
+    normals = np.concatenate((normals, axes))
+
+    encoded: np.ndarray = encode_octahedral(normals)
+    assert np.all(np.abs(encoded) <= 1.0)
+    assert np.allclose(decode_octahedral(encoded), normals, atol=1e-12)
+
+
+@pytest.mark.parametrize("scale", [0.01, 1.0, 250.0])
+def test_quantize_vertices(scale: float) -> None:
+    vertices: np.ndarray = generate_SphereVertices(filename=None).reshape(-1, 8)
+    normals, positions, texcoords = vertices[:, :3], vertices[:, 3:6], vertices[:, 6:]
+    positions = positions * scale + 3.0 * scale
+
+    packed, decode_data, stats = quantize_vertices(positions, normals, texcoords)
+    assert packed.dtype == QUANTIZED_DTYPE
+    assert stats.bytes_after * 2 == stats.bytes_before
+
+    # Decoded like the shaders do it.
+    position_scale, position_offset = decode_data[:3], decode_data[3:]
+    decoded: np.ndarray = packed["position"] * position_scale + position_offset
+    assert np.allclose(decoded, positions, rtol=0.0, atol=2e-5 * scale)
+    assert stats.max_position_error_relative < 1e-4
+    assert stats.max_normal_error_degrees < 0.05
+
+    decoded_normals: np.ndarray = decode_octahedral(packed["normal"] / INT16_MAX)
+    assert np.allclose(decoded_normals, normals, atol=1e-3)
+    assert np.allclose(packed["texcoord"], texcoords, atol=1e-3)
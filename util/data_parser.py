@@ -1,6 +1,27 @@
+"""
+Loads Wavefront OBJ files, together with the materials of their MTL files, into interleaved float32
+vertex data like the one the VBOs in `src/vbo.py` upload, e.g. "2f 3f 3f" for texture coordinates,
+normal and position.
+
+The file is memory-mapped and parsed in chunks of whole lines, the lines of each chunk get sorted
+by their keyword and all numbers of one keyword are parsed with a single NumPy call, there are no
+Python objects per line or per number. Only the parsed values are kept, so besides the result the
+memory use is bounded by the chunk size even for files of several hundred MB.
+
+Polygons are triangulated as fans in the same vertex order pywavefront uses, (v1, v2, v3) followed
+by (vj, v1, vj-1) for every further vertex, so the result is the same as the one of pywavefront.
+
+Usage:
+    python -m util.data_parser [filepath]
+"""
+
+import mmap
 import os
+import sys
+import time
+from dataclasses import dataclass, field
 from enum import StrEnum
-from typing import TypeAlias
+from typing import Iterable, Optional, TypeAlias
 
 import numpy as np
 
@@ -10,54 +31,345 @@ obj_map: dict[str, str] = {
     "mursik": "20430_Cat_v1_NEW.obj"  # https://free3d.com/3d-model/cat-v1--220685.html1
 }
 
+# Bytes of the file parsed at once, the chunks always end at the end of a line.
+CHUNK_SIZE = 1 << 22
+DEFAULT_MATERIAL = "default"
+
 
 class OBJSymbols(StrEnum):
     VERTEX = "v"
     NORMAL = "vn"
     TEXTURE = "vt"
     FACE = "f"
+    USE_MATERIAL = "usemtl"
+    MATERIAL_LIBRARY = "mtllib"
 
 
 ARRAY_MAP: TypeAlias = dict[str, np.ndarray[np.float32]]
 
+# The vertex attributes of the shaders and the OBJ data they get filled with, with the number of
+# components that are used.
+ATTRIBUTE_SYMBOLS: dict[str, tuple[OBJSymbols, int]] = {
+    "in_position": (OBJSymbols.VERTEX, 3),
+    "in_normal": (OBJSymbols.NORMAL, 3),
+    "in_texcoord_0": (OBJSymbols.TEXTURE, 2),
+}
+
+NEWLINE: int = ord("\n")
+SPACE: int = ord(" ")
+SLASH: int = ord("/")
+IS_WHITESPACE = np.zeros(256, dtype=bool)
+IS_WHITESPACE[[ord(" "), ord("\t"), ord("\r"), NEWLINE]] = True
+
+
+@dataclass
+class Material:
+    name: str
+    ambient: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    diffuse: tuple[float, float, float] = (1.0, 1.0, 1.0)
+    specular: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    shininess: float = 0.0
+    # Relative to the folder of the MTL file.
+    diffuse_texture: Optional[str] = None
+    # All statements of the material as they are in the file.
+    properties: dict[str, list[str]] = field(default_factory=dict)
+
+
+def parse_mtl(filepath: str) -> dict[str, Material]:
+    """MTL files are tiny, they get parsed line by line."""
+    materials: dict[str, Material] = {}
+    material: Optional[Material] = None
+    with open(filepath, "r") as file:
+        for line in file:
+            values: list[str] = line.split("#", 1)[0].split()
+            if not values:
+                continue
+
+            keyword, arguments = values[0], values[1:]
+            if keyword == "newmtl":
+                material = Material(" ".join(arguments))
+                materials[material.name] = material
+                continue
+            if material is None:
+                raise ValueError(f"'{keyword}' before any 'newmtl' in {filepath=}.")
+
+            material.properties[keyword] = arguments
+            match keyword:
+                case "Ka":
+                    material.ambient = tuple(map(float, arguments[:3]))
+                case "Kd":
+                    material.diffuse = tuple(map(float, arguments[:3]))
+                case "Ks":
+                    material.specular = tuple(map(float, arguments[:3]))
+                case "Ns":
+                    material.shininess = float(arguments[0])
+                case "map_Kd":
+                    # Options like "-bm 1.0" come before the filename.
+                    material.diffuse_texture = arguments[-1]
+    return materials
+
+
+def get_attribute_sizes(buffer_format: str) -> list[int]:
+    """Number of floats of each attribute of a format like "2f 3f 3f"."""
+    sizes: list[int] = []
+    for size in buffer_format.split():
+        if not (size.endswith("f") and size[:-1].isdigit()):
+            raise NotImplementedError(
+                f"Only float attributes are supported, not {size}."
+            )
+        sizes.append(int(size[:-1]))
+    return sizes
+
+
+def get_ranges(starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Concatenation of `np.arange(start, stop)` for all the starts and stops."""
+    lengths: np.ndarray = stops - starts
+    offsets: np.ndarray = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+
+
+def parse_lines(
+    text: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    prefix_length: int,
+    dtype: type,
+    separator: Optional[int] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parses the numbers of the lines after their keyword of `prefix_length` bytes, returns all of
+    them in one array and the number of whitespace separated tokens in each line. The `separator`
+    gets treated as whitespace when parsing, but not when counting the tokens.
+    """
+    # The newline at the end of each line keeps the numbers of consecutive lines apart.
+    selected: np.ndarray = text[get_ranges(starts + prefix_length, ends + 1)]
+    token_starts: np.ndarray = ~IS_WHITESPACE[selected]
+    token_starts[1:] &= IS_WHITESPACE[selected[:-1]]
+    line_ids: np.ndarray = np.repeat(
+        np.arange(len(starts)), ends + 1 - starts - prefix_length
+    )
+    token_counts: np.ndarray = np.bincount(
+        line_ids[token_starts], minlength=len(starts)
+    )
+
+    if separator is not None:
+        selected[selected == separator] = SPACE
+    values: np.ndarray = np.fromstring(selected.tobytes(), dtype=dtype, sep=" ")
+    return values, token_counts
+
+
+def take_first(values: np.ndarray, counts: np.ndarray, size: int) -> np.ndarray:
+    """The first `size` values of each line, the lines have `counts` values each."""
+    if np.any(counts < size) or values.size != counts.sum():
+        raise ValueError(f"Lines with fewer than {size} numbers or unparsable ones.")
+    offsets: np.ndarray = np.cumsum(counts) - counts
+    return values[offsets[:, np.newaxis] + np.arange(size)]
+
+
+def get_face_columns(token: bytes) -> list[OBJSymbols]:
+    """Which indices the corners of the faces have, based on a corner like b"1/2/3"."""
+    parts: list[bytes] = token.split(b"/")
+    if len(parts) == 1:
+        return [OBJSymbols.VERTEX]
+    if len(parts) == 2:
+        return [OBJSymbols.VERTEX, OBJSymbols.TEXTURE]
+    if parts[1] == b"":
+        return [OBJSymbols.VERTEX, OBJSymbols.NORMAL]
+    return [OBJSymbols.VERTEX, OBJSymbols.TEXTURE, OBJSymbols.NORMAL]
+
+
+def triangulate(corner_counts: np.ndarray) -> np.ndarray:
+    """
+    Corner indices (T, 3) of the triangles of the polygons with that many corners, whose corners
+    come one polygon after another.
+    """
+    if np.any(corner_counts < 3):
+        raise ValueError("Faces need at least 3 corners.")
+    triangle_counts: np.ndarray = corner_counts - 2
+    firsts: np.ndarray = np.repeat(
+        np.cumsum(corner_counts) - corner_counts, triangle_counts
+    )
+    # Index of the triangle within its polygon.
+    steps: np.ndarray = get_ranges(np.zeros_like(triangle_counts), triangle_counts)
+    triangles: np.ndarray = np.stack(
+        (steps + 2, np.zeros_like(steps), steps + 1), axis=1
+    )
+    # (v1, v2, v3) for the first one, (vj, v1, vj-1) for the others.
+    triangles[steps == 0] = (0, 1, 2)
+    return triangles + firsts[:, np.newaxis]
+
+
+class OBJParser:
+    """Keeps what the chunks parsed so far, the indices of the faces can refer to earlier ones."""
+
+    def __init__(self):
+        self.arrays: dict[OBJSymbols, list[np.ndarray]] = {
+            OBJSymbols.VERTEX: [],
+            OBJSymbols.NORMAL: [],
+            OBJSymbols.TEXTURE: [],
+        }
+        self.counts: dict[OBJSymbols, int] = {symbol: 0 for symbol in self.arrays}
+        self.face_columns: Optional[list[OBJSymbols]] = None
+        # Corners of the triangles as indices into the arrays, one column per face column.
+        self.triangles: list[np.ndarray] = []
+        self.triangle_materials: list[np.ndarray] = []
+        self.material_names: list[str] = [DEFAULT_MATERIAL]
+        self.material: int = 0
+        self.material_libraries: list[str] = []
+
+    def parse_chunk(self, chunk: bytes) -> None:
+        # A few bytes of padding so the keyword checks never read past the end.
+        text: np.ndarray = np.frombuffer(chunk + b"\n  ", dtype=np.uint8)
+        ends: np.ndarray = np.flatnonzero(text[:-2] == NEWLINE)
+        starts: np.ndarray = np.concatenate(([0], ends[:-1] + 1))
+        first, second, third = text[starts], text[starts + 1], text[starts + 2]
+        line_ids: np.ndarray = np.arange(len(starts))
+
+        is_vertex: np.ndarray = first == ord("v")
+        kinds: dict[OBJSymbols, np.ndarray] = {
+            OBJSymbols.VERTEX: is_vertex & IS_WHITESPACE[second],
+            OBJSymbols.NORMAL: is_vertex & (second == ord("n")) & IS_WHITESPACE[third],
+            OBJSymbols.TEXTURE: is_vertex & (second == ord("t")) & IS_WHITESPACE[third],
+        }
+        is_face: np.ndarray = (first == ord("f")) & IS_WHITESPACE[second]
+        # Only a handful of these, they are decoded one by one.
+        statements: np.ndarray = np.flatnonzero(
+            (first == ord("u")) | (first == ord("m"))
+        )
+
+        # Number of each kind of data before each line, the indices of the faces can be relative.
+        counts_before: dict[OBJSymbols, np.ndarray] = {}
+        for symbol, is_kind in kinds.items():
+            counts_before[symbol] = self.counts[symbol] + np.cumsum(is_kind) - is_kind
+            if not np.any(is_kind):
+                continue
+            values, token_counts = parse_lines(
+                text, starts[is_kind], ends[is_kind], len(symbol), np.float32
+            )
+            # Only the positions of vertices with colors, only u and v of 3D texture coordinates.
+            size: int = 2 if symbol == OBJSymbols.TEXTURE else 3
+            self.arrays[symbol].append(take_first(values, token_counts, size))
+            self.counts[symbol] += int(is_kind.sum())
+
+        # Material of each line.
+        materials: np.ndarray = np.full(len(starts), -1)
+        for line in statements.tolist():
+            keyword, _, name = (
+                bytes(text[starts[line] : ends[line]]).decode().partition(" ")
+            )
+            if keyword == OBJSymbols.USE_MATERIAL:
+                name = name.strip()
+                if name not in self.material_names:
+                    self.material_names.append(name)
+                materials[line] = self.material_names.index(name)
+            elif keyword == OBJSymbols.MATERIAL_LIBRARY:
+                self.material_libraries.append(name.strip())
+        last_statement: np.ndarray = np.maximum.accumulate(
+            np.where(materials >= 0, line_ids, -1)
+        )
+        materials = np.where(
+            last_statement >= 0, materials[last_statement], self.material
+        )
+        self.material = int(materials[-1])
+
+        if not np.any(is_face):
+            return
+        face_starts, face_ends = starts[is_face], ends[is_face]
+        if self.face_columns is None:
+            line: bytes = bytes(text[face_starts[0] : face_ends[0]])
+            self.face_columns = get_face_columns(line.split()[1])
+        values, corner_counts = parse_lines(
+            text, face_starts, face_ends, 1, np.int64, SLASH
+        )
+        if values.size != corner_counts.sum() * len(self.face_columns):
+            raise ValueError("All faces need to have the same kind of indices.")
+
+        corners: np.ndarray = values.reshape(-1, len(self.face_columns))
+        for column, symbol in enumerate(self.face_columns):
+            before: np.ndarray = np.repeat(
+                counts_before[symbol][is_face], corner_counts
+            )
+            # OBJ indices start at 1, negative ones count back from the last one so far.
+            indices: np.ndarray = corners[:, column]
+            indices = np.where(indices < 0, indices + before, indices - 1)
+            if np.any(indices < 0) or np.any(indices >= before):
+                raise ValueError(f"Face indices of '{symbol}' out of range.")
+            corners[:, column] = indices
+
+        triangles: np.ndarray = triangulate(corner_counts)
+        self.triangles.append(corners[triangles.reshape(-1)])
+        self.triangle_materials.append(np.repeat(materials[is_face], corner_counts - 2))
 
-def determine_vertex_buffer_format(array_map: ARRAY_MAP) -> tuple[int, int, int]:
-    # TODO: Implement this for array map, current implementation is deprecated
-    return (3, 3, 2)
-    if obj_map[OBJSymbols.VERTEX][0].split(" ") == 3:
-        vertex_dim = 3
-    else:
-        raise NotImplementedError("Vertex Buffer dim != 3 not supported yet.")
+    def get_vertex_data(
+        self, buffer_format: str, attributes: Iterable[str]
+    ) -> dict[str, np.ndarray]:
+        """Interleaved vertex data of the triangles of each material."""
+        if not self.triangles:
+            return {}
 
-    if obj_map[OBJSymbols.NORMAL][0].split(" ") == 3:
-        normal_dim = 3
-    else:
-        raise NotImplementedError("Vertex Buffer dim != 3 not supported yet.")
+        columns: list[np.ndarray] = []
+        for attribute, size in zip(attributes, get_attribute_sizes(buffer_format)):
+            symbol, available_size = ATTRIBUTE_SYMBOLS[attribute]
+            if symbol not in self.face_columns or size > available_size:
+                raise ValueError(f"The faces have no {size} floats for '{attribute}'.")
+            data: np.ndarray = np.concatenate(self.arrays[symbol])
+            corners: np.ndarray = np.concatenate(
+                [
+                    triangles[:, self.face_columns.index(symbol)]
+                    for triangles in self.triangles
+                ]
+            )
+            columns.append(data[corners, :size])
+        vertices: np.ndarray = np.hstack(columns)
 
-    if obj_map[OBJSymbols.NORMAL][0].split(" ")[:2] == 2:
-        texture_dim = 2
-    else:
-        raise NotImplementedError("Vertex Buffer dim != 3 not supported yet.")
+        # Every corner of a triangle has the material of the triangle.
+        materials: np.ndarray = np.repeat(np.concatenate(self.triangle_materials), 3)
+        return {
+            name: vertices[materials == material].reshape(-1)
+            for material, name in enumerate(self.material_names)
+            if np.any(materials == material)
+        }
 
-    (vertex_dim, normal_dim, texture_dim)
 
+def load_obj(
+    filepath: str,
+    buffer_format: str = "2f 3f 3f",
+    attributes: Iterable[str] = ("in_texcoord_0", "in_normal", "in_position"),
+    chunk_size: int = CHUNK_SIZE,
+) -> tuple[dict[str, np.ndarray], dict[str, Material]]:
+    """
+    Returns the interleaved float32 vertex data of the triangles of each material, in the order of
+    `attributes`, and the materials of the MTL files the OBJ file refers to.
+    """
+    parser = OBJParser()
+    with open(filepath, "rb") as file:
+        if os.fstat(file.fileno()).st_size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                while start < len(data):
+                    end: int = data.rfind(b"\n", start, start + chunk_size) + 1
+                    # A single line longer than the chunk size.
+                    if end <= start:
+                        end = data.find(b"\n", start) + 1 or len(data)
+                    parser.parse_chunk(data[start:end])
+                    start = end
 
-def parse_obj_to_numpy(obj_lines: list[str]) -> np.ndarray:
-    array_map: ARRAY_MAP = {}
-    for symbol in OBJSymbols:
-        list_: list[str] = [
-            line.removeprefix(symbol.value).lstrip().removesuffix("\n").rstrip()
-            for line in obj_lines
-            if line.startswith(symbol.value + " ")
-        ]
-        list_ = list(filter(lambda x: x != "", list_))
-        list_split: list[list[str]] = [s.split(" ") for s in list_]
-        if symbol != OBJSymbols.FACE:
-            array_map[symbol] = np.array(list_split, dtype=np.float32)
-        else:
-            face_list: list[list[str]] = list_split
+    materials: dict[str, Material] = {}
+    for library in parser.material_libraries:
+        library_filepath: str = os.path.join(os.path.dirname(filepath), library)
+        if os.path.exists(library_filepath):
+            materials.update(parse_mtl(library_filepath))
+    return parser.get_vertex_data(buffer_format, attributes), materials
 
 
 if __name__ == "__main__":
-    with open(os.path.join(DATA_OBJ_FOLDERPATH, obj_map["mursik"])) as file:
-        parse_obj_to_numpy(file.readlines())
+    filepath: str = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(DATA_OBJ_FOLDERPATH, "cat", obj_map["mursik"])
+    )
+    start: float = time.perf_counter()
+    vertex_data, materials = load_obj(filepath)
+    print(f"Parsed {filepath} in {time.perf_counter() - start:.2f}s.")
+    for name, data in vertex_data.items():
+        print(f"{name}: {data.size // 24} triangles, {data.nbytes / 2**20:.1f} MiB")